@@ -0,0 +1,38 @@
+import pickle
+import sys
+import time
+
+import numpy as np
+
+from ml_models import CO2_NN_SCALERS_PATH, load_co2_nn_keras_model, load_co2_nn_model
+
+
+def measure(predictor, x: np.ndarray, repeats: int = 20) -> float:
+    """Среднее время одного вызова, секунд (первый вызов - прогрев, не учитывается)"""
+    predictor(x)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        predictor(x)
+    return (time.perf_counter() - started) / repeats
+
+
+def co2_inputs(rows: int = 512) -> np.ndarray:
+    """Случайные входы в масштабе обучающей выборки"""
+    with open(CO2_NN_SCALERS_PATH, 'rb') as f:
+        scaler_X = pickle.load(f)['scaler_X']
+    rng = np.random.default_rng(42)
+    return scaler_X.mean_ + rng.standard_normal((rows, len(scaler_X.mean_))) * scaler_X.scale_
+
+
+if __name__ == "__main__":
+    # Микробенчмарк NumPy-движка против Keras (нужен tensorflow): python benchmark_nn_inference.py [строк в пакете]
+    inputs = co2_inputs(int(sys.argv[1]) if len(sys.argv) > 1 else 512)
+    numpy_predictor = load_co2_nn_model()
+    keras_predictor = load_co2_nn_keras_model()
+
+    for batch_size in (1, len(inputs)):
+        x = inputs[:batch_size]
+        numpy_time = measure(numpy_predictor, x)
+        keras_time = measure(keras_predictor, x)
+        print(f"batch={batch_size}: numpy {numpy_time * 1000:.3f} ms, keras {keras_time * 1000:.3f} ms, "
+              f"ускорение x{keras_time / numpy_time:.1f}")
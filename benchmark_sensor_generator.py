@@ -0,0 +1,24 @@
+import sys
+import time
+
+import numpy as np
+
+from sensor_generator import generate_sensor_values, make_rng
+
+
+def measure(types: np.ndarray, repeats: int = 20) -> float:
+    """Среднее время генерации показаний всех датчиков, секунд (первый вызов - прогрев)"""
+    rng = make_rng(0)
+    generate_sensor_values(types, 0, 0, rng=rng)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        generate_sensor_values(types, 0, 0, rng=rng)
+    return (time.perf_counter() - started) / repeats
+
+
+if __name__ == "__main__":
+    # Микробенчмарк генератора показаний: python benchmark_sensor_generator.py [число датчиков]
+    sensors = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    types = np.resize(np.array(['temperature', 'humidity', 'co2'], dtype=object), sensors)
+    elapsed = measure(types)
+    print(f"sensors={sensors}: {elapsed * 1000:.3f} ms, {sensors / elapsed / 1e6:.1f} млн показаний/с")
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional
+
+# Хранилище бинарных данных (фото детекций) с адресацией по SHA-256 содержимого
+BLOB_STORE_BACKEND = os.getenv("BLOB_STORE_BACKEND", "local")
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "blob_store")
+
+# Размер куска при потоковой отдаче, байт
+BLOB_CHUNK_SIZE = 64 * 1024
+
+
+def blob_key(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore(ABC):
+    """
+    Интерфейс хранилища: ключ - SHA-256 содержимого (hex), поэтому одинаковые
+    файлы хранятся один раз, а записанный блоб не меняется
+    """
+
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_chunks(self, key: str, start: int = 0, end: Optional[int] = None,
+                    chunk_size: int = BLOB_CHUNK_SIZE) -> Iterator[bytes]:
+        """Куски содержимого с байта start до end (не включительно)"""
+        raise NotImplementedError
+
+    def read(self, key: str) -> bytes:
+        return b"".join(self.iter_chunks(key))
+
+    @abstractmethod
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def keys(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def modified_time(self, key: str) -> float:
+        """Время записи блоба (unix time)"""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """Блобы в локальном каталоге: <каталог>/ab/cd/abcd... (два уровня по 256 подкаталогов)"""
+
+    def __init__(self, root: str = BLOB_STORE_DIR):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        if len(key) != 64 or not all(c in "0123456789abcdef" for c in key):
+            raise ValueError(f"Некорректный ключ блоба: {key}")
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data: bytes) -> str:
+        key = blob_key(data)
+        path = self.path(key)
+        if os.path.exists(path):
+            # Обновляем время записи: сборщик мусора не удалит блоб, на который сейчас сошлются
+            os.utime(path)
+            return key
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Запись во временный файл и os.replace: читатель никогда не видит недописанный блоб
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return key
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.path(key))
+
+    def iter_chunks(self, key: str, start: int = 0, end: Optional[int] = None,
+                    chunk_size: int = BLOB_CHUNK_SIZE) -> Iterator[bytes]:
+        with open(self.path(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def keys(self) -> Iterator[str]:
+        if not os.path.isdir(self.root):
+            return
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if len(filename) == 64 and not filename.startswith("."):
+                    yield filename
+
+    def modified_time(self, key: str) -> float:
+        return os.path.getmtime(self.path(key))
+
+
+# Доступные реализации хранилища (имя задается BLOB_STORE_BACKEND)
+BLOB_STORE_BACKENDS = {
+    "local": lambda: LocalBlobStore(BLOB_STORE_DIR),
+}
+
+
+def create_blob_store(backend: str = BLOB_STORE_BACKEND) -> BlobStore:
+    if backend not in BLOB_STORE_BACKENDS:
+        raise ValueError(f"Неизвестное хранилище блобов: {backend}")
+    return BLOB_STORE_BACKENDS[backend]()
+
+
+# Хранилище процесса
+blob_store = create_blob_store()
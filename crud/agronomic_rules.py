@@ -7,6 +7,8 @@ import models
 import schemas
 from fastapi import APIRouter, Depends, HTTPException, Query
 from database import get_db
+from topology import topology_cache
+from report_cache import latest_report_cache
 from models import AgronomicRule
 
 router = APIRouter(
@@ -77,4 +79,7 @@ def delete_agrorule_db(db: Session, agrorule_id: int):
     if db_agrorules:
         db.delete(db_agrorules)
         db.commit()
+        # Вместе с правилом каскадно удаляются теплицы - топологию перечитываем целиком
+        topology_cache.invalidate()
+        latest_report_cache.clear()
     return db_agrorules
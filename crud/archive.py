@@ -0,0 +1,283 @@
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from crud.rollups import REPORT_METRICS
+from database import get_db
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow не установлен - архив пишется в .npz
+    pa = None
+
+router = APIRouter(
+    prefix="/reports/archive",
+    tags=["reports"],
+)
+
+# Каталог архива: <каталог>/greenhouse_id=<id>/month=<ГГГГ-ММ>/reports.<формат>
+ARCHIVE_DIR = os.getenv("REPORT_ARCHIVE_DIR", "report_archive")
+
+# Строк, читаемых из курсора за раз при выгрузке
+ARCHIVE_BATCH_SIZE = 5000
+
+# Формат -> расширение файла (arrow - Arrow IPC / Feather v2)
+ARCHIVE_FORMATS = {"parquet": "parquet", "arrow": "arrow", "npz": "npz"}
+
+# Колонки архива: id и время - int64 (время в наносекундах от эпохи, UTC без пояса), показатели - float32
+ARCHIVE_COLUMNS = ("id", "greenhouse_id", "report_time") + REPORT_METRICS
+
+_PARTITION_RE = re.compile(r"^greenhouse_id=(\d+)$")
+_MONTH_RE = re.compile(r"^month=(\d{4}-\d{2})$")
+
+
+def default_archive_format() -> str:
+    return "parquet" if pa is not None else "npz"
+
+
+def _check_format(format: Optional[str]) -> str:
+    format = format or default_archive_format()
+    if format not in ARCHIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown archive format: {format}")
+    if format != "npz" and pa is None:
+        raise HTTPException(status_code=400, detail=f"Format {format} requires pyarrow")
+    return format
+
+
+@router.post("/", response_model=List[schemas.ArchivePartition])
+def create_archive(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    greenhouse_id: Optional[int] = None,
+    format: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Выгрузка отчетов в колоночный архив по теплицам и месяцам (Parquet, Arrow IPC или .npz).
+    Период расширяется до целых месяцев: файл месяца всегда перезаписывается целиком
+    """
+    return export_reports_archive(db, start, end, greenhouse_id, _check_format(format))
+
+
+@router.get("/", response_model=List[schemas.ArchivePartition])
+def read_archive(greenhouse_id: Optional[int] = None):
+    """Список файлов архива"""
+    return list_archive(greenhouse_id=greenhouse_id)
+
+
+@router.get("/{greenhouse_id}/{month}")
+def download_archive(
+    greenhouse_id: int,
+    month: str = Path(..., pattern=r"^\d{4}-\d{2}$"),
+    format: Optional[str] = None
+):
+    """Скачивание файла архива теплицы за месяц (ГГГГ-ММ)"""
+    for partition in list_archive(greenhouse_id=greenhouse_id):
+        if partition["month"] == month and (format is None or partition["format"] == format):
+            return FileResponse(
+                partition_path(greenhouse_id, month, partition["format"]),
+                media_type="application/octet-stream",
+                filename=f"reports_{greenhouse_id}_{month}.{ARCHIVE_FORMATS[partition['format']]}",
+            )
+    raise HTTPException(status_code=404, detail="Archive partition not found")
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def next_month(moment: datetime) -> datetime:
+    moment = month_start(moment)
+    return moment.replace(year=moment.year + 1, month=1) if moment.month == 12 else moment.replace(month=moment.month + 1)
+
+
+def _month_ceil(moment: datetime) -> datetime:
+    moment = moment.replace(tzinfo=None)
+    return moment if moment == month_start(moment) else next_month(moment)
+
+
+def partition_path(greenhouse_id: int, month: str, format: str, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or ARCHIVE_DIR, f"greenhouse_id={greenhouse_id}", f"month={month}",
+                        f"reports.{ARCHIVE_FORMATS[format]}")
+
+
+def _to_nanoseconds(moment: datetime) -> int:
+    return int(np.datetime64(moment.replace(tzinfo=None), "ns").astype(np.int64))
+
+
+def _partition_columns(rows: List) -> Dict[str, np.ndarray]:
+    """Строки отчетов -> колонки numpy (NULL в показателях -> NaN)"""
+    fields = list(zip(*rows))
+    columns = {
+        "id": np.array(fields[0], dtype=np.int64),
+        "greenhouse_id": np.array(fields[1], dtype=np.int64),
+        "report_time": np.array([moment.replace(tzinfo=None) for moment in fields[2]],
+                                dtype="datetime64[ns]").astype(np.int64),
+    }
+    for name, values in zip(REPORT_METRICS, fields[3:]):
+        columns[name] = np.array(values, dtype=np.float64).astype(np.float32)
+    return columns
+
+
+def _write_partition(path: str, columns: Dict[str, np.ndarray], format: str):
+    """Запись файла через временный файл и os.replace: читатели не видят недописанный файл"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    if format == "npz":
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **columns)
+    else:
+        table = pa.table(columns)
+        if format == "parquet":
+            pq.write_table(table, tmp_path, compression="zstd")
+        else:
+            feather.write_feather(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def export_reports_archive(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           greenhouse_id: Optional[int] = None, format: Optional[str] = None,
+                           directory: Optional[str] = None) -> List[dict]:
+    """
+    Выгрузка отчетов в архив. Строки читаются серверным курсором в порядке (теплица, время),
+    в памяти держится только текущий месяц одной теплицы
+
+    Returns:
+        List[dict]: записанные файлы (теплица, месяц, формат, строк, байт)
+    """
+    format = format or default_archive_format()
+    table = models.Report.__table__
+    query = select(*[table.c[name] for name in ARCHIVE_COLUMNS]).where(table.c.report_time.isnot(None))
+    if start is not None:
+        query = query.where(table.c.report_time >= month_start(start))
+    if end is not None:
+        query = query.where(table.c.report_time < _month_ceil(end))
+    if greenhouse_id is not None:
+        query = query.where(table.c.greenhouse_id == greenhouse_id)
+    query = query.order_by(table.c.greenhouse_id, table.c.report_time, table.c.id)
+
+    written = []
+    current_key, buffer = None, []
+
+    def flush():
+        path = partition_path(current_key[0], current_key[1], format, directory)
+        _write_partition(path, _partition_columns(buffer), format)
+        written.append({"greenhouse_id": current_key[0], "month": current_key[1], "format": format,
+                        "rows": len(buffer), "bytes": os.path.getsize(path)})
+
+    result = db.execute(query.execution_options(yield_per=ARCHIVE_BATCH_SIZE))
+    for partition in result.partitions():
+        for row in partition:
+            key = (row.greenhouse_id, row.report_time.strftime("%Y-%m"))
+            if key != current_key and buffer:
+                flush()
+                buffer = []
+            current_key = key
+            buffer.append(tuple(row))
+    if buffer:
+        flush()
+
+    print(f"✅ Архив отчетов: записано файлов {len(written)}, строк {sum(item['rows'] for item in written)}")
+    return written
+
+
+def list_archive(greenhouse_id: Optional[int] = None, directory: Optional[str] = None) -> List[dict]:
+    """Файлы архива (без чтения содержимого)"""
+    directory = directory or ARCHIVE_DIR
+    if not os.path.isdir(directory):
+        return []
+
+    partitions = []
+    for greenhouse_dir in sorted(os.listdir(directory)):
+        greenhouse_match = _PARTITION_RE.match(greenhouse_dir)
+        if not greenhouse_match:
+            continue
+        partition_greenhouse = int(greenhouse_match.group(1))
+        if greenhouse_id is not None and partition_greenhouse != greenhouse_id:
+            continue
+        for month_dir in sorted(os.listdir(os.path.join(directory, greenhouse_dir))):
+            month_match = _MONTH_RE.match(month_dir)
+            if not month_match:
+                continue
+            for format, extension in ARCHIVE_FORMATS.items():
+                path = os.path.join(directory, greenhouse_dir, month_dir, f"reports.{extension}")
+                if os.path.exists(path):
+                    partitions.append({"greenhouse_id": partition_greenhouse, "month": month_match.group(1),
+                                       "format": format, "bytes": os.path.getsize(path)})
+    return partitions
+
+
+def _read_partition(path: str, format: str, columns: List[str]) -> Dict[str, np.ndarray]:
+    if format == "npz":
+        with np.load(path) as data:
+            return {name: data[name] for name in columns}
+    reader = pq.read_table if format == "parquet" else feather.read_table
+    table = reader(path, columns=columns)
+    return {name: table.column(name).to_numpy() for name in columns}
+
+
+def read_reports_archive(greenhouse_id: Optional[int] = None, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None, columns: Optional[List[str]] = None,
+                         directory: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Локальное чтение архива без обращения к БД: колонки за период [start, end).
+    Результат можно передать в pandas.DataFrame; report_time переводится
+    в даты через pandas.to_datetime(..., unit="ns")
+    """
+    columns = list(columns or ARCHIVE_COLUMNS)
+    unknown = set(columns) - set(ARCHIVE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Неизвестные колонки архива: {sorted(unknown)}")
+    # Время нужно для фильтра по периоду, даже если его не запросили
+    read_columns = columns if "report_time" in columns else columns + ["report_time"]
+
+    first_month = start.strftime("%Y-%m") if start is not None else None
+    last_month = end.strftime("%Y-%m") if end is not None else None
+    parts = []
+    for partition in list_archive(greenhouse_id, directory):
+        if first_month is not None and partition["month"] < first_month:
+            continue
+        if last_month is not None and partition["month"] > last_month:
+            continue
+        path = partition_path(partition["greenhouse_id"], partition["month"], partition["format"], directory)
+        parts.append(_read_partition(path, partition["format"], read_columns))
+
+    if not parts:
+        return {name: np.empty(0, dtype=np.float32 if name in REPORT_METRICS else np.int64) for name in columns}
+
+    data = {name: np.concatenate([part[name] for part in parts]) for name in read_columns}
+    mask = np.ones(data["report_time"].shape[0], dtype=bool)
+    if start is not None:
+        mask &= data["report_time"] >= _to_nanoseconds(start)
+    if end is not None:
+        mask &= data["report_time"] < _to_nanoseconds(end)
+    return {name: data[name][mask] for name in columns}
+
+
+if __name__ == "__main__":
+    # Выгрузка архива: python -m crud.archive [начало ISO] [конец ISO] [id теплицы] [формат]
+    from database import SessionLocal
+
+    args = sys.argv[1:]
+    archive_start = datetime.fromisoformat(args[0]) if len(args) > 0 else None
+    archive_end = datetime.fromisoformat(args[1]) if len(args) > 1 else None
+    archive_greenhouse = int(args[2]) if len(args) > 2 else None
+    archive_format = args[3] if len(args) > 3 else None
+
+    session = SessionLocal()
+    try:
+        export_reports_archive(session, archive_start, archive_end, archive_greenhouse, archive_format)
+    finally:
+        session.close()
@@ -5,6 +5,7 @@ import models
 import schemas
 from fastapi import APIRouter, Depends, HTTPException, Query
 from database import get_db
+from topology import topology_cache
 
 router = APIRouter(
     prefix="/cameras",
@@ -45,6 +46,7 @@ def create_camera_db(content: schemas.CameraCreate, db: Session):
     db.add(created_camera)
     db.commit()
     db.refresh(created_camera)
+    topology_cache.upsert_camera(created_camera)
     return created_camera
 
 def read_camera_db(id: int, db: Session):
@@ -62,6 +64,7 @@ def update_camera_db(content: schemas.CameraUpdate, id: int, db: Session):
             setattr(updated_camera, field, value)
         db.commit()
         db.refresh(updated_camera)
+        topology_cache.upsert_camera(updated_camera)
     return updated_camera
 
 def delete_camera_db(id: int, db: Session):
@@ -69,4 +72,5 @@ def delete_camera_db(id: int, db: Session):
     if deleted_camera:
         db.delete(deleted_camera)
         db.commit()
+        topology_cache.remove_camera(id)
     return deleted_camera
\ No newline at end of file
@@ -1,27 +1,87 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import Annotated, List
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query, Request
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, undefer
+from typing import Annotated, Callable, List, Literal, Optional, Tuple
+import asyncio
+import os
 import pickle
-import cv2
+import sys
+import threading
+import time
 import numpy as np
-from PIL import Image, ImageDraw
 from io import BytesIO
-from skimage.measure import label, regionprops
-from skimage.feature import hog
 import schemas, models
 from database import get_db
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from pagination import keyset_page, set_next_cursor
+from blob_store import blob_key, blob_store
+from renditions import RENDITION_MEDIA_TYPE, rendition_cache
+from inference_pool import PoolBusyError, WorkerPool
+
+# cv2, skimage и PIL импортируются внутри функций обработки: роутер не тянет
+# тяжелые библиотеки при старте приложения, они загружаются при первой детекции
 
 router = APIRouter(prefix="/detections", tags=["detections"])
 
-# Загружаем ML модель
-try:
-    with open('svm_pipeline.pkl', 'rb') as file:
-        ml_model = pickle.load(file)
-    print("ML модель успешно загружена")
-except Exception as e:
-    print(f"Ошибка загрузки ML модели: {e}")
-    ml_model = None
+# Кэширование фото клиентами: содержимое по ETag неизменно, но фото детекции может быть заменено (PUT),
+# поэтому после max-age клиент перепроверяет его условным запросом (If-None-Match -> 304)
+PHOTO_CACHE_MAX_AGE_SECONDS = int(os.getenv("PHOTO_CACHE_MAX_AGE_SECONDS", "300"))
+PHOTO_CACHE_CONTROL = f"public, max-age={PHOTO_CACHE_MAX_AGE_SECONDS}, must-revalidate"
+
+# Блоб без ссылок удаляется, только если он записан (или переиспользован через put) раньше этого срока:
+# строка детекции, сославшаяся на него при параллельной загрузке, может быть еще не закоммичена.
+# Оставшиеся блобы удаляет python -m crud.detections gc-blobs
+BLOB_MIN_AGE_SECONDS = float(os.getenv("BLOB_MIN_AGE_SECONDS", "3600"))
+
+# Размер отдаваемого фото: оригинал или уменьшенная копия (renditions.RENDITION_SIZES)
+PhotoSize = Literal["original", "thumb", "medium"]
+
+# ML модель загружается при первом обращении (или при фоновом прогреве)
+ml_model = None
+ml_model_loaded = False
+ml_model_lock = threading.Lock()
+
+
+def get_ml_model():
+    """Загрузка ML модели один раз на процесс"""
+    global ml_model, ml_model_loaded
+
+    if not ml_model_loaded:
+        with ml_model_lock:
+            if not ml_model_loaded:
+                try:
+                    with open('svm_pipeline.pkl', 'rb') as file:
+                        ml_model = pickle.load(file)
+                    print("ML модель успешно загружена")
+                except Exception as e:
+                    print(f"Ошибка загрузки ML модели: {e}")
+                    ml_model = None
+                ml_model_loaded = True
+    return ml_model
+
+
+def warm_up_detection_model():
+    """Прогрев: импорт библиотек обработки изображений и загрузка ML модели"""
+    import cv2
+    import skimage.measure
+    import skimage.feature
+    import PIL.Image
+
+    get_ml_model()
+
+
+# Пул обработки изображений: каждый процесс загружает SVM один раз (0 процессов - обработка в потоке)
+DETECTION_WORKERS = int(os.getenv("DETECTION_WORKERS", "2"))
+DETECTION_MAX_PENDING = int(os.getenv("DETECTION_MAX_PENDING", "4"))
+DETECTION_TIMEOUT_SECONDS = float(os.getenv("DETECTION_TIMEOUT_SECONDS", "60"))
+
+detection_pool = WorkerPool(
+    "detections",
+    max_workers=DETECTION_WORKERS,
+    max_pending=DETECTION_MAX_PENDING,
+    timeout=DETECTION_TIMEOUT_SECONDS,
+    initializer=warm_up_detection_model,
+)
 
 # Константы для HOG
 N = 128  # Количество пикселей в строке
@@ -32,6 +92,8 @@ P = 2  # Размерность блока
 
 def find_green_candidates(image, green_threshold=40):
     """Находит зеленые регионы как кандидаты на сорняки"""
+    import cv2
+
     hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
     lower_green = np.array([35, 40, 40])
     upper_green = np.array([90, 255, 255])
@@ -56,6 +118,9 @@ def find_green_candidates(image, green_threshold=40):
 
 def mask_to_coordinates(mask, original_image, min_area=100):
     """Конвертирует маску в координаты bbox"""
+    import cv2
+    from skimage.measure import label, regionprops
+
     labeled_mask = label(mask)
     detections = []
     gray_image = cv2.cvtColor(original_image, cv2.COLOR_BGR2GRAY)
@@ -76,6 +141,14 @@ def mask_to_coordinates(mask, original_image, min_area=100):
 
 def process_image_with_ml(image_bytes):
     """Обрабатывает изображение через ML модель"""
+    import cv2
+    from PIL import Image, ImageDraw
+    from skimage.feature import hog
+
+    ml_model = get_ml_model()
+    if ml_model is None:
+        raise RuntimeError("ML модель не загружена")
+
     # Конвертируем bytes в numpy array
     nparr = np.frombuffer(image_bytes, np.uint8)
     img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
@@ -133,6 +206,8 @@ def process_image_with_ml(image_bytes):
     pil_image.save(img_byte_arr, format='JPEG')
     processed_image_bytes = img_byte_arr.getvalue()
 
+    height, width = img.shape[:2]
+
     # Рассчитываем средний confidence_level
     avg_confidence = np.mean(confidence_levels) if confidence_levels else 0.0
 
@@ -143,10 +218,163 @@ def process_image_with_ml(image_bytes):
     return {
         'processed_image': processed_image_bytes,
         'confidence_level': float(avg_confidence),
-        'detection_count': detection_count
+        'detection_count': detection_count,
+        'width': width,
+        'height': height,
     }
 
 
+async def run_detection_processing(image_bytes: bytes) -> dict:
+    """
+    Обработка изображения в пуле процессов: event loop не блокируется на время OpenCV/HOG/SVM.
+    По таймауту запрос получает 504, но уже начатая задача дорабатывает в процессе пула
+    """
+    try:
+        return await detection_pool.run(process_image_with_ml, image_bytes)
+    except PoolBusyError:
+        raise HTTPException(503, "Очередь обработки изображений заполнена, повторите позже")
+    except asyncio.TimeoutError:
+        raise HTTPException(504, "Превышено время обработки изображения")
+    except Exception as e:
+        raise HTTPException(500, f"Ошибка обработки ML моделью: {str(e)}")
+
+
+def store_detection_photos(detection: models.Detection, photo_bytes: bytes, detection_photo_bytes: bytes,
+                           width: Optional[int] = None, height: Optional[int] = None):
+    """Запись фото в хранилище блобов; в строке детекции остаются только хэши, размеры и габариты"""
+    detection.photo_hash = blob_store.put(photo_bytes)
+    detection.photo_size = len(photo_bytes)
+    detection.detection_photo_hash = blob_store.put(detection_photo_bytes)
+    detection.detection_photo_size = len(detection_photo_bytes)
+    detection.photo_width = width
+    detection.photo_height = height
+    detection.photo = None
+    detection.detection_photo = None
+
+
+def release_blobs(db: Session, keys, min_age_seconds: Optional[float] = None):
+    """
+    Удаление блобов, на которые больше не ссылается ни одна детекция (вызывать после commit).
+    Недавно записанные блобы не удаляются (см. BLOB_MIN_AGE_SECONDS): параллельная загрузка
+    того же содержимого могла уже сослаться на блоб, но еще не закоммитить строку
+    """
+    min_age_seconds = BLOB_MIN_AGE_SECONDS if min_age_seconds is None else min_age_seconds
+    threshold = time.time() - min_age_seconds
+    for key in {key for key in keys if key}:
+        referenced = db.query(models.Detection.id).filter(
+            or_(models.Detection.photo_hash == key, models.Detection.detection_photo_hash == key)
+        ).first()
+        if referenced is None and blob_store.exists(key) and blob_store.modified_time(key) < threshold:
+            blob_store.delete(key)
+
+
+def detection_blob_keys(db: Session, greenhouse_id: Optional[int] = None) -> set:
+    """Хэши фото детекций (всех или одной теплицы)"""
+    query = db.query(models.Detection.photo_hash, models.Detection.detection_photo_hash)
+    if greenhouse_id is not None:
+        query = query.filter(models.Detection.greenhouse_id == greenhouse_id)
+    return {key for row in query.all() for key in row if key}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Сравнение If-None-Match с ETag (слабое сравнение, как требует RFC 9110 для этого заголовка)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Один диапазон bytes=start-end, bytes=start- или bytes=-suffix -> (start, end) включительно.
+    Несколько диапазонов и другие единицы не поддерживаются - тогда отдается весь файл (None);
+    диапазон за пределами файла - 416
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+
+    if not first:
+        start, end = size - min(int(last), size), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(416, "Запрошенный диапазон вне файла", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def photo_response(request: Request, key: Optional[str], size: Optional[int],
+                   load_legacy: Callable[[], Optional[bytes]], not_found: str, rendition: Optional[str] = None):
+    """
+    Ответ с фото: поток из хранилища блобов или (не перенесенные детекции) байты из строки;
+    rendition - уменьшенная копия (thumb/medium) из кэша копий.
+    ETag - SHA-256 содержимого; повторный запрос с If-None-Match получает 304 без чтения фото,
+    заголовок Range - часть файла (206)
+    """
+    legacy_bytes = None
+    if key:
+        if not blob_store.exists(key):
+            raise HTTPException(404, not_found)
+    else:
+        legacy_bytes = load_legacy()
+        if not legacy_bytes:
+            raise HTTPException(404, not_found)
+        key = blob_key(legacy_bytes)
+
+    etag = f'"{key}"' if rendition is None else f'"{key}-{rendition}"'
+    headers = {"ETag": etag, "Cache-Control": PHOTO_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    media_type = "image/jpeg"
+    if rendition is not None:
+        load_source = (lambda: legacy_bytes) if legacy_bytes is not None else (lambda: blob_store.read(key))
+        try:
+            data = rendition_cache.get(key, rendition, load_source)
+        except Exception as e:
+            raise HTTPException(500, f"Ошибка создания копии фото: {str(e)}")
+        media_type, size = RENDITION_MEDIA_TYPE, len(data)
+        body = lambda start, end: iter([data[start:end]])
+    elif legacy_bytes is not None:
+        size = len(legacy_bytes)
+        body = lambda start, end: iter([legacy_bytes[start:end]])
+    else:
+        size = size if size is not None else blob_store.size(key)
+        body = lambda start, end: blob_store.iter_chunks(key, start, end)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    # If-Range с другим ETag: фото изменилось, отдаем целиком
+    if range_header and size > 0 and request.headers.get("if-range", etag) == etag:
+        byte_range = parse_range(range_header, size)
+    if byte_range is None:
+        return StreamingResponse(body(0, size), media_type=media_type,
+                                 headers={**headers, "Content-Length": str(size)})
+
+    start, end = byte_range
+    return StreamingResponse(body(start, end + 1), status_code=206, media_type=media_type, headers={
+        **headers,
+        "Content-Range": f"bytes {start}-{end}/{size}",
+        "Content-Length": str(end - start + 1),
+    })
+
+
+def _detection_photo_response(request: Request, db: Session, detection_id: int, hash_column, size_column,
+                              legacy_column, not_found: str, rendition: Optional[str] = None):
+    """Фото детекции: выбираются только хэш и размер; байты из строки - только у не перенесенных детекций"""
+    detection = db.query(hash_column, size_column).filter(models.Detection.id == detection_id).first()
+    if not detection:
+        raise HTTPException(404, "Детекция не найдена")
+
+    load_legacy = lambda: db.query(legacy_column).filter(models.Detection.id == detection_id).scalar()
+    return photo_response(request, detection[0], detection[1], load_legacy, not_found, rendition)
+
+
 @router.post("/", response_model=schemas.Detection)
 async def create_detection(
         greenhouse_id: Annotated[int, Form(..., description="ID теплицы")],
@@ -156,10 +384,6 @@ async def create_detection(
     """
     Создать новую детекцию
     """
-    # Проверка ML модели
-    if ml_model is None:
-        raise HTTPException(500, "ML модель не загружена")
-
     # 1. Валидация файла
     if not photo.content_type or not photo.content_type.startswith('image/'):
         raise HTTPException(400, "Файл должен быть изображением")
@@ -178,25 +402,24 @@ async def create_detection(
             f"Файл слишком большой. Максимум: {MAX_SIZE // (1024 * 1024)}MB"
         )
 
-    # 4. Вызов ML модели для обработки
-    try:
-        ml_result = process_image_with_ml(photo_bytes)
-        confidence_level = ml_result['confidence_level']
-        detection_photo_bytes = ml_result['processed_image']
-        detection_count = ml_result['detection_count']
+    # 4. Вызов ML модели для обработки (в процессе пула)
+    ml_result = await run_detection_processing(photo_bytes)
+    confidence_level = ml_result['confidence_level']
+    detection_photo_bytes = ml_result['processed_image']
+    detection_count = ml_result['detection_count']
 
-        print(f"Обработано изображение: {detection_count} детекций, confidence: {confidence_level}")
+    print(f"Обработано изображение: {detection_count} детекций, confidence: {confidence_level}")
 
-    except Exception as e:
-        raise HTTPException(500, f"Ошибка обработки ML моделью: {str(e)}")
-
-    # 5. Создание объекта для БД
+    # 5. Создание объекта для БД (фото - в хранилище блобов)
     db_detection = models.Detection(
-        photo=photo_bytes,
-        detection_photo=detection_photo_bytes,
         greenhouse_id=greenhouse_id,
         confidence_level=confidence_level,
     )
+    try:
+        store_detection_photos(db_detection, photo_bytes, detection_photo_bytes,
+                               ml_result.get('width'), ml_result.get('height'))
+    except OSError as e:
+        raise HTTPException(500, f"Ошибка сохранения фото: {str(e)}")
 
     # 6. Сохранение в БД
     try:
@@ -210,57 +433,62 @@ async def create_detection(
     return db_detection
 
 
-@router.get("/", response_model=List[schemas.Detection])
+# Колонки списка детекций: размер фото не перенесенных детекций считает БД (LENGTH), сами байты не читаются
+DETECTION_LIST_COLUMNS = (
+    models.Detection.id,
+    models.Detection.greenhouse_id,
+    models.Detection.confidence_level,
+    models.Detection.created_at,
+    func.coalesce(models.Detection.photo_size, func.length(models.Detection.photo)).label("photo_size"),
+    func.coalesce(models.Detection.detection_photo_size,
+                  func.length(models.Detection.detection_photo)).label("detection_photo_size"),
+    models.Detection.photo_width,
+    models.Detection.photo_height,
+)
+
+
+@router.get("/", response_model=List[schemas.DetectionListItem])
 def get_detections(
+        response: Response,
         db: Session = Depends(get_db),
         skip: int = Query(0, ge=0),
-        limit: int = Query(100, ge=1, le=1000)
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor (вместо skip)")
 ):
-    """Получить все детекции с пагинацией"""
-    detections = db.query(models.Detection) \
-        .order_by(models.Detection.created_at.desc()) \
-        .offset(skip) \
-        .limit(limit) \
-        .all()
+    """Получить все детекции с пагинацией (skip/limit или курсор по (created_at, id))"""
+    detections = keyset_page(db.query(*DETECTION_LIST_COLUMNS), models.Detection.created_at, models.Detection.id,
+                             limit, cursor=cursor, skip=skip)
+    set_next_cursor(response, detections, limit, "created_at")
     return detections
 
 
-@router.get("/{detection_id}/photo")
-async def get_photo(detection_id: int, db: Session = Depends(get_db)):
-    """Получить оригинальное фото детекции"""
-    detection = db.query(models.Detection).filter(
-        models.Detection.id == detection_id
-    ).first()
-
-    if not detection:
-        raise HTTPException(404, "Детекция не найдена")
-
-    if not detection.photo:
-        raise HTTPException(404, "Фото не найдено")
+@router.get("/pool/stats")
+def get_detection_pool_stats():
+    """Статистика пула обработки изображений"""
+    return detection_pool.stats()
 
-    return Response(
-        content=detection.photo,
-        media_type="image/jpeg"
-    )
 
+@router.get("/renditions/stats")
+def get_rendition_stats():
+    """Статистика кэша уменьшенных копий фото"""
+    return rendition_cache.stats()
 
-@router.get("/{detection_id}/detection-photo")
-async def get_detection_photo(detection_id: int, db: Session = Depends(get_db)):
-    """Получить обработанное фото с детекцией"""
-    detection = db.query(models.Detection).filter(
-        models.Detection.id == detection_id
-    ).first()
 
-    if not detection:
-        raise HTTPException(404, "Детекция не найдена")
+@router.get("/{detection_id}/photo")
+def get_photo(detection_id: int, request: Request, size: PhotoSize = "original", db: Session = Depends(get_db)):
+    """Получить оригинальное фото детекции (size=thumb/medium - уменьшенная копия в WebP)"""
+    return _detection_photo_response(request, db, detection_id, models.Detection.photo_hash,
+                                     models.Detection.photo_size, models.Detection.photo, "Фото не найдено",
+                                     None if size == "original" else size)
 
-    if not detection.detection_photo:
-        raise HTTPException(404, "Фото с детекцией не найдено")
 
-    return Response(
-        content=detection.detection_photo,
-        media_type="image/jpeg"
-    )
+@router.get("/{detection_id}/detection-photo")
+def get_detection_photo(detection_id: int, request: Request, size: PhotoSize = "original",
+                        db: Session = Depends(get_db)):
+    """Получить обработанное фото с детекцией (size=thumb/medium - уменьшенная копия в WebP)"""
+    return _detection_photo_response(request, db, detection_id, models.Detection.detection_photo_hash,
+                                     models.Detection.detection_photo_size, models.Detection.detection_photo,
+                                     "Фото с детекцией не найдено", None if size == "original" else size)
 
 
 @router.delete("/{detection_id}")
@@ -276,8 +504,10 @@ def delete_detection(
     if not detection:
         raise HTTPException(404, "Детекция не найдена")
 
+    blob_keys = [detection.photo_hash, detection.detection_photo_hash]
     db.delete(detection)
     db.commit()
+    release_blobs(db, blob_keys)
 
     return {"message": "Детекция удалена", "detection_id": detection_id}
 
@@ -289,10 +519,6 @@ async def update_detection(
         db: Session = Depends(get_db)
 ):
     """Обновить детекцию - заменить фото и обработать через ML модель"""
-    # Проверка ML модели
-    if ml_model is None:
-        raise HTTPException(500, "ML модель не загружена")
-
     detection = db.query(models.Detection).filter(
         models.Detection.id == detection_id
     ).first()
@@ -313,25 +539,115 @@ async def update_detection(
     if len(photo_bytes) > 10 * 1024 * 1024:
         raise HTTPException(400, "Файл слишком большой (макс. 10MB)")
 
-    # Обновляем оригинальное фото
-    detection.photo = photo_bytes
+    # Вызываем ML модель для обработки (в процессе пула)
+    ml_result = await run_detection_processing(photo_bytes)
+    detection.confidence_level = ml_result['confidence_level']
 
-    # Вызываем ML модель для обработки
-    try:
-        ml_result = process_image_with_ml(photo_bytes)
-        detection.detection_photo = ml_result['processed_image']
-        detection.confidence_level = ml_result['confidence_level']
+    print(f"Обновлено изображение: confidence: {detection.confidence_level}")
 
-        print(f"Обновлено изображение: confidence: {detection.confidence_level}")
-
-    except Exception as e:
-        raise HTTPException(500, f"Ошибка обработки ML моделью: {str(e)}")
+    # Заменяем фото в хранилище блобов; старые блобы удаляются, если на них больше нет ссылок
+    old_blob_keys = [detection.photo_hash, detection.detection_photo_hash]
+    try:
+        store_detection_photos(detection, photo_bytes, ml_result['processed_image'],
+                               ml_result.get('width'), ml_result.get('height'))
+    except OSError as e:
+        raise HTTPException(500, f"Ошибка сохранения фото: {str(e)}")
 
     db.commit()
     db.refresh(detection)
+    release_blobs(db, old_blob_keys)
 
     return {
         "message": "Детекция обновлена",
         "detection_id": detection_id,
         "confidence_level": detection.confidence_level
-    }
\ No newline at end of file
+    }
+
+def _image_size(image_bytes: bytes):
+    """Ширина и высота изображения (PIL читает только заголовок)"""
+    from PIL import Image
+
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            return image.size
+    except Exception:
+        return None, None
+
+
+def migrate_detection_blobs(db: Session, batch_size: int = 20) -> int:
+    """
+    Перенос фото из колонок photo/detection_photo в хранилище блобов пачками
+    (по batch_size детекций на транзакцию). Повторный запуск продолжает с оставшихся строк
+
+    Returns:
+        int: число перенесенных детекций
+    """
+    migrated = 0
+    while True:
+        detections = db.query(models.Detection).options(
+            undefer(models.Detection.photo), undefer(models.Detection.detection_photo)
+        ).filter(
+            or_(models.Detection.photo.isnot(None), models.Detection.detection_photo.isnot(None))
+        ).order_by(models.Detection.id).limit(batch_size).all()
+        if not detections:
+            break
+
+        for detection in detections:
+            if detection.photo is not None:
+                detection.photo_hash = blob_store.put(detection.photo)
+                detection.photo_size = len(detection.photo)
+                detection.photo_width, detection.photo_height = _image_size(detection.photo)
+            if detection.detection_photo is not None:
+                detection.detection_photo_hash = blob_store.put(detection.detection_photo)
+                detection.detection_photo_size = len(detection.detection_photo)
+            detection.photo = None
+            detection.detection_photo = None
+        db.commit()
+        db.expunge_all()
+
+        migrated += len(detections)
+        print(f"📦 Перенесено детекций в хранилище блобов: {migrated}")
+    return migrated
+
+
+def collect_orphan_blobs(db: Session, min_age_seconds: Optional[float] = None) -> int:
+    """
+    Удаление блобов, на которые не ссылается ни одна детекция (например, после каскадного
+    удаления теплиц). Недавние блобы не трогаются: строка детекции может быть еще не закоммичена
+    """
+    min_age_seconds = BLOB_MIN_AGE_SECONDS if min_age_seconds is None else min_age_seconds
+    referenced = detection_blob_keys(db)
+    threshold = time.time() - min_age_seconds
+    removed = 0
+    for key in list(blob_store.keys()):
+        if key not in referenced and blob_store.modified_time(key) < threshold:
+            blob_store.delete(key)
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    # Обслуживание хранилища фото:
+    # python -m crud.detections migrate-blobs [размер пачки] - перенос фото из БД в хранилище
+    # python -m crud.detections gc-blobs - удаление блобов без ссылок
+    from database import SessionLocal, engine
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate-blobs"
+    session = SessionLocal()
+    try:
+        if command == "migrate-blobs":
+            models.ensure_columns(engine)
+            models.ensure_indexes(engine)
+            count = migrate_detection_blobs(session, int(sys.argv[2]) if len(sys.argv) > 2 else 20)
+            print(f"✅ Перенос завершен: {count} детекций")
+        elif command == "gc-blobs":
+            print(f"✅ Удалено блобов без ссылок: {collect_orphan_blobs(session)}")
+        else:
+            print(f"❌ Неизвестная команда: {command}")
+            sys.exit(1)
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Ошибка обслуживания хранилища фото: {e}")
+        raise
+    finally:
+        session.close()
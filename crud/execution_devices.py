@@ -5,6 +5,7 @@ import models
 import schemas
 from fastapi import APIRouter, Depends, HTTPException, Query
 from database import get_db
+from topology import topology_cache
 
 router = APIRouter(
     prefix="/execution_devices",
@@ -53,6 +54,7 @@ def create_device_db(content: schemas.ExecutionDeviceCreate, db: Session):
     db.add(db_execdev)
     db.commit()
     db.refresh(db_execdev)
+    topology_cache.upsert_device(db_execdev)
     return db_execdev
 
 def read_device_db(id: int, db: Session):
@@ -70,6 +72,7 @@ def update_device_db(content: schemas.ExecutionDeviceUpdate, id: int, db: Sessio
             setattr(db_updated, field, value)
         db.commit()
         db.refresh(db_updated)
+        topology_cache.upsert_device(db_updated)
     return db_updated
 
 def delete_device_db(id: int, db: Session):
@@ -77,6 +80,7 @@ def delete_device_db(id: int, db: Session):
     if db_deleted:
         db.delete(db_deleted)
         db.commit()
+        topology_cache.remove_device(id)
     return db_deleted
 
 def get_executive_devices_by_greenhouse_db(greenhouse_id: int, db: Session):
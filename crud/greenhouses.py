@@ -4,6 +4,9 @@ import models
 import schemas
 from fastapi import APIRouter, Depends, HTTPException, Query
 from database import get_db
+from topology import topology_cache
+from report_cache import latest_report_cache
+from crud.detections import detection_blob_keys, release_blobs
 
 router = APIRouter(
     prefix="/greenhouses",
@@ -56,6 +59,7 @@ def create_greenhouse_db(db: Session, greenhouse: schemas.GreenhouseCreate):
     db.add(db_greenhouse)
     db.commit()
     db.refresh(db_greenhouse)
+    topology_cache.upsert_greenhouse(db_greenhouse)
     return db_greenhouse
 
 def update_greenhouse_db(db: Session, greenhouse_id: int, greenhouse_update: schemas.GreenhouseUpdate):
@@ -66,11 +70,16 @@ def update_greenhouse_db(db: Session, greenhouse_id: int, greenhouse_update: sch
             setattr(db_greenhouse, field, value)
         db.commit()
         db.refresh(db_greenhouse)
+        topology_cache.upsert_greenhouse(db_greenhouse)
     return db_greenhouse
 
 def delete_greenhouse_db(db: Session, greenhouse_id: int):
     db_greenhouse = db.query(models.Greenhouse).filter(models.Greenhouse.greenhouse_id == greenhouse_id).first()
     if db_greenhouse:
+        blob_keys = detection_blob_keys(db, greenhouse_id)
         db.delete(db_greenhouse)
         db.commit()
+        release_blobs(db, blob_keys)
+        topology_cache.remove_greenhouse(greenhouse_id)
+        latest_report_cache.forget_greenhouse(greenhouse_id)
     return db_greenhouse
\ No newline at end of file
@@ -1,12 +1,24 @@
-from datetime import datetime
-from sqlalchemy import desc
-from typing import List, Optional, Dict
+import csv
+import io
+import json
+import numpy as np
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import BigInteger, Integer, and_, cast, desc, extract, func, insert, literal_column, select, text
+from typing import List, Optional, Dict, Literal
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.exc import OperationalError
 from database import get_db
+from report_writer import report_writer
+from pagination import keyset_page, set_next_cursor
+from report_cache import latest_report_cache
+from downsampling import downsample
+from crud.rollups import REPORT_METRICS, apply_report_rollups, check_metrics, delete_all_rollups_db, rebuild_rollups_db
 
 router = APIRouter(
     prefix="/reports",
@@ -15,14 +27,93 @@ router = APIRouter(
 
 @router.get("/", response_model=List[schemas.ReportRead])
 def read_reports(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     greenhouse_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor (вместо skip)"),
     db: Session = Depends(get_db)
 ):
-    reports = get_reports_db(db, skip=skip, limit=limit, greenhouse_id=greenhouse_id)
+    reports = get_reports_db(db, skip=skip, limit=limit, greenhouse_id=greenhouse_id, cursor=cursor)
+    set_next_cursor(response, reports, limit, "report_time")
     return reports
 
+@router.get("/export")
+def export_reports(
+    greenhouse_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: Session = Depends(get_db)
+):
+    """
+    Выгрузка отчетов теплицы за период [start, end) потоком NDJSON или CSV.
+    Строки читаются серверным курсором пачками, память не зависит от размера периода
+    """
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        iter_reports_export(db, greenhouse_id, start, end, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="reports_{greenhouse_id}.{format}"'},
+    )
+
+
+@router.get("/aggregate", response_model=List[schemas.ReportAggregateBucket])
+def read_reports_aggregate(
+    greenhouse_id: int,
+    start: datetime,
+    end: datetime,
+    width: Literal["1m", "5m", "1h", "1d"] = "1h",
+    metrics: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Min/avg/max показателей теплицы по интервалам заданной ширины за период [start, end).
+    Считается в БД (GROUP BY по усеченному времени); пустые интервалы не возвращаются
+    """
+    metrics = check_metrics(metrics)
+    start, end = start.replace(tzinfo=None), end.replace(tzinfo=None)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be earlier than end")
+    if (end - start).total_seconds() / AGGREGATE_WIDTHS[width] > AGGREGATE_MAX_BUCKETS:
+        raise HTTPException(status_code=400,
+                            detail=f"Too many buckets, at most {AGGREGATE_MAX_BUCKETS} allowed; use a wider bucket")
+    return get_reports_aggregate_db(db, greenhouse_id, start, end, AGGREGATE_WIDTHS[width], metrics)
+
+
+@router.get("/series", response_model=schemas.ReportSeries)
+def read_report_series(
+    greenhouse_id: int,
+    metric: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(500, ge=3, le=10000),
+    method: Literal["lttb", "minmax"] = "lttb",
+    db: Session = Depends(get_db)
+):
+    """
+    Ряд показателя теплицы за период [start, end), прореженный до points точек
+    (LTTB или min/max по интервалам) для построения графиков
+    """
+    metric = check_metrics([metric])[0]
+    times, values = get_report_series_db(db, greenhouse_id, metric, start, end)
+    indices = downsample(times, values, points, method)
+    return {
+        "greenhouse_id": greenhouse_id,
+        "metric": metric,
+        "method": method,
+        "source_points": int(times.shape[0]),
+        "timestamps": times[indices].astype("datetime64[us]").tolist(),
+        "values": values[indices].tolist(),
+    }
+
+
+@router.get("/writer/stats")
+def read_report_writer_stats():
+    """Состояние группового писателя отчетов: очередь, время записи, файл отложенных отчетов"""
+    return report_writer.stats()
+
+
 @router.get("/{report_id}", response_model=schemas.ReportRead)
 def read_report(report_id: int, db: Session = Depends(get_db)):
     db_report = get_report_db(db, report_id=report_id)
@@ -33,27 +124,50 @@ def read_report(report_id: int, db: Session = Depends(get_db)):
 
 @router.get("/greenhouse/{greenhouse_id}/latest", response_model=schemas.ReportRead)
 def read_latest_report(greenhouse_id: int, db: Session = Depends(get_db)):
+    # Последний отчет обычно уже в кэше: его обновляет каждая запись отчетов
+    cached_report = latest_report_cache.get(greenhouse_id)
+    if cached_report is not None:
+        return cached_report
+
     db_report = get_latest_report_db(db, greenhouse_id=greenhouse_id)
     if db_report is None:
         raise HTTPException(status_code=404, detail="No reports found for this greenhouse")
+    latest_report_cache.offer(_report_dict(db_report))
     return db_report
 
 
 @router.get("/greenhouse/{greenhouse_id}", response_model=List[schemas.ReportRead])
 def read_reports_by_greenhouse(
     greenhouse_id: int,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor (вместо skip)"),
     db: Session = Depends(get_db)
 ):
-    reports = get_reports_by_greenhouse_db(db, greenhouse_id=greenhouse_id, skip=skip, limit=limit)
+    reports = get_reports_by_greenhouse_db(db, greenhouse_id=greenhouse_id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, reports, limit, "report_time")
     return reports
 
 
 
 @router.post("/", response_model=schemas.ReportRead)
 def create_report(report: schemas.ReportCreate, db: Session = Depends(get_db)):
-    return create_report_db(db=db, report=report)
+    try:
+        check_greenhouse_exists_db(db, report.greenhouse_id)
+    except OperationalError as e:
+        # БД недоступна: отчет будет сохранен писателем в файл и проверен при переносе
+        print(f"⚠️ Не удалось проверить теплицу {report.greenhouse_id}: {e}")
+
+    row = report.model_dump()
+    [report_id] = report_writer.write(db, [row])
+    if report_id is None:
+        return JSONResponse(
+            status_code=202,
+            content={"message": "База данных недоступна, отчет сохранен и будет записан позже", "spilled": True},
+        )
+    # Отчет в том виде, в каком его сохранила БД (DATETIME без пояса, MySQL округляет микросекунды)
+    return get_report_db(db, report_id)
 
 
 @router.put("/{report_id}", response_model=schemas.ReportRead)
@@ -85,6 +199,61 @@ def delete_report(db: Session = Depends(get_db)):
             detail=f"Ошибка при очистке таблицы: {str(e)}"
         )
 
+# Строк, читаемых из курсора за раз при выгрузке
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_COLUMNS = [column.name for column in models.Report.__table__.columns]
+
+
+def _export_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_reports_export(db: Session, greenhouse_id: int, start: Optional[datetime], end: Optional[datetime],
+                        format: str = "ndjson"):
+    """
+    Генератор кусков выгрузки (bytes), по куску на пачку строк. Использует отдельную сессию
+    на том же подключении: сессия запроса может быть закрыта до окончания передачи ответа
+    """
+    query = select(*[models.Report.__table__.c[name] for name in EXPORT_COLUMNS]) \
+        .where(models.Report.greenhouse_id == greenhouse_id)
+    if start is not None:
+        query = query.where(models.Report.report_time >= start)
+    if end is not None:
+        query = query.where(models.Report.report_time < end)
+    query = query.order_by(models.Report.report_time, models.Report.id)
+
+    export_db = Session(bind=db.get_bind())
+    try:
+        # yield_per включает stream_results: строки не буферизуются драйвером целиком
+        result = export_db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue().encode()
+
+        for partition in result.partitions():
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows([[_export_value(value) for value in row] for row in partition])
+                chunk = buffer.getvalue()
+            else:
+                chunk = "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, map(_export_value, row))), ensure_ascii=False) + "\n"
+                    for row in partition
+                )
+            yield chunk.encode()
+    finally:
+        export_db.close()
+
+
 # Основные CRUD функции
 def get_report_db(db: Session, report_id: int):
     return db.query(models.Report).filter(models.Report.id == report_id).first()
@@ -94,48 +263,166 @@ def get_reports_db(
         db: Session,
         skip: int = 0,
         limit: int = 100,
-        greenhouse_id: Optional[int] = None
+        greenhouse_id: Optional[int] = None,
+        cursor: Optional[str] = None
 ):
     query = db.query(models.Report)
 
     if greenhouse_id is not None:
         query = query.filter(models.Report.greenhouse_id == greenhouse_id)
 
-    return query.order_by(desc(models.Report.report_time)).offset(skip).limit(limit).all()
+    return keyset_page(query, models.Report.report_time, models.Report.id, limit, cursor=cursor, skip=skip)
 
 
-def create_report_db(db: Session, report: schemas.ReportCreate):
-    # Проверяем существование теплицы
-    greenhouse = db.query(models.Greenhouse).filter(
-        models.Greenhouse.greenhouse_id == report.greenhouse_id
+def check_greenhouse_exists_db(db: Session, greenhouse_id: int):
+    greenhouse = db.query(models.Greenhouse.greenhouse_id).filter(
+        models.Greenhouse.greenhouse_id == greenhouse_id
     ).first()
 
     if not greenhouse:
         raise HTTPException(status_code=400, detail="Greenhouse not found")
 
-    db_report = models.Report(**report.model_dump())
+
+def create_report_db(db: Session, report: schemas.ReportCreate):
+    # Проверяем существование теплицы
+    check_greenhouse_exists_db(db, report.greenhouse_id)
+
+    row = report.model_dump()
+    db_report = models.Report(**row)
     db.add(db_report)
+    apply_report_rollups(db, [row])
     db.commit()
     db.refresh(db_report)
+    latest_report_cache.offer(_report_dict(db_report))
     return db_report
 
 
+def _report_dict(db_report: models.Report) -> dict:
+    return schemas.ReportRead.model_validate(db_report, from_attributes=True).model_dump()
+
+
+# Строк в одном INSERT (ограничение числа параметров запроса, у SQLite - 32766)
+BULK_INSERT_CHUNK_SIZE = 500
+
+# Шаг автоинкремента MySQL (auto_increment_increment), читается один раз
+_mysql_autoinc_step: Optional[int] = None
+
+
+def _inserted_ids(db: Session, result, count: int) -> List[int]:
+    """id строк multi-row INSERT без RETURNING: MySQL возвращает id первой строки"""
+    global _mysql_autoinc_step
+    if _mysql_autoinc_step is None:
+        _mysql_autoinc_step = int(db.execute(text("SELECT @@auto_increment_increment")).scalar() or 1)
+    # Для "simple insert" InnoDB выделяет id всем строкам одного запроса подряд
+    first_id = result.lastrowid
+    return list(range(first_id, first_id + count * _mysql_autoinc_step, _mysql_autoinc_step))
+
+
+def create_reports_bulk_db(db: Session, rows: List[dict], greenhouse_ids=None) -> List[int]:
+    """
+    Запись пачки отчетов multi-row INSERT-ами в одной транзакции
+
+    Args:
+        rows: поля отчетов (как schemas.ReportCreate.model_dump())
+        greenhouse_ids: известные id теплиц для проверки без запроса к БД
+            (если не заданы - проверку выполняет внешний ключ)
+
+    Returns:
+        List[int]: id созданных отчетов в порядке rows
+    """
+    if not rows:
+        return []
+
+    if greenhouse_ids is not None:
+        unknown = {row["greenhouse_id"] for row in rows if row["greenhouse_id"] not in greenhouse_ids}
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Greenhouse not found: {sorted(unknown)}")
+
+    table = models.Report.__table__
+    # У всех строк одного INSERT должен быть одинаковый набор колонок
+    columns = [column.name for column in table.columns if column.name != "id"]
+    values = [{column: row.get(column) for column in columns} for row in rows]
+    supports_returning = db.get_bind().dialect.insert_returning
+
+    ids = []
+    try:
+        for start in range(0, len(values), BULK_INSERT_CHUNK_SIZE):
+            chunk = values[start:start + BULK_INSERT_CHUNK_SIZE]
+            stmt = insert(table).values(chunk)
+            if supports_returning:
+                # Порядок строк RETURNING не гарантирован, а автоинкремент растет в порядке VALUES
+                ids.extend(sorted(db.execute(stmt.returning(table.c.id)).scalars().all()))
+            else:
+                ids.extend(_inserted_ids(db, db.execute(stmt), len(chunk)))
+        # Агрегаты обновляются в той же транзакции, что и вставка отчетов
+        apply_report_rollups(db, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    _offer_latest_reports(db, ids)
+    return ids
+
+
+def _offer_latest_reports(db: Session, ids: List[int]):
+    """
+    Передача в кэш последних по времени отчетов пачки в том виде, в каком их сохранила БД
+    (MySQL округляет микросекунды report_time): кэш отдает то же, что и чтение из БД
+    """
+    if not ids:
+        return
+    report = models.Report
+    in_batch = report.id.between(min(ids), max(ids))
+    latest = (
+        select(report.greenhouse_id, func.max(report.report_time).label("report_time"))
+        .where(in_batch)
+        .group_by(report.greenhouse_id)
+        .subquery()
+    )
+    db_reports = db.scalars(
+        select(report)
+        .join(latest, and_(report.greenhouse_id == latest.c.greenhouse_id,
+                           report.report_time == latest.c.report_time))
+        .where(in_batch)
+    ).all()
+    for db_report in db_reports:
+        latest_report_cache.offer(_report_dict(db_report))
+
+
 def update_report_db(db: Session, report_id: int, report_update: schemas.ReportUpdate):
     db_report = db.query(models.Report).filter(models.Report.id == report_id).first()
     if db_report:
         update_data = report_update.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_report, field, value)
+        db.flush()
+        _rebuild_report_day_rollups(db, db_report)
         db.commit()
         db.refresh(db_report)
+        # Если изменен закэшированный последний отчет - перечитаем его при следующем запросе
+        cached_report = latest_report_cache.get(db_report.greenhouse_id)
+        if cached_report is not None and cached_report["id"] == db_report.id:
+            latest_report_cache.forget_report(db_report.greenhouse_id, db_report.id)
+        else:
+            latest_report_cache.offer(_report_dict(db_report))
     return db_report
 
 
+def _rebuild_report_day_rollups(db: Session, db_report: models.Report):
+    """Пересчет агрегатов суток отчета после его изменения или удаления (min/max нельзя уменьшить)"""
+    if db_report.report_time is not None:
+        rebuild_rollups_db(db, db_report.report_time, db_report.report_time, greenhouse_id=db_report.greenhouse_id)
+
+
 def delete_report_id_db(db: Session, report_id: int):
     db_report = db.query(models.Report).filter(models.Report.id == report_id).first()
     if db_report:
         db.delete(db_report)
+        db.flush()
+        _rebuild_report_day_rollups(db, db_report)
         db.commit()
+        latest_report_cache.forget_report(db_report.greenhouse_id, report_id)
     return db_report
 
 def delete_all_reports_db(db: Session):
@@ -143,7 +430,9 @@ def delete_all_reports_db(db: Session):
     try:
         # Удаляем все записи из таблицы
         deleted_count = db.query(models.Report).delete()
+        delete_all_rollups_db(db)
         db.commit()
+        latest_report_cache.clear()
         return deleted_count  # Возвращаем количество удаленных записей
     except Exception as e:
         db.rollback()
@@ -155,27 +444,110 @@ def get_reports_by_greenhouse_db(
         db: Session,
         greenhouse_id: int,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
 ):
-    return (
-        db.query(models.Report)
-        .filter(models.Report.greenhouse_id == greenhouse_id)
-        .order_by(desc(models.Report.report_time))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    query = db.query(models.Report).filter(models.Report.greenhouse_id == greenhouse_id)
+    return keyset_page(query, models.Report.report_time, models.Report.id, limit, cursor=cursor, skip=skip)
 
 
 def get_latest_report_db(db: Session, greenhouse_id: int):
     return (
         db.query(models.Report)
         .filter(models.Report.greenhouse_id == greenhouse_id)
-        .order_by(desc(models.Report.report_time))
+        .order_by(desc(models.Report.report_time), desc(models.Report.id))
         .first()
     )
 
 
+# Ширина интервала агрегации -> секунд
+AGGREGATE_WIDTHS = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+AGGREGATE_MAX_BUCKETS = 10000
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_seconds(db: Session, column):
+    """Секунды от 1970-01-01 для времени без пояса (выражение под диалект БД)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        # TIMESTAMPDIFF не зависит от часового пояса сессии, в отличие от UNIX_TIMESTAMP
+        return func.timestampdiff(literal_column("SECOND"), literal_column("'1970-01-01 00:00:00'"), column)
+    if dialect == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    if dialect == "postgresql":
+        return cast(extract("epoch", column), BigInteger)
+    raise HTTPException(status_code=400, detail=f"Aggregation is not supported for {dialect}")
+
+
+def get_reports_aggregate_db(db: Session, greenhouse_id: int, start: datetime, end: datetime,
+                             width_seconds: int, metrics: List[str] = REPORT_METRICS) -> List[dict]:
+    """
+    Агрегаты отчетов по интервалам width_seconds, выровненным от 1970-01-01.
+    Строки отчетов не передаются в приложение - только по строке на интервал
+    """
+    seconds = _epoch_seconds(db, models.Report.report_time)
+    # Ширина - литерал, а не параметр: выражение в SELECT и GROUP BY должно совпадать текстуально
+    width = literal_column(str(int(width_seconds)))
+    bucket = (seconds - seconds % width).label("bucket")
+    columns = [bucket, func.count(models.Report.id).label("count")]
+    for metric in metrics:
+        column = getattr(models.Report, metric)
+        columns += [func.min(column), func.avg(column), func.max(column)]
+
+    rows = db.execute(
+        select(*columns)
+        .where(
+            models.Report.greenhouse_id == greenhouse_id,
+            models.Report.report_time >= start,
+            models.Report.report_time < end,
+        )
+        .group_by(bucket)
+        .order_by(bucket)
+    ).all()
+
+    buckets = []
+    for row in rows:
+        values = [float(value) if value is not None else None for value in row[2:]]
+        buckets.append({
+            "bucket_start": EPOCH + timedelta(seconds=int(row.bucket)),
+            "count": row.count,
+            "metrics": {
+                metric: dict(zip(("min", "avg", "max"), values[i * 3:i * 3 + 3]))
+                for i, metric in enumerate(metrics)
+            },
+        })
+    return buckets
+
+
+def get_report_series_db(db: Session, greenhouse_id: int, metric: str, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None):
+    """
+    Время и значения показателя по возрастанию времени (строки с NULL пропускаются).
+    Читаются только две колонки, без ORM-объектов
+
+    Returns:
+        tuple: (np.ndarray int64 - микросекунды от эпохи, np.ndarray float64 - значения)
+    """
+    column = getattr(models.Report, metric)
+    query = select(models.Report.report_time, column).where(
+        models.Report.greenhouse_id == greenhouse_id,
+        models.Report.report_time.isnot(None),
+        column.isnot(None),
+    )
+    if start is not None:
+        query = query.where(models.Report.report_time >= start.replace(tzinfo=None))
+    if end is not None:
+        query = query.where(models.Report.report_time < end.replace(tzinfo=None))
+    rows = db.execute(query.order_by(models.Report.report_time, models.Report.id)).all()
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    times, values = zip(*rows)
+    times = np.array([moment.replace(tzinfo=None) for moment in times], dtype="datetime64[us]").astype(np.int64)
+    return times, np.array(values, dtype=np.float64)
+
+
 def get_reports_by_time_range_db(
         db: Session,
         greenhouse_id: int,
@@ -208,8 +580,14 @@ def create_report_row(db: Session, row_data: dict):
         db_report = models.Report(**row_data)
 
         db.add(db_report)
-        db.commit()
+        db.flush()
         db.refresh(db_report)
+        apply_report_rollups(db, [{
+            "greenhouse_id": db_report.greenhouse_id,
+            "report_time": db_report.report_time,
+            **{metric: getattr(db_report, metric) for metric in REPORT_METRICS},
+        }])
+        db.commit()
         return db_report
 
     except Exception as e:
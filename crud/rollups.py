@@ -0,0 +1,382 @@
+import math
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from database import get_db
+
+router = APIRouter(
+    prefix="/reports/rollups",
+    tags=["reports"],
+)
+
+# Колонки отчета, по которым считаются агрегаты
+REPORT_METRICS = (
+    "temperature_value", "humidity_value", "co2_value",
+    "temperature_pred", "humidity_pred", "co2_pred",
+    "command_temperature", "command_humidity", "command_co2",
+)
+
+ROLLUP_MODELS = {
+    "hourly": models.ReportRollupHourly,
+    "daily": models.ReportRollupDaily,
+}
+
+# Строк в одном INSERT ... ON DUPLICATE KEY / ON CONFLICT
+ROLLUP_UPSERT_CHUNK_SIZE = 500
+
+# СУБД, в которых агрегаты обновляются одним upsert-запросом (в остальных - через ORM)
+UPSERT_DIALECTS = ("mysql", "sqlite", "postgresql")
+
+
+@router.get("/summary", response_model=schemas.RollupSummary)
+def read_rollup_summary(
+    greenhouse_id: int,
+    start: datetime,
+    end: datetime,
+    metrics: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Агрегаты за произвольный период (с точностью до часа): целые сутки берутся
+    из суточных агрегатов, остальные часы - из часовых, сырые отчеты не читаются
+    """
+    metrics = check_metrics(metrics)
+    start, end = hour_start(start).replace(tzinfo=None), _hour_ceil(end).replace(tzinfo=None)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be earlier than end")
+
+    return {
+        "greenhouse_id": greenhouse_id,
+        "start": start,
+        "end": end,
+        "metrics": get_rollup_summary_db(db, greenhouse_id, start, end, metrics),
+    }
+
+
+@router.get("/{granularity}", response_model=List[schemas.RollupBucket])
+def read_rollups(
+    granularity: Literal["hourly", "daily"],
+    greenhouse_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    metrics: Optional[List[str]] = Query(None),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """Часовые или суточные агрегаты теплицы за период [start, end), по возрастанию времени"""
+    metrics = check_metrics(metrics)
+    start = start.replace(tzinfo=None) if start is not None else None
+    end = end.replace(tzinfo=None) if end is not None else None
+    return get_rollups_db(db, granularity, greenhouse_id, start, end, metrics, limit)
+
+
+def check_metrics(metrics: Optional[List[str]]) -> List[str]:
+    if not metrics:
+        return list(REPORT_METRICS)
+    unknown = [metric for metric in metrics if metric not in REPORT_METRICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metrics: {unknown}")
+    return metrics
+
+
+def hour_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _hour_ceil(moment: datetime) -> datetime:
+    start = hour_start(moment)
+    return start if start == moment else start + timedelta(hours=1)
+
+
+BUCKET_FUNCTIONS = {
+    "hourly": hour_start,
+    "daily": day_start,
+}
+
+
+def aggregate_report_rows(rows: Iterable[dict], granularity: str) -> Dict[tuple, list]:
+    """
+    Агрегаты пачки отчетов
+
+    Returns:
+        dict: {(greenhouse_id, bucket_start, metric): [count, min, max, sum, sumsq]}
+    """
+    bucket_of = BUCKET_FUNCTIONS[granularity]
+    aggregates = {}
+    for row in rows:
+        report_time = row.get("report_time")
+        if report_time is None:
+            continue
+        # Границы интервалов храним без часового пояса, как и report_time в MySQL
+        bucket = bucket_of(report_time).replace(tzinfo=None)
+        for metric in REPORT_METRICS:
+            value = row.get(metric)
+            if value is None:
+                continue
+            value = float(value)
+            key = (row["greenhouse_id"], bucket, metric)
+            current = aggregates.get(key)
+            if current is None:
+                aggregates[key] = [1, value, value, value, value * value]
+            else:
+                current[0] += 1
+                current[1] = min(current[1], value)
+                current[2] = max(current[2], value)
+                current[3] += value
+                current[4] += value * value
+    return aggregates
+
+
+def _upsert_statement(db: Session, table, values: List[dict]):
+    """INSERT с прибавлением агрегатов к существующей строке (диалект MySQL, SQLite или PostgreSQL)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table).values(values)
+        new = stmt.inserted
+        least, greatest = func.least, func.greatest
+    else:
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            # В SQLite min/max от нескольких аргументов - скалярные функции
+            least, greatest = func.min, func.max
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            least, greatest = func.least, func.greatest
+        stmt = dialect_insert(table).values(values)
+        new = stmt.excluded
+
+    updates = {
+        "count": table.c["count"] + new["count"],
+        "min_value": least(table.c.min_value, new.min_value),
+        "max_value": greatest(table.c.max_value, new.max_value),
+        "sum_value": table.c.sum_value + new.sum_value,
+        "sumsq_value": table.c.sumsq_value + new.sumsq_value,
+    }
+    if dialect == "mysql":
+        return stmt.on_duplicate_key_update(**updates)
+    return stmt.on_conflict_do_update(index_elements=["greenhouse_id", "bucket_start", "metric"], set_=updates)
+
+
+def _merge_aggregates(db: Session, model, aggregates: Dict[tuple, list]):
+    """Слияние агрегатов для СУБД без upsert: чтение и обновление строк через ORM"""
+    for (greenhouse_id, bucket, metric), (count, low, high, total, total_sq) in aggregates.items():
+        rollup = db.get(model, (greenhouse_id, bucket, metric))
+        if rollup is None:
+            db.add(model(greenhouse_id=greenhouse_id, bucket_start=bucket, metric=metric, count=count,
+                         min_value=low, max_value=high, sum_value=total, sumsq_value=total_sq))
+        else:
+            rollup.count += count
+            rollup.min_value = min(rollup.min_value, low)
+            rollup.max_value = max(rollup.max_value, high)
+            rollup.sum_value += total
+            rollup.sumsq_value += total_sq
+    db.flush()
+
+
+def apply_report_rollups(db: Session, rows: List[dict]):
+    """
+    Добавление пачки отчетов к часовым и суточным агрегатам (в текущей транзакции,
+    коммит выполняет вызывающий код вместе со вставкой отчетов)
+    """
+    for granularity, model in ROLLUP_MODELS.items():
+        aggregates = aggregate_report_rows(rows, granularity)
+        if not aggregates:
+            continue
+        values = [
+            {
+                "greenhouse_id": greenhouse_id,
+                "bucket_start": bucket,
+                "metric": metric,
+                "count": count,
+                "min_value": low,
+                "max_value": high,
+                "sum_value": total,
+                "sumsq_value": total_sq,
+            }
+            for (greenhouse_id, bucket, metric), (count, low, high, total, total_sq) in aggregates.items()
+        ]
+        table = model.__table__
+        if db.get_bind().dialect.name not in UPSERT_DIALECTS:
+            _merge_aggregates(db, model, aggregates)
+            continue
+        for start in range(0, len(values), ROLLUP_UPSERT_CHUNK_SIZE):
+            db.execute(_upsert_statement(db, table, values[start:start + ROLLUP_UPSERT_CHUNK_SIZE]))
+
+
+def rebuild_rollups_db(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       greenhouse_id: Optional[int] = None, batch_size: int = 5000) -> int:
+    """
+    Пересчет агрегатов по сырым отчетам (backfill). Период расширяется до целых суток,
+    чтобы суточные агрегаты пересчитывались полностью. Коммит выполняет вызывающий код
+
+    Returns:
+        int: число обработанных отчетов
+    """
+    start = day_start(start) if start is not None else None
+    end = day_start(end) + timedelta(days=1) if end is not None else None
+
+    for model in ROLLUP_MODELS.values():
+        stmt = delete(model)
+        if greenhouse_id is not None:
+            stmt = stmt.where(model.greenhouse_id == greenhouse_id)
+        if start is not None:
+            stmt = stmt.where(model.bucket_start >= start)
+        if end is not None:
+            stmt = stmt.where(model.bucket_start < end)
+        db.execute(stmt)
+
+    columns = [models.Report.id, models.Report.greenhouse_id, models.Report.report_time]
+    columns += [getattr(models.Report, metric) for metric in REPORT_METRICS]
+    query = select(*columns).where(models.Report.report_time.isnot(None))
+    if greenhouse_id is not None:
+        query = query.where(models.Report.greenhouse_id == greenhouse_id)
+    if start is not None:
+        query = query.where(models.Report.report_time >= start)
+    if end is not None:
+        query = query.where(models.Report.report_time < end)
+
+    query = query.order_by(models.Report.report_time, models.Report.id).limit(batch_size)
+
+    processed = 0
+    last = None
+    # Отчеты читаются пачками по ключу (report_time, id); каждая пачка выбирается целиком до записи
+    # агрегатов в той же сессии (незавершенный потоковый курсор PyMySQL сбрасывается следующим запросом).
+    # Агрегаты пачек складываются так же, как при инкрементальном обновлении
+    while True:
+        page = query
+        if last is not None:
+            page = page.where(or_(
+                models.Report.report_time > last["report_time"],
+                and_(models.Report.report_time == last["report_time"], models.Report.id > last["id"]),
+            ))
+        rows = db.execute(page).mappings().all()
+        if not rows:
+            break
+        apply_report_rollups(db, rows)
+        processed += len(rows)
+        last = rows[-1]
+    return processed
+
+
+def _rollup_stats(count: int, low: float, high: float, total: float, total_sq: float) -> dict:
+    mean = total / count
+    return {
+        "count": count,
+        "min": low,
+        "max": high,
+        "mean": mean,
+        "std": math.sqrt(max(total_sq / count - mean * mean, 0.0)),
+        "sum": total,
+        "sumsq": total_sq,
+    }
+
+
+def get_rollups_db(db: Session, granularity: str, greenhouse_id: int, start: Optional[datetime],
+                   end: Optional[datetime], metrics: List[str], limit: int = 1000) -> List[dict]:
+    model = ROLLUP_MODELS[granularity]
+    buckets_query = select(model.bucket_start).where(model.greenhouse_id == greenhouse_id)
+    if start is not None:
+        buckets_query = buckets_query.where(model.bucket_start >= start)
+    if end is not None:
+        buckets_query = buckets_query.where(model.bucket_start < end)
+    buckets = db.scalars(buckets_query.distinct().order_by(model.bucket_start).limit(limit)).all()
+    if not buckets:
+        return []
+
+    rows = db.scalars(
+        select(model)
+        .where(model.greenhouse_id == greenhouse_id,
+               model.bucket_start >= buckets[0],
+               model.bucket_start <= buckets[-1],
+               model.metric.in_(metrics))
+        .order_by(model.bucket_start)
+    ).all()
+
+    result = {bucket: {"greenhouse_id": greenhouse_id, "bucket_start": bucket, "metrics": {}} for bucket in buckets}
+    for row in rows:
+        result[row.bucket_start]["metrics"][row.metric] = _rollup_stats(
+            row.count, row.min_value, row.max_value, row.sum_value, row.sumsq_value)
+    return list(result.values())
+
+
+def get_rollup_summary_db(db: Session, greenhouse_id: int, start: datetime, end: datetime,
+                          metrics: List[str]) -> Dict[str, dict]:
+    """Слияние агрегатов за [start, end): целые сутки - из суточных, края - из часовых"""
+    first_day = day_start(start) if start == day_start(start) else day_start(start) + timedelta(days=1)
+    last_day = day_start(end)
+
+    # Интервалы: (модель, начало, конец)
+    ranges = []
+    if first_day < last_day:
+        ranges.append((models.ReportRollupDaily, first_day, last_day))
+        ranges.append((models.ReportRollupHourly, start, first_day))
+        ranges.append((models.ReportRollupHourly, last_day, end))
+    else:
+        ranges.append((models.ReportRollupHourly, start, end))
+
+    merged = {}
+    for model, range_start, range_end in ranges:
+        if range_start >= range_end:
+            continue
+        rows = db.execute(
+            select(model.metric, func.sum(model.count), func.min(model.min_value), func.max(model.max_value),
+                   func.sum(model.sum_value), func.sum(model.sumsq_value))
+            .where(model.greenhouse_id == greenhouse_id,
+                   model.bucket_start >= range_start,
+                   model.bucket_start < range_end,
+                   model.metric.in_(metrics))
+            .group_by(model.metric)
+        ).all()
+        for metric, count, low, high, total, total_sq in rows:
+            current = merged.get(metric)
+            if current is None:
+                merged[metric] = [int(count), low, high, total, total_sq]
+            else:
+                current[0] += int(count)
+                current[1] = min(current[1], low)
+                current[2] = max(current[2], high)
+                current[3] += total
+                current[4] += total_sq
+
+    return {metric: _rollup_stats(*values) for metric, values in merged.items()}
+
+
+def delete_all_rollups_db(db: Session):
+    for model in ROLLUP_MODELS.values():
+        db.query(model).delete()
+
+
+if __name__ == "__main__":
+    # Пересчет агрегатов по существующим отчетам:
+    # python -m crud.rollups [начало ISO] [конец ISO] [id теплицы]
+    from database import SessionLocal, engine
+
+    args = sys.argv[1:]
+    backfill_start = datetime.fromisoformat(args[0]) if len(args) > 0 else None
+    backfill_end = datetime.fromisoformat(args[1]) if len(args) > 1 else None
+    backfill_greenhouse = int(args[2]) if len(args) > 2 else None
+
+    models.Base.metadata.create_all(bind=engine, tables=[model.__table__ for model in ROLLUP_MODELS.values()])
+    session = SessionLocal()
+    try:
+        processed_reports = rebuild_rollups_db(session, backfill_start, backfill_end, backfill_greenhouse)
+        session.commit()
+        print(f"✅ Агрегаты пересчитаны по {processed_reports} отчетам")
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Ошибка пересчета агрегатов: {e}")
+        raise
+    finally:
+        session.close()
@@ -4,6 +4,7 @@ import models
 import schemas
 from fastapi import APIRouter, Depends, HTTPException, Query
 from database import get_db
+from topology import topology_cache
 
 router = APIRouter(
     prefix="/sensors",
@@ -64,6 +65,7 @@ def create_sensor_db(db: Session, sensor: schemas.SensorCreate):
     db.add(db_sensor)
     db.commit()
     db.refresh(db_sensor)
+    topology_cache.upsert_sensor(db_sensor)
     return db_sensor
 
 def update_sensor_db(db: Session, sensor_id: int, sensor_update: schemas.SensorUpdate):
@@ -74,6 +76,7 @@ def update_sensor_db(db: Session, sensor_id: int, sensor_update: schemas.SensorU
             setattr(db_sensor, field, value)
         db.commit()
         db.refresh(db_sensor)
+        topology_cache.upsert_sensor(db_sensor)
     return db_sensor
 
 def delete_sensor_db(db: Session, sensor_id: int):
@@ -81,6 +84,7 @@ def delete_sensor_db(db: Session, sensor_id: int):
     if db_sensor:
         db.delete(db_sensor)
         db.commit()
+        topology_cache.remove_sensor(sensor_id)
     return db_sensor
 
 def get_sensor_info(db: Session, sensor_id: int) -> Optional[dict]:
@@ -103,4 +107,4 @@ def get_greenhouse_info(db: Session, greenhouse_id: int) -> Optional[dict]:
             'location': greenhouse.location,
             'description': greenhouse.description
         }
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,78 @@
+import numpy as np
+
+# Методы прореживания рядов для графиков
+DOWNSAMPLING_METHODS = ("lttb", "minmax")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: индексы не более threshold точек, сохраняющих форму ряда
+
+    Первая и последняя точки сохраняются; остальные делятся на threshold - 2 корзины,
+    из каждой берется точка, образующая наибольший треугольник с выбранной точкой
+    предыдущей корзины и средней точкой следующей. Цикл идет по корзинам,
+    внутри корзины расчет векторный
+
+    Args:
+        x: время (по возрастанию), y: значения
+        threshold: максимальное число точек
+
+    Returns:
+        np.ndarray: индексы выбранных точек по возрастанию
+    """
+    n = x.shape[0]
+    if threshold >= n or n <= 2:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])[:threshold]
+
+    x = x.astype(np.float64) - x[0]
+    y = y.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = (edges[i + 1], edges[i + 2]) if i + 2 < edges.shape[0] else (n - 1, n)
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Минимум и максимум в каждой из threshold // 2 равных по времени корзин ("пикселей").
+    Полностью векторный; сохраняет выбросы, которые LTTB может сгладить
+
+    Returns:
+        np.ndarray: индексы не более threshold точек по возрастанию
+    """
+    n = x.shape[0]
+    if threshold >= n or n <= 2:
+        return np.arange(n)
+
+    buckets = max(threshold // 2, 1)
+    x = x.astype(np.float64)
+    edges = np.linspace(x[0], x[-1], buckets + 1)
+    bucket = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, buckets - 1)
+
+    # Внутри корзины - по возрастанию значения: первая точка группы - минимум, последняя - максимум
+    order = np.lexsort((y, bucket))
+    sorted_buckets = bucket[order]
+    starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+def downsample(x: np.ndarray, y: np.ndarray, threshold: int, method: str = "lttb") -> np.ndarray:
+    """Индексы точек ряда после прореживания выбранным методом"""
+    if method == "lttb":
+        return lttb(x, y, threshold)
+    if method == "minmax":
+        return minmax(x, y, threshold)
+    raise ValueError(f"Неизвестный метод прореживания: {method}")
@@ -0,0 +1,99 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Полный набор признаков моделей теплицы (модели используют его целиком или префикс)
+FEATURE_NAMES = [
+    'greenhous_temperature_celsius',
+    'greenhouse_humidity_percentage',
+    'greenhouse_illuminance_lux',
+    'online_temperature_celsius',
+    'online_humidity_percentage',
+    'greenhouse_total_volatile_organic_compounds_ppb',
+    'greenhouse_equivalent_co2_ppm',
+    'hour_sin',
+    'hour_cos',
+    'minute_sin',
+    'minute_cos',
+    'day_of_week_sin',
+    'day_of_week_cos',
+    'day_of_month_sin',
+    'day_of_month_cos',
+    'month_sin',
+    'month_cos',
+    'day_of_year_sin',
+    'day_of_year_cos',
+]
+
+# Значение ЛОС, которое не измеряется датчиками
+TVOC_PPB = 200.0
+
+
+def calendar_features(report_time: datetime) -> Dict[str, float]:
+    """Календарные признаки (sin/cos времени), общие для всех теплиц тика"""
+    periods = {
+        'hour': (report_time.hour, 24),
+        'minute': (report_time.minute, 60),
+        'day_of_week': (report_time.weekday(), 7),
+        'day_of_month': (report_time.day - 1, 31),
+        'month': (report_time.month - 1, 12),
+        'day_of_year': (report_time.timetuple().tm_yday - 1, 365),
+    }
+
+    features = {}
+    for name, (value, period) in periods.items():
+        angle = 2 * np.pi * value / period
+        features[f'{name}_sin'] = float(np.sin(angle))
+        features[f'{name}_cos'] = float(np.cos(angle))
+    return features
+
+
+def generate_illuminance(report_time: datetime, size: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Освещенность по времени суток (лк) для size теплиц"""
+    uniform = rng.uniform if rng is not None else np.random.uniform
+    if 6 <= report_time.hour < 23:
+        return uniform(800, 2000, size=size)
+    return uniform(0, 50, size=size)
+
+
+def build_feature_matrix(report_time: datetime, temperature, humidity, co2, feature_names: List[str],
+                         illuminance=None, calendar: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Матрица признаков для всех теплиц (строка на теплицу) в порядке feature_names модели
+
+    Args:
+        report_time: время отчета
+        temperature, humidity, co2: массивы показаний длины n
+        feature_names: порядок признаков модели
+        illuminance: массив освещенности длины n (если не задан - генерируется)
+        calendar: заранее посчитанные calendar_features(report_time)
+
+    Returns:
+        np.ndarray: непрерывная float32 матрица формы (n, len(feature_names))
+    """
+    temperature = np.asarray(temperature, dtype=np.float32)
+    humidity = np.asarray(humidity, dtype=np.float32)
+    co2 = np.asarray(co2, dtype=np.float32)
+    n = temperature.shape[0]
+
+    if illuminance is None:
+        illuminance = generate_illuminance(report_time, n)
+    if calendar is None:
+        calendar = calendar_features(report_time)
+
+    columns = {
+        'greenhous_temperature_celsius': temperature,
+        'greenhouse_humidity_percentage': humidity,
+        'greenhouse_illuminance_lux': illuminance,
+        'online_temperature_celsius': temperature - 2.0,
+        'online_humidity_percentage': humidity - 5.0,
+        'greenhouse_total_volatile_organic_compounds_ppb': TVOC_PPB,
+        'greenhouse_equivalent_co2_ppm': co2,
+    }
+
+    matrix = np.empty((n, len(feature_names)), dtype=np.float32)
+    for i, feature in enumerate(feature_names):
+        # Календарные признаки одинаковы для всех строк и заполняются скаляром
+        matrix[:, i] = columns[feature] if feature in columns else calendar[feature]
+    return matrix
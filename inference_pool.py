@@ -0,0 +1,261 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# Настройки пула (переопределяются переменными окружения)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))  # 0 - инференс в вызывающем потоке
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "16"))
+INFERENCE_TIMEOUT_SECONDS = float(os.getenv("INFERENCE_TIMEOUT_SECONDS", "30"))
+
+
+class PoolBusyError(Exception):
+    """Очередь пула заполнена (backpressure)"""
+
+
+class WorkerPool:
+    """
+    Пул процессов с ограниченной очередью: одновременно в работе и в очереди
+    не более max_workers + max_pending задач, остальные получают PoolBusyError
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int, timeout: float,
+                 initializer: Optional[Callable] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._initializer = initializer
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self) -> Optional[ProcessPoolExecutor]:
+        """Запуск процессов (модели загружаются в initializer один раз на процесс); возвращает текущий пул"""
+        with self._lock:
+            if self._executor is None and self.max_workers > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self._initializer,
+                )
+                print(f"✅ Пул {self.name} запущен: {self.max_workers} процессов")
+            return self._executor
+
+    def warm_up(self):
+        """Запуск всех процессов пула заранее, чтобы первый тик не ждал загрузки моделей"""
+        if self.max_workers <= 0:
+            if self._initializer is not None:
+                self._initializer()
+            return
+        self.start()
+        futures = [self._executor.submit(_noop) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result(timeout=self.timeout)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            print(f"Пул {self.name} остановлен")
+
+    def submit(self, fn: Callable, *args, block: bool = True) -> Future:
+        """
+        Отправка задачи в пул. При заполненной очереди ждет свободного места
+        не дольше timeout (block=True) или сразу отказывает (block=False)
+        """
+        acquired = self._slots.acquire(timeout=self.timeout) if block else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise PoolBusyError(f"Очередь пула {self.name} заполнена")
+
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+
+        executor = None
+        try:
+            if self.max_workers <= 0:
+                # Пул отключен: выполняем в вызывающем потоке
+                future = Future()
+                try:
+                    future.set_result(fn(*args))
+                except Exception as e:
+                    future.set_exception(e)
+            else:
+                executor = self.start()
+                future = executor.submit(fn, *args)
+        except Exception:
+            self._release(failed=True)
+            raise
+
+        future.add_done_callback(partial(self._on_done, executor))
+        return future
+
+    def _on_done(self, executor: Optional[ProcessPoolExecutor], future: Future):
+        failed = future.cancelled() or future.exception() is not None
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            # Процесс пула упал: следующий submit создаст пул заново. Сбрасываем только тот пул,
+            # что выполнял задачу - его могли уже пересоздать по ошибке другой задачи
+            with self._lock:
+                if executor is not None and self._executor is executor:
+                    self._executor = None
+        self._release(failed)
+
+    def _release(self, failed: bool):
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+        self._slots.release()
+
+    def run_sync(self, fn: Callable, *args) -> Any:
+        """Выполнение задачи с ожиданием результата (для фоновых потоков)"""
+        return self.submit(fn, *args).result(timeout=self.timeout)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Выполнение задачи из async кода без блокировки event loop"""
+        if self.max_workers <= 0:
+            # Пул отключен: задача выполняется в потоке, а не в event loop
+            future = await asyncio.to_thread(self.submit, fn, *args, block=False)
+        else:
+            future = self.submit(fn, *args, block=False)
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "running": self._executor is not None,
+            "workers": self.max_workers,
+            "capacity": self.max_workers + self.max_pending,
+            "in_flight": self.in_flight,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+def _noop():
+    return None
+
+
+def init_inference_worker():
+    """Инициализация процесса пула: загрузка всех моделей один раз"""
+    from ml_models import model_registry
+
+    model_registry.warm_up()
+
+
+def predict_models(model_names, report_time: datetime, temperature: np.ndarray, humidity: np.ndarray,
+                   co2: np.ndarray, illuminance: np.ndarray) -> Tuple[Dict[str, np.ndarray], tuple]:
+    """
+    Пакетные предсказания (выполняется в процессе пула)
+
+    Returns:
+        tuple: ({имя модели: вектор предсказаний} - модели с ошибкой пропускаются,
+                (pid процесса, статистика реестра моделей процесса))
+    """
+    from features import build_feature_matrix, calendar_features
+    from ml_models import model_registry
+
+    calendar = calendar_features(report_time)
+    results = {}
+    for model_name in model_names:
+        try:
+            predictor = model_registry.get(model_name)
+            input_data = build_feature_matrix(report_time, temperature, humidity, co2, predictor.feature_names,
+                                              illuminance=illuminance, calendar=calendar)
+            results[model_name] = predictor(input_data)
+        except Exception as e:
+            print(f"⚠️ Ошибка пакетного ML предсказания ({model_name}): {e}")
+    return results, (os.getpid(), model_registry.stats())
+
+
+class WorkerModelStats:
+    """
+    Статистика моделей процессов пула. Модели загружаются и вызываются в процессах пула,
+    поэтому реестр процесса API их не видит: каждый вызов predict_models возвращает
+    снимок накопленной статистики своего процесса, здесь хранится последний снимок на процесс
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[int, Dict[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, pid: int, models_stats: Dict[str, dict]):
+        with self._lock:
+            self._snapshots[pid] = models_stats
+
+    def stats(self, local: Optional[Dict[str, dict]] = None) -> Dict[str, Any]:
+        """Сводная статистика по процессам (local - статистика реестра текущего процесса)"""
+        with self._lock:
+            snapshots = dict(self._snapshots)
+        if local is not None:
+            snapshots[os.getpid()] = local
+
+        merged = {}
+        names = {name: None for snapshot in snapshots.values() for name in snapshot}
+        for name in names:
+            loaded = [snapshot[name] for snapshot in snapshots.values() if snapshot.get(name, {}).get("loaded")]
+            if not loaded:
+                merged[name] = {"name": name, "loaded": False, "processes": 0}
+                continue
+            calls = sum(item["calls"] for item in loaded)
+            total_call_ms = sum(item["avg_call_ms"] * item["calls"] for item in loaded)
+            merged[name] = {
+                "name": name,
+                "loaded": True,
+                "processes": len(loaded),
+                "features": loaded[0]["features"],
+                "load_time_ms": max(item["load_time_ms"] for item in loaded),
+                "memory_bytes": sum(item["memory_bytes"] for item in loaded),
+                "calls": calls,
+                "rows": sum(item["rows"] for item in loaded),
+                "avg_call_ms": round(total_call_ms / calls, 3) if calls else 0.0,
+            }
+        return merged
+
+
+# Статистика моделей по процессам пула инференса
+worker_model_stats = WorkerModelStats()
+
+
+def predict_batch_sync(*args) -> Dict[str, np.ndarray]:
+    """predict_models в пуле инференса с ожиданием результата (аргументы - как у predict_models)"""
+    results, (pid, models_stats) = inference_pool.run_sync(predict_models, *args)
+    worker_model_stats.record(pid, models_stats)
+    return results
+
+
+async def predict_batch(*args) -> Dict[str, np.ndarray]:
+    """predict_models в пуле инференса из async кода"""
+    results, (pid, models_stats) = await inference_pool.run(predict_models, *args)
+    worker_model_stats.record(pid, models_stats)
+    return results
+
+
+# Пул инференса моделей теплиц
+inference_pool = WorkerPool(
+    "inference",
+    max_workers=INFERENCE_WORKERS,
+    max_pending=INFERENCE_MAX_PENDING,
+    timeout=INFERENCE_TIMEOUT_SECONDS,
+    initializer=init_inference_worker,
+)
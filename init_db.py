@@ -5,6 +5,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from database import get_db
 from models import AgronomicRule, Greenhouse, Sensor, ExecutionDevice
+from startup import get_startup_timings
+from topology import topology_cache
+from report_cache import latest_report_cache
 
 router = APIRouter(
     prefix="/admin",
@@ -26,6 +29,12 @@ def reset_database(db: Session = Depends(get_db)):
         )
 
 
+@router.get("/startup-timings")
+def read_startup_timings():
+    """Длительности этапов запуска приложения (мс): импорт роутеров, прогрев моделей"""
+    return get_startup_timings()
+
+
 def clear_and_seed_db(db: Session):
     try:
         print("Начало очистки и заполнения базы данных...")
@@ -35,7 +44,7 @@ def clear_and_seed_db(db: Session):
 
         # Очищаем таблицы в правильном порядке (от дочерних к родительским)
         tables_to_clear = [
-            "reports", "sensors", "cameras", "execution_devices",
+            "report_rollups_hourly", "report_rollups_daily", "reports", "sensors", "cameras", "execution_devices",
             "greenhouses", "agronomic_rules", "users", "detections"
         ]
 
@@ -153,6 +162,10 @@ def clear_and_seed_db(db: Session):
 
             # Финальный коммит всех изменений
             db.commit()
+            # Теплицы, датчики и устройства пересозданы - снимок топологии устарел
+            topology_cache.invalidate()
+            # Отчеты удалены - кэш последних отчетов отдавал бы несуществующие записи
+            latest_report_cache.clear()
             print("Все изменения сохранены в базе данных")
             print("База данных успешно очищена и заполнена начальными данными!")
 
@@ -11,46 +11,130 @@ from decimal import Decimal
 from datetime import datetime
 import threading
 import time
+import os
+from sqlalchemy import text
+from startup import measure, get_startup_timings
 
-# Импортируем роутеры
-from crud.greenhouses import router as greenhouses_router
-from crud.sensors import router as sensors_router
-from crud.reports import router as report_router
-from simulations import router as simulations_router, lifespan as simulations_lifespan
-from crud.agronomic_rules import router as agronomic_rules_router
-from crud.execution_devices import router as execution_devices_router
-from crud.cameras import router as cameras_router
-from init_db import router as admin_router
-from crud.users import router as user_router
-from crud.detections import router as detection_router
+# Импортируем роутеры (с замером времени импорта каждого)
+with measure("import.greenhouses"):
+    from crud.greenhouses import router as greenhouses_router
+with measure("import.sensors"):
+    from crud.sensors import router as sensors_router
+with measure("import.reports"):
+    from crud.reports import router as report_router
+    from crud.rollups import router as rollups_router
+    from crud.archive import router as archive_router
+with measure("import.simulations"):
+    from simulations import router as simulations_router, lifespan as simulations_lifespan, load_exec_devices_power
+with measure("import.agronomic_rules"):
+    from crud.agronomic_rules import router as agronomic_rules_router
+with measure("import.execution_devices"):
+    from crud.execution_devices import router as execution_devices_router
+with measure("import.cameras"):
+    from crud.cameras import router as cameras_router
+with measure("import.admin"):
+    from init_db import router as admin_router
+with measure("import.users"):
+    from crud.users import router as user_router
+with measure("import.detections"):
+    from crud.detections import router as detection_router, detection_pool
 
+from inference_pool import inference_pool
 
-@asynccontextmanager
-async def combined_lifespan(app: FastAPI):
-    """Объединенный lifespan менеджер для всех модулей"""
+# Прогрев ML моделей в фоне после старта сервера (0 - модели загружаются при первом запросе)
+WARM_UP_MODELS = os.getenv("WARM_UP_MODELS", "1") == "1"
+
+# Режим инициализации БД при старте: blocking - до приема запросов,
+# background - в фоне с повторами (приложение стартует и при недоступной БД)
+DB_INIT_MODE = os.getenv("DB_INIT_MODE", "blocking")
+DB_INIT_RETRY_SECONDS = 5
 
-    # Startup логика
-    print("Запуск приложения...")
 
-    # Создаем таблицы при старте приложения
+async def warm_up_models():
+    """Фоновый прогрев: запуск пулов инференса и обработки изображений (модели загружаются в их процессах)"""
     try:
-        models.Base.metadata.create_all(bind=engine)
+        with measure("warmup.inference_pool"):
+            await asyncio.to_thread(inference_pool.warm_up)
+        with measure("warmup.detections"):
+            await asyncio.to_thread(detection_pool.warm_up)
+        print("✅ ML модели прогреты")
+    except Exception as e:
+        print(f"⚠️ Ошибка прогрева ML моделей: {e}")
+
+
+def init_database() -> bool:
+    """Инициализация БД: создание таблиц, проверка подключения, загрузка мощностей устройств"""
+    try:
+        with measure("db.create_tables"):
+            models.Base.metadata.create_all(bind=engine)
+        with measure("db.ensure_columns"):
+            models.ensure_columns(engine)
+        with measure("db.ensure_indexes"):
+            models.ensure_indexes(engine)
         print("✅ Таблицы созданы/проверены")
 
         # Простая проверка без сложных запросов
-        db = SessionLocal()
-        try:
-            print("✅ Подключение к базе данных прошло успешно")
-        finally:
-            db.close()
+        with measure("db.check_connection"):
+            db = SessionLocal()
+            try:
+                db.execute(text("SELECT 1"))
+            finally:
+                db.close()
+        print("✅ Подключение к базе данных прошло успешно")
 
     except Exception as e:
         print(f"❌ Ошибка при создании таблиц: {e}")
+        return False
+
+    try:
+        with measure("db.init_exec_devices_power"):
+            load_exec_devices_power()
+    except Exception as e:
+        print(f"Ошибка при инициализации мощностей: {e}")
+        return False
+
+    return True
+
+
+async def init_database_in_background():
+    """Инициализация БД в фоне с повторами, пока база недоступна"""
+    while True:
+        with measure("lifespan.db_init"):
+            initialized = await asyncio.to_thread(init_database)
+        if initialized:
+            return
+        await asyncio.sleep(DB_INIT_RETRY_SECONDS)
+
+
+@asynccontextmanager
+async def combined_lifespan(app: FastAPI):
+    """Объединенный lifespan менеджер для всех модулей"""
+
+    # Startup логика
+    print("Запуск приложения...")
+
+    # Импорт модулей к БД не обращается: все обращения начинаются здесь
+    db_init_task = None
+    with measure("lifespan.startup"):
+        if DB_INIT_MODE == "background":
+            # Сервер принимает запросы сразу, БД инициализируется в фоне
+            db_init_task = asyncio.create_task(init_database_in_background())
+        else:
+            with measure("lifespan.db_init"):
+                await asyncio.to_thread(init_database)
 
     # Запускаем lifespan из simulations модуля
     async with simulations_lifespan(app):
         print("✅ Фоновая задача обновления показаний запущена")
+        print(f"⏱ Этапы запуска (мс): {get_startup_timings()}")
+
+        # Модели загружаются в фоне: сервер принимает запросы, не дожидаясь прогрева
+        warm_up_task = asyncio.create_task(warm_up_models()) if WARM_UP_MODELS else None
         yield
+        for task in (warm_up_task, db_init_task):
+            if task is not None and not task.done():
+                task.cancel()
+    detection_pool.shutdown()
 
 
 app = FastAPI(
@@ -66,6 +150,8 @@ app.include_router(admin_router)
 app.include_router(detection_router)
 app.include_router(greenhouses_router)
 app.include_router(sensors_router)
+app.include_router(rollups_router)
+app.include_router(archive_router)
 app.include_router(report_router)
 app.include_router(agronomic_rules_router)
 app.include_router(execution_devices_router)
@@ -0,0 +1,255 @@
+import os
+import pickle
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from nn_inference import NumpyDenseNetwork
+
+# Пути к файлам моделей
+HUMIDITY_MODEL_PATH = 'greenhouse_humidity_model_weights.pkl'
+TEMPERATURE_MODEL_PATH = 'greenhouse_temperature_model_weights.pkl'
+CO2_NN_WEIGHTS_PATH = 'greenhouse_co2_nn_weights.weights.h5'
+CO2_NN_SCALERS_PATH = 'greenhouse_co2_nn_scalers.pkl'
+CO2_NN_NPZ_PATH = 'greenhouse_co2_nn_weights.npz'
+
+
+def _arrays_nbytes(*objects) -> int:
+    """Суммарный размер numpy-массивов в объектах (атрибуты scaler-ов, веса и т.п.)"""
+    total = 0
+    for obj in objects:
+        if isinstance(obj, np.ndarray):
+            total += obj.nbytes
+        elif isinstance(obj, (list, tuple)):
+            total += _arrays_nbytes(*obj)
+        elif hasattr(obj, '__dict__'):
+            total += sum(v.nbytes for v in vars(obj).values() if isinstance(v, np.ndarray))
+    return total
+
+
+class Predictor:
+    """
+    Готовая к вызову модель: принимает матрицу признаков в порядке feature_names
+    и возвращает вектор предсказаний
+    """
+
+    def __init__(self, name: str, feature_names: List[str], predict_fn: Callable[[np.ndarray], np.ndarray],
+                 memory_bytes: int = 0):
+        self.name = name
+        self.feature_names = list(feature_names)
+        self.memory_bytes = memory_bytes
+        self.load_time = 0.0
+        self.loaded_at: Optional[float] = None
+        self.calls = 0
+        self.rows = 0
+        self.total_call_time = 0.0
+        self._predict_fn = predict_fn
+        self._stats_lock = threading.Lock()
+
+    def __call__(self, features: np.ndarray) -> np.ndarray:
+        features = np.atleast_2d(features)
+        started = time.perf_counter()
+        result = np.asarray(self._predict_fn(features)).reshape(-1)
+        elapsed = time.perf_counter() - started
+
+        with self._stats_lock:
+            self.calls += 1
+            self.rows += features.shape[0]
+            self.total_call_time += elapsed
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "loaded": True,
+            "features": len(self.feature_names),
+            "load_time_ms": round(self.load_time * 1000, 3),
+            "memory_bytes": self.memory_bytes,
+            "calls": self.calls,
+            "rows": self.rows,
+            "avg_call_ms": round(self.total_call_time / self.calls * 1000, 3) if self.calls else 0.0,
+        }
+
+
+def fold_standard_scaler(scaler, w: np.ndarray, b: float):
+    """
+    Свертка StandardScaler и линейного слоя в одно аффинное преобразование:
+    ((X - mean) / scale) @ w + b = X @ (w / scale) + (b - (mean / scale) @ w)
+    """
+    w = np.asarray(w, dtype=np.float64)
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    mean = np.zeros_like(w) if mean is None or not scaler.with_mean else np.asarray(mean, dtype=np.float64)
+    scale = np.ones_like(w) if scale is None or not scaler.with_std else np.asarray(scale, dtype=np.float64)
+
+    folded_w = w / scale
+    folded_b = float(b) - float((mean / scale) @ w)
+    return folded_w, folded_b
+
+
+def load_linear_model(model_path: str) -> Predictor:
+    """
+    Загрузка линейной модели (scaler + w, b) из pickle в скомпилированном виде:
+    scaler свернут в веса, порядок признаков фиксирован при загрузке
+    """
+    with open(model_path, 'rb') as f:
+        model_weights = pickle.load(f)
+
+    w, b = fold_standard_scaler(model_weights['scaler'], model_weights['w'], model_weights['b'])
+
+    def predict(features: np.ndarray) -> np.ndarray:
+        # y_pred = X @ w + b
+        return features @ w + b
+
+    return Predictor(
+        name=model_path,
+        feature_names=model_weights['feature_names'],
+        predict_fn=predict,
+        memory_bytes=w.nbytes,
+    )
+
+
+def create_co2_nn_model(input_dim=19):
+    """
+    Создание архитектуры нейронной сети (должна совпадать с обученной моделью)
+    """
+    from tensorflow import keras
+
+    model = keras.Sequential([
+        # Первый скрытый слой
+        keras.layers.Dense(128, activation='relu', input_shape=(input_dim,),
+                           kernel_regularizer=keras.regularizers.l2(0.001)),
+        keras.layers.BatchNormalization(),
+        keras.layers.Dropout(0.3),
+
+        # Второй скрытый слой
+        keras.layers.Dense(64, activation='relu',
+                           kernel_regularizer=keras.regularizers.l2(0.001)),
+        keras.layers.BatchNormalization(),
+        keras.layers.Dropout(0.3),
+
+        # Третий скрытый слой
+        keras.layers.Dense(32, activation='relu',
+                           kernel_regularizer=keras.regularizers.l2(0.001)),
+        keras.layers.Dropout(0.2),
+
+        # Выходной слой
+        keras.layers.Dense(1, activation='linear')
+    ])
+
+    return model
+
+
+def load_co2_nn_model(weights_path: str = CO2_NN_WEIGHTS_PATH,
+                      scalers_path: str = CO2_NN_SCALERS_PATH) -> Predictor:
+    """
+    Загрузка нейронной сети CO2 в NumPy-движок (без TensorFlow):
+    BatchNorm и scaler-ы свернуты в веса Dense слоев
+    """
+    with open(scalers_path, 'rb') as f:
+        scalers_data = pickle.load(f)
+
+    # Сконвертированные веса .npz (если есть) загружаются без h5py
+    if os.path.exists(CO2_NN_NPZ_PATH) and weights_path == CO2_NN_WEIGHTS_PATH:
+        weights_path = CO2_NN_NPZ_PATH
+
+    network = NumpyDenseNetwork.from_weights(
+        weights_path,
+        input_scaler=scalers_data['scaler_X'],
+        output_scaler=scalers_data['scaler_y'],
+    )
+
+    return Predictor(
+        name=weights_path,
+        feature_names=scalers_data['feature_names'],
+        predict_fn=network,
+        memory_bytes=network.nbytes,
+    )
+
+
+def load_co2_nn_keras_model(weights_path: str = CO2_NN_WEIGHTS_PATH,
+                            scalers_path: str = CO2_NN_SCALERS_PATH) -> Predictor:
+    """Загрузка нейронной сети CO2 в Keras (эталон для сверки и бенчмарка NumPy-движка)"""
+    with open(scalers_path, 'rb') as f:
+        scalers_data = pickle.load(f)
+
+    scaler_X = scalers_data['scaler_X']
+    scaler_y = scalers_data['scaler_y']
+
+    model = create_co2_nn_model(input_dim=scalers_data['input_dim'])
+    model.load_weights(weights_path)
+
+    def predict(features: np.ndarray) -> np.ndarray:
+        input_scaled = scaler_X.transform(features)
+        # Прямой вызов модели вместо model.predict: без накладных расходов на батчинг
+        prediction_scaled = model(input_scaled, training=False).numpy()
+        return scaler_y.inverse_transform(prediction_scaled)
+
+    return Predictor(
+        name=weights_path,
+        feature_names=scalers_data['feature_names'],
+        predict_fn=predict,
+        memory_bytes=sum(w.nbytes for w in model.get_weights()) + _arrays_nbytes(scaler_X, scaler_y),
+    )
+
+
+class ModelRegistry:
+    """
+    Реестр моделей процесса: каждая модель загружается один раз
+    (при старте или при первом обращении) и хранится в памяти
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Predictor]] = {}
+        self._models: Dict[str, Predictor] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Predictor]):
+        with self._lock:
+            self._loaders[name] = loader
+            self._models.pop(name, None)
+
+    def get(self, name: str) -> Predictor:
+        predictor = self._models.get(name)
+        if predictor is not None:
+            return predictor
+
+        with self._lock:
+            # Повторная проверка: модель мог загрузить другой поток
+            predictor = self._models.get(name)
+            if predictor is None:
+                if name not in self._loaders:
+                    raise KeyError(f"Модель {name} не зарегистрирована")
+                started = time.perf_counter()
+                predictor = self._loaders[name]()
+                predictor.load_time = time.perf_counter() - started
+                predictor.loaded_at = time.time()
+                self._models[name] = predictor
+                print(f"🔧 Модель {name} загружена за {predictor.load_time:.3f} с")
+        return predictor
+
+    def warm_up(self):
+        """Загрузка всех зарегистрированных моделей"""
+        for name in list(self._loaders):
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"⚠️ Ошибка загрузки модели {name}: {e}")
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: self._models[name].stats() if name in self._models else {"name": name, "loaded": False}
+            for name in self._loaders
+        }
+
+
+# Реестр моделей процесса
+model_registry = ModelRegistry()
+model_registry.register("humidity", lambda: load_linear_model(HUMIDITY_MODEL_PATH))
+model_registry.register("temperature", lambda: load_linear_model(TEMPERATURE_MODEL_PATH))
+model_registry.register("co2", load_co2_nn_model)
@@ -1,5 +1,6 @@
-from sqlalchemy import String, Text, DECIMAL, func, Boolean, Column, Integer, Float, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, Text, DECIMAL, func, Boolean, Column, Integer, Float, Double, DateTime, ForeignKey, LargeBinary, Index, inspect, text
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.orm import deferred, relationship
 from database import Base
 from sqlalchemy.dialects.mysql import LONGBLOB
 
@@ -29,6 +30,8 @@ class Greenhouse(Base):
     cameras = relationship("Camera", back_populates="greenhouse", cascade="all, delete-orphan")
     execution_devices = relationship("ExecutionDevice", back_populates="greenhouse", cascade="all, delete-orphan")
     reports = relationship("Report", back_populates="greenhouse", cascade="all, delete-orphan")
+    rollups_hourly = relationship("ReportRollupHourly", back_populates="greenhouse", cascade="all, delete-orphan")
+    rollups_daily = relationship("ReportRollupDaily", back_populates="greenhouse", cascade="all, delete-orphan")
     # Добавляем связь с Detection для каскадного удаления
     detections = relationship("Detection", back_populates="greenhouse", cascade="all, delete-orphan")
 
@@ -75,6 +78,44 @@ class Report(Base):
 
     greenhouse = relationship("Greenhouse", back_populates="reports")
 
+    __table_args__ = (
+        # Последний отчет и выборки за период по теплице; курсорная пагинация по (report_time, id)
+        Index('ix_reports_greenhouse_time', 'greenhouse_id', 'report_time'),
+        Index('ix_reports_time', 'report_time'),
+    )
+
+
+class ReportRollupHourly(Base):
+    """Часовые агрегаты отчетов: строка на теплицу, час и показатель (колонку отчета)"""
+    __tablename__ = 'report_rollups_hourly'
+
+    greenhouse_id = Column(Integer, ForeignKey('greenhouses.greenhouse_id', ondelete="CASCADE"), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    metric = Column(String(32), primary_key=True)
+    count = Column(Integer, nullable=False)
+    min_value = Column(Double, nullable=False)
+    max_value = Column(Double, nullable=False)
+    sum_value = Column(Double, nullable=False)
+    sumsq_value = Column(Double, nullable=False)
+
+    greenhouse = relationship("Greenhouse", back_populates="rollups_hourly")
+
+
+class ReportRollupDaily(Base):
+    """Суточные агрегаты отчетов: строка на теплицу, день и показатель (колонку отчета)"""
+    __tablename__ = 'report_rollups_daily'
+
+    greenhouse_id = Column(Integer, ForeignKey('greenhouses.greenhouse_id', ondelete="CASCADE"), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    metric = Column(String(32), primary_key=True)
+    count = Column(Integer, nullable=False)
+    min_value = Column(Double, nullable=False)
+    max_value = Column(Double, nullable=False)
+    sum_value = Column(Double, nullable=False)
+    sumsq_value = Column(Double, nullable=False)
+
+    greenhouse = relationship("Greenhouse", back_populates="rollups_daily")
+
 
 class Camera(Base):
     __tablename__ = 'cameras'
@@ -100,11 +141,74 @@ class Detection(Base):
     __tablename__ = 'detections'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    photo = Column(LONGBLOB, nullable=False)
-    detection_photo = Column(LONGBLOB, nullable=False)
+    # Устаревшее хранение фото в строке (LONGBLOB в MySQL): заполнено только у детекций,
+    # еще не перенесенных в хранилище блобов (python -m crud.detections migrate-blobs).
+    # Колонки отложенные: загружаются при обращении к атрибуту или через undefer()
+    photo = deferred(Column(LargeBinary().with_variant(LONGBLOB, "mysql"), nullable=True))
+    detection_photo = deferred(Column(LargeBinary().with_variant(LONGBLOB, "mysql"), nullable=True))
+    # Фото в хранилище блобов: SHA-256 содержимого и размер в байтах
+    photo_hash = Column(String(64), nullable=True)
+    photo_size = Column(Integer, nullable=True)
+    detection_photo_hash = Column(String(64), nullable=True)
+    detection_photo_size = Column(Integer, nullable=True)
+    # Размеры изображения в пикселях (у обработанного фото те же)
+    photo_width = Column(Integer, nullable=True)
+    photo_height = Column(Integer, nullable=True)
     greenhouse_id = Column(Integer, ForeignKey('greenhouses.greenhouse_id', ondelete="CASCADE"), nullable=False)
     confidence_level = Column(Float, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Добавляем обратную связь с Greenhouse
-    greenhouse = relationship("Greenhouse", back_populates="detections")
\ No newline at end of file
+    greenhouse = relationship("Greenhouse", back_populates="detections")
+
+    __table_args__ = (
+        Index('ix_detections_greenhouse_created', 'greenhouse_id', 'created_at'),
+        Index('ix_detections_created', 'created_at'),
+        # Проверка, ссылается ли еще какая-то детекция на блоб, перед его удалением
+        Index('ix_detections_photo_hash', 'photo_hash'),
+        Index('ix_detections_detection_photo_hash', 'detection_photo_hash'),
+    )
+
+
+def ensure_columns(bind):
+    """
+    Добавление колонок моделей, которых нет в существующих таблицах, и снятие NOT NULL
+    с колонок, ставших необязательными (create_all существующие таблицы не меняет).
+    В SQLite изменение NULL/NOT NULL не поддерживается и пропускается
+    """
+    inspector = inspect(bind)
+    dialect = bind.dialect
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"]: column for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                ddl = CreateColumn(column).compile(dialect=dialect)
+                if column.name not in existing:
+                    if not column.nullable and column.server_default is None:
+                        print(f"⚠️ Колонку {table.name}.{column.name} (NOT NULL без значения по умолчанию) нужно добавить вручную")
+                        continue
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                    print(f"✅ Добавлена колонка {table.name}.{column.name}")
+                elif column.nullable and not existing[column.name]["nullable"]:
+                    if dialect.name == "mysql":
+                        conn.execute(text(f"ALTER TABLE {table.name} MODIFY COLUMN {ddl} NULL"))
+                    elif dialect.name == "postgresql":
+                        conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {column.name} DROP NOT NULL"))
+                    else:
+                        continue
+                    print(f"✅ Колонка {table.name}.{column.name} стала необязательной")
+
+
+def ensure_indexes(bind):
+    """Создание индексов моделей, которых нет в уже существующих таблицах (create_all их не добавляет)"""
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=bind)
+                print(f"✅ Создан индекс {index.name} ({table.name})")
\ No newline at end of file
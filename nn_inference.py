@@ -0,0 +1,149 @@
+"""
+Инференс нейронной сети CO2 на чистом NumPy (без импорта TensorFlow)
+
+Сеть: Dense(relu) -> BatchNorm -> Dropout -> Dense(relu) -> BatchNorm -> Dropout
+      -> Dense(relu) -> Dropout -> Dense(linear)
+
+На инференсе Dropout - тождественное преобразование, а BatchNorm после ReLU -
+покомпонентное аффинное преобразование, которое сворачивается в веса следующего
+Dense слоя. Scaler-ы входа и выхода также сворачиваются в первый и последний слои,
+поэтому прямой проход - это четыре матричных умножения.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+# Порядок слоев сети (имена групп в .weights.h5 и активации), как в create_co2_nn_model
+CO2_NN_LAYERS = [
+    ("dense", "relu"),
+    ("batch_normalization", None),
+    ("dropout", None),
+    ("dense_1", "relu"),
+    ("batch_normalization_1", None),
+    ("dropout_1", None),
+    ("dense_2", "relu"),
+    ("dropout_2", None),
+    ("dense_3", "linear"),
+]
+
+# epsilon по умолчанию у keras.layers.BatchNormalization
+BATCH_NORM_EPSILON = 1e-3
+
+
+def read_weights_h5(weights_path: str) -> dict:
+    """
+    Чтение весов из файла .weights.h5 (формат Keras 3) в словарь numpy-массивов
+    вида {"dense/0": kernel, "dense/1": bias, "batch_normalization/0": gamma, ...}
+    """
+    import h5py
+
+    weights = {}
+    with h5py.File(weights_path, 'r') as f:
+        for layer_name, layer_group in f['layers'].items():
+            for var_name, dataset in layer_group['vars'].items():
+                weights[f"{layer_name}/{var_name}"] = np.asarray(dataset)
+    return weights
+
+
+def convert_h5_to_npz(weights_path: str, npz_path: str):
+    """Конвертация .weights.h5 в .npz (после этого h5py для загрузки не нужен)"""
+    np.savez(npz_path, **read_weights_h5(weights_path))
+
+
+def load_weights(weights_path: str) -> dict:
+    """Загрузка весов из .npz (результат convert_h5_to_npz) или .weights.h5"""
+    if weights_path.endswith('.npz'):
+        with np.load(weights_path) as data:
+            return {key: data[key] for key in data.files}
+    return read_weights_h5(weights_path)
+
+
+def fold_network(weights: dict, layers=CO2_NN_LAYERS) -> List[Tuple[np.ndarray, np.ndarray, str]]:
+    """
+    Сворачивание BatchNorm в следующий Dense слой и удаление Dropout
+
+    Returns:
+        list: [(W, b, activation), ...] - только Dense слои
+    """
+    folded = []
+    # Покомпонентное аффинное преобразование, ожидающее свертки в следующий Dense: y * scale + shift
+    pending_scale = None
+    pending_shift = None
+
+    for layer_name, activation in layers:
+        if layer_name.startswith("dropout"):
+            continue
+
+        if layer_name.startswith("batch_normalization"):
+            gamma = weights[f"{layer_name}/0"].astype(np.float64)
+            beta = weights[f"{layer_name}/1"].astype(np.float64)
+            moving_mean = weights[f"{layer_name}/2"].astype(np.float64)
+            moving_variance = weights[f"{layer_name}/3"].astype(np.float64)
+
+            scale = gamma / np.sqrt(moving_variance + BATCH_NORM_EPSILON)
+            shift = beta - moving_mean * scale
+            if pending_scale is not None:
+                shift = pending_shift * scale + shift
+                scale = pending_scale * scale
+            pending_scale, pending_shift = scale, shift
+            continue
+
+        kernel = weights[f"{layer_name}/0"].astype(np.float64)
+        bias = weights[f"{layer_name}/1"].astype(np.float64)
+        if pending_scale is not None:
+            # (y * s + t) @ W + b = y @ (s[:, None] * W) + (t @ W + b)
+            bias = pending_shift @ kernel + bias
+            kernel = pending_scale[:, None] * kernel
+            pending_scale = pending_shift = None
+        folded.append((kernel, bias, activation))
+
+    return folded
+
+
+class NumpyDenseNetwork:
+    """Прямой проход полносвязной сети на NumPy"""
+
+    def __init__(self, layers: List[Tuple[np.ndarray, np.ndarray, str]], dtype=np.float32):
+        self.layers = [
+            (np.ascontiguousarray(kernel, dtype=dtype), np.ascontiguousarray(bias, dtype=dtype), activation)
+            for kernel, bias, activation in layers
+        ]
+        self.dtype = dtype
+
+    @classmethod
+    def from_weights(cls, weights_path: str, layers=CO2_NN_LAYERS, input_scaler=None, output_scaler=None,
+                     dtype=np.float32):
+        """
+        Загрузка сети из .weights.h5/.npz со сверткой BatchNorm и (опционально)
+        StandardScaler-ов входа и выхода в первый и последний Dense слои
+        """
+        folded = fold_network(load_weights(weights_path), layers)
+
+        if input_scaler is not None:
+            # ((x - mean) / std) @ W + b = x @ (W / std[:, None]) + (b - (mean / std) @ W)
+            kernel, bias, activation = folded[0]
+            mean = np.asarray(input_scaler.mean_, dtype=np.float64)
+            std = np.asarray(input_scaler.scale_, dtype=np.float64)
+            folded[0] = (kernel / std[:, None], bias - (mean / std) @ kernel, activation)
+
+        if output_scaler is not None:
+            # y * std + mean
+            kernel, bias, activation = folded[-1]
+            mean = np.asarray(output_scaler.mean_, dtype=np.float64)
+            std = np.asarray(output_scaler.scale_, dtype=np.float64)
+            folded[-1] = (kernel * std[None, :], bias * std + mean, activation)
+
+        return cls(folded, dtype=dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(kernel.nbytes + bias.nbytes for kernel, bias, _ in self.layers)
+
+    def __call__(self, features: np.ndarray) -> np.ndarray:
+        x = np.asarray(features, dtype=self.dtype)
+        for kernel, bias, activation in self.layers:
+            x = x @ kernel
+            x += bias
+            if activation == "relu":
+                np.maximum(x, 0, out=x)
+        return x
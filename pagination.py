@@ -0,0 +1,50 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+# Заголовок ответа с курсором следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Непрозрачный курсор: позиция последней строки страницы (время, id)"""
+    payload = json.dumps({"t": sort_value.isoformat(), "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), int(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(query, time_column, id_column, limit: int, cursor: Optional[str] = None, skip: int = 0):
+    """
+    Страница по убыванию (time, id). С курсором строки выбираются условием
+    (time, id) < (время, id курсора) без OFFSET; без курсора - прежний режим skip/limit
+    """
+    query = query.order_by(time_column.desc(), id_column.desc())
+    if cursor is not None:
+        cursor_time, cursor_id = decode_cursor(cursor)
+        # Условие раскрыто через OR: так MySQL использует индекс по (time, id)
+        query = query.filter(or_(
+            time_column < cursor_time,
+            and_(time_column == cursor_time, id_column < cursor_id),
+        ))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+
+def set_next_cursor(response: Response, rows: List, limit: int, time_attr: str, id_attr: str = "id"):
+    """Курсор следующей страницы в заголовке ответа (если страница заполнена полностью)"""
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, time_attr), getattr(last, id_attr))
@@ -0,0 +1,95 @@
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Any, Callable, Dict, Tuple
+
+# Уменьшенные копии фото детекций: имя -> максимальная сторона в пикселях
+RENDITION_SIZES = {"thumb": 256, "medium": 1024}
+
+# WebP заметно меньше JPEG того же качества; поддерживается всеми современными браузерами
+RENDITION_FORMAT = "WEBP"
+RENDITION_MEDIA_TYPE = "image/webp"
+RENDITION_QUALITY = 80
+
+# Бюджет памяти процесса на сгенерированные копии, байт
+RENDITION_CACHE_BYTES = int(os.getenv("RENDITION_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+
+def render(image_bytes: bytes, max_side: int) -> bytes:
+    """Уменьшение изображения до max_side по большей стороне (пропорционально) и кодирование в WebP"""
+    from PIL import Image
+
+    with Image.open(BytesIO(image_bytes)) as image:
+        # Для JPEG декодер сразу уменьшает изображение в 2-8 раз (DCT scaling) - быстрее полного декодирования
+        image.draft("RGB", (max_side, max_side))
+        image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        output = BytesIO()
+        image.save(output, format=RENDITION_FORMAT, quality=RENDITION_QUALITY)
+        return output.getvalue()
+
+
+class RenditionCache:
+    """
+    LRU-кэш копий в памяти процесса, ограниченный суммарным размером в байтах.
+    Копии создаются при первом запросе; ключ - хэш исходного фото и имя размера,
+    поэтому замена фото детекции не требует инвалидации
+    """
+
+    def __init__(self, max_bytes: int = RENDITION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, source_key: str, rendition: str, load_source: Callable[[], bytes]) -> bytes:
+        key = (source_key, rendition)
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        # Генерация вне блокировки: одновременные запросы одной копии могут посчитать ее дважды
+        data = render(load_source(), RENDITION_SIZES[rendition])
+        self._put(key, data)
+        return data
+
+    def _put(self, key: Tuple[str, str], data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._items[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": len(self._items),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Кэш копий процесса
+rendition_cache = RenditionCache()
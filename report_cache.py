@@ -0,0 +1,61 @@
+import threading
+from typing import Any, Dict, Optional
+
+
+def _report_key(report: dict) -> tuple:
+    # Время без часового пояса: в запросах оно может прийти с поясом, из MySQL - без
+    return report["report_time"].replace(tzinfo=None), report["id"]
+
+
+class LatestReportCache:
+    """
+    Последний отчет каждой теплицы в памяти процесса. Обновляется путями записи отчетов,
+    при промахе заполняется из БД. Кэш локален для процесса: при нескольких
+    процессах сервера отчеты, записанные другим процессом, он не видит
+    """
+
+    def __init__(self):
+        self._reports: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, greenhouse_id: int) -> Optional[dict]:
+        report = self._reports.get(greenhouse_id)
+        if report is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return report
+
+    def offer(self, report: dict):
+        """Сохранение отчета, если он новее закэшированного (по report_time, затем id)"""
+        if report.get("report_time") is None:
+            return
+        greenhouse_id = report["greenhouse_id"]
+        with self._lock:
+            current = self._reports.get(greenhouse_id)
+            if current is None or _report_key(report) >= _report_key(current):
+                self._reports[greenhouse_id] = report
+
+    def forget_report(self, greenhouse_id: int, report_id: int):
+        """Сброс записи теплицы, если в ней лежит этот отчет (изменен или удален)"""
+        with self._lock:
+            current = self._reports.get(greenhouse_id)
+            if current is not None and current["id"] == report_id:
+                del self._reports[greenhouse_id]
+
+    def forget_greenhouse(self, greenhouse_id: int):
+        with self._lock:
+            self._reports.pop(greenhouse_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._reports.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"greenhouses": len(self._reports), "hits": self.hits, "misses": self.misses}
+
+
+# Кэш последних отчетов процесса
+latest_report_cache = LatestReportCache()
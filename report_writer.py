@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+# Настройки группового коммита (переопределяются переменными окружения)
+REPORT_FLUSH_SIZE = int(os.getenv("REPORT_FLUSH_SIZE", "500"))  # строк в одной транзакции
+REPORT_FLUSH_INTERVAL_SECONDS = float(os.getenv("REPORT_FLUSH_INTERVAL_SECONDS", "0.01"))  # окно сбора пачки
+REPORT_WRITE_TIMEOUT_SECONDS = float(os.getenv("REPORT_WRITE_TIMEOUT_SECONDS", "30"))
+REPORT_SPILL_PATH = os.getenv("REPORT_SPILL_PATH", "reports_spill.ndjson")
+
+# Ошибки, означающие недоступность БД: такие пачки сохраняются в файл и дозаписываются позже
+DB_UNAVAILABLE_ERRORS = (OperationalError, InterfaceError)
+
+
+class ReportWriter:
+    """
+    Групповая запись отчетов: строки из разных запросов и тиков собираются в очередь
+    и записываются одной транзакцией. Пачку записывает "лидер" - первый вызвавший write
+    поток - своей сессией; остальные ждут результат. Если БД недоступна, пачка дописывается
+    в локальный файл (append-only) и переносится в БД после следующей успешной записи
+    """
+
+    def __init__(self, flush_size: int = REPORT_FLUSH_SIZE, flush_interval: float = REPORT_FLUSH_INTERVAL_SECONDS,
+                 timeout: float = REPORT_WRITE_TIMEOUT_SECONDS, spill_path: str = REPORT_SPILL_PATH):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.spill_path = spill_path
+        self.quarantine_path = spill_path + ".corrupt"
+        self._queue: List[tuple] = []
+        self._cond = threading.Condition()
+        self._leader_active = False
+        self.batches = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.rows_spilled = 0
+        self.rows_replayed = 0
+        self.rows_dropped = 0
+        self.replay_failures = 0
+        self.last_flush_time = None
+        self.max_flush_time = 0.0
+        self._total_flush_time = 0.0
+
+    def write(self, db, rows: List[dict]) -> List[Optional[int]]:
+        """
+        Запись строк отчетов (поля schemas.ReportCreate.model_dump())
+
+        Returns:
+            List[Optional[int]]: id отчетов; None - строка сохранена в файл до восстановления БД
+        """
+        futures = [Future() for _ in rows]
+        with self._cond:
+            self._queue.extend(zip(rows, futures))
+            lead = not self._leader_active
+            if lead:
+                self._leader_active = True
+            elif len(self._queue) >= self.flush_size:
+                self._cond.notify_all()
+
+        if lead:
+            self._lead(db)
+        return [future.result(timeout=self.timeout) for future in futures]
+
+    def _lead(self, db):
+        """Цикл лидера: собрать пачку, записать, повторять, пока очередь не пуста"""
+        try:
+            while True:
+                with self._cond:
+                    # Ждем, пока наберется пачка или истечет окно сбора
+                    deadline = time.monotonic() + self.flush_interval
+                    while len(self._queue) < self.flush_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    batch = self._queue[:self.flush_size]
+                    del self._queue[:self.flush_size]
+                    if not batch:
+                        self._leader_active = False
+                        return
+                self._flush(db, batch)
+        except BaseException:
+            with self._cond:
+                self._leader_active = False
+            raise
+
+    def _flush(self, db, batch: List[tuple]):
+        from crud.reports import create_reports_bulk_db
+
+        rows = [row for row, _ in batch]
+        started = time.perf_counter()
+        try:
+            ids = create_reports_bulk_db(db, rows)
+        except DB_UNAVAILABLE_ERRORS as e:
+            print(f"⚠️ БД недоступна, {len(rows)} отчетов сохранено в {self.spill_path}: {e}")
+            try:
+                self._spill(rows)
+            except Exception as spill_error:
+                self.rows_failed += len(rows)
+                for _, future in batch:
+                    future.set_exception(spill_error)
+                return
+            self.rows_spilled += len(rows)
+            for _, future in batch:
+                future.set_result(None)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self.rows_failed += 1
+                batch[0][1].set_exception(e)
+                return
+            # Одна плохая строка (например, теплицу удалили до записи) не должна ронять всю пачку:
+            # строки записываются по одной, ошибку получает только автор плохой строки
+            print(f"⚠️ Ошибка записи пачки из {len(rows)} отчетов, запись по одной: {e}")
+            for item in batch:
+                self._flush(db, [item])
+            return
+
+        elapsed = time.perf_counter() - started
+        self.batches += 1
+        self.rows_written += len(ids)
+        self.last_flush_time = elapsed
+        self.max_flush_time = max(self.max_flush_time, elapsed)
+        self._total_flush_time += elapsed
+        for (_, future), report_id in zip(batch, ids):
+            future.set_result(report_id)
+
+        # БД снова доступна - переносим сохраненные ранее пачки. Ошибка переноса не должна
+        # доходить до писателей: их строки уже закоммичены
+        if os.path.exists(self.spill_path):
+            try:
+                self.replay(db)
+            except Exception as e:
+                self.replay_failures += 1
+                print(f"⚠️ Не удалось перенести отчеты из {self.spill_path}: {e}")
+
+    def _spill(self, rows: List[dict]):
+        """Дозапись строк в файл (по строке JSON на отчет) с fsync"""
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay(self, db) -> int:
+        """
+        Перенос сохраненных в файл отчетов в БД одной транзакцией; возвращает число записанных строк.
+        Нечитаемые строки (например, оборванная при сбое последняя) переносятся в файл карантина
+        <spill_path>.corrupt и учитываются в replay_failures
+        """
+        import models
+        import schemas
+        from crud.reports import create_reports_bulk_db
+
+        if not os.path.exists(self.spill_path):
+            return 0
+
+        try:
+            rows, corrupt_lines = [], []
+            with open(self.spill_path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        rows.append(schemas.ReportCreate(**json.loads(line)).model_dump())
+                    except Exception:
+                        corrupt_lines.append(line if line.endswith("\n") else line + "\n")
+
+            # Теплицу могли удалить, пока БД была недоступна: такие строки пропускаем
+            greenhouse_ids = {row[0] for row in db.query(models.Greenhouse.greenhouse_id).all()}
+            valid_rows = [row for row in rows if row["greenhouse_id"] in greenhouse_ids]
+            create_reports_bulk_db(db, valid_rows)
+        except Exception as e:
+            db.rollback()
+            self.replay_failures += 1
+            print(f"⚠️ Не удалось перенести отчеты из {self.spill_path}: {e}")
+            return 0
+
+        if corrupt_lines:
+            with open(self.quarantine_path, "a", encoding="utf-8") as f:
+                f.writelines(corrupt_lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self.replay_failures += len(corrupt_lines)
+            print(f"⚠️ Нечитаемых строк в {self.spill_path}: {len(corrupt_lines)}, перенесены в {self.quarantine_path}")
+
+        os.remove(self.spill_path)
+        self.rows_replayed += len(valid_rows)
+        self.rows_dropped += len(rows) - len(valid_rows)
+        print(f"✅ Перенесено отчетов из {self.spill_path}: {len(valid_rows)}")
+        return len(valid_rows)
+
+    def stats(self) -> Dict[str, Any]:
+        spill_bytes = os.path.getsize(self.spill_path) if os.path.exists(self.spill_path) else 0
+        return {
+            "queue_depth": len(self._queue),
+            "flushing": self._leader_active,
+            "flush_size": self.flush_size,
+            "flush_interval_ms": round(self.flush_interval * 1000, 3),
+            "batches": self.batches,
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "last_flush_ms": round(self.last_flush_time * 1000, 3) if self.last_flush_time is not None else None,
+            "avg_flush_ms": round(self._total_flush_time / self.batches * 1000, 3) if self.batches else None,
+            "max_flush_ms": round(self.max_flush_time * 1000, 3),
+            "spill_path": self.spill_path,
+            "spill_bytes": spill_bytes,
+            "rows_spilled": self.rows_spilled,
+            "rows_replayed": self.rows_replayed,
+            "rows_dropped": self.rows_dropped,
+            "replay_failures": self.replay_failures,
+        }
+
+
+# Общий писатель отчетов процесса
+report_writer = ReportWriter()
@@ -92,6 +92,73 @@ class ReportRead(ReportBase):
     id: int
     report_time: datetime
 
+'''
+Схемы для агрегатов отчетов
+'''
+
+class RollupStats(BaseModel):
+    count: int
+    min: float
+    max: float
+    mean: float
+    std: float
+    sum: float
+    sumsq: float
+
+class RollupBucket(BaseModel):
+    greenhouse_id: int
+    bucket_start: datetime
+    metrics: Dict[str, RollupStats]
+
+class RollupSummary(BaseModel):
+    greenhouse_id: int
+    start: datetime
+    end: datetime
+    metrics: Dict[str, RollupStats]
+
+class AggregateStats(BaseModel):
+    min: Optional[float] = None
+    avg: Optional[float] = None
+    max: Optional[float] = None
+
+class ReportAggregateBucket(BaseModel):
+    bucket_start: datetime
+    count: int
+    metrics: Dict[str, AggregateStats]
+
+class ReportSeries(BaseModel):
+    greenhouse_id: int
+    metric: str
+    method: str
+    source_points: int
+    timestamps: List[datetime]
+    values: List[float]
+
+class ArchivePartition(BaseModel):
+    greenhouse_id: int
+    month: str
+    format: str
+    rows: Optional[int] = None
+    bytes: int
+
+'''
+Схемы для предсказаний моделей
+'''
+
+class PredictionInput(BaseModel):
+    temperature: float
+    humidity: float
+    co2: float
+
+class PredictionRequest(BaseModel):
+    readings: List[PredictionInput] = Field(..., min_length=1, max_length=10000)
+    report_time: Optional[datetime] = None
+
+class PredictionResult(BaseModel):
+    humidity: Optional[float] = None
+    temperature: Optional[float] = None
+    co2: Optional[float] = None
+
 '''
 Схемы для ExecutionDevice
 '''
@@ -225,4 +292,11 @@ class Detection(DetectionBase):
     id: int
     confidence_level: float = Field(..., ge=0.0, le=1.0, description="Уровень уверенности модели")
     created_at: datetime
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class DetectionListItem(Detection):
+    """Детекция в списке: без фото, только их размеры в байтах"""
+    photo_size: Optional[int] = None
+    detection_photo_size: Optional[int] = None
+    photo_width: Optional[int] = None
+    photo_height: Optional[int] = None
\ No newline at end of file
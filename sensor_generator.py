@@ -0,0 +1,88 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+# Типы датчиков, для которых генерируются показания
+SENSOR_TYPES = ('temperature', 'humidity', 'co2')
+
+# Диапазоны базовых значений: [время года, время суток (0 - день, 1 - ночь)] -> (min, max)
+# Время года: 0 - лето, 1 - осень, 2 - зима, 3 - весна
+TEMPERATURE_RANGES = np.array([
+    [(20, 35), (15, 25)],  # лето
+    [(10, 20), (5, 15)],  # осень
+    [(5, 15), (0, 10)],  # зима
+    [(15, 25), (10, 18)],  # весна
+], dtype=np.float64)
+
+HUMIDITY_RANGES = np.array([
+    [(40, 70), (50, 80)],  # лето
+    [(50, 80), (60, 90)],  # осень
+    [(30, 60), (40, 70)],  # зима
+    [(40, 75), (50, 85)],  # весна
+], dtype=np.float64)
+
+# CO2 не зависит от времени года и суток (целое значение ppm, границы включительно)
+CO2_RANGE = (400, 1500)
+
+# Случайная вариация каждого датчика относительно базового значения, %
+VARIATION_PERCENT = {'temperature': 5, 'humidity': 7, 'co2': 15}
+
+
+def make_rng(seed: Optional[int] = None) -> np.random.Generator:
+    """Генератор случайных чисел симуляции (seed задается для воспроизводимых показаний)"""
+    return np.random.default_rng(seed)
+
+
+_seed = os.getenv("SENSOR_SIMULATION_SEED")
+# Генератор процесса; переопределяется через seed_sensor_generator
+sensor_rng = make_rng(int(_seed) if _seed else None)
+
+
+def seed_sensor_generator(seed: Optional[int] = None):
+    global sensor_rng
+    sensor_rng = make_rng(seed)
+
+
+def generate_base_values(sensor_type: str, season: int, time_of_day: int, size: int,
+                         rng: np.random.Generator) -> np.ndarray:
+    """Базовые значения для size датчиков одного типа"""
+    if sensor_type == 'temperature':
+        low, high = TEMPERATURE_RANGES[season, time_of_day]
+        return rng.uniform(low, high, size=size)
+    if sensor_type == 'humidity':
+        low, high = HUMIDITY_RANGES[season, time_of_day]
+        return rng.uniform(low, high, size=size)
+    if sensor_type == 'co2':
+        return rng.integers(CO2_RANGE[0], CO2_RANGE[1] + 1, size=size).astype(np.float64)
+    raise ValueError(f"Неизвестный тип датчика: {sensor_type}")
+
+
+def generate_sensor_values(sensor_types, season: int, time_of_day: int,
+                           rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Показания для всех датчиков за один вызов на каждый тип
+
+    Args:
+        sensor_types: массив типов датчиков длины n
+        season: время года (0-3)
+        time_of_day: время суток (0 - день, 1 - ночь)
+        rng: генератор (по умолчанию - генератор процесса)
+
+    Returns:
+        np.ndarray: float64 показания, округленные до 2 знаков; NaN для неизвестных типов
+    """
+    rng = rng if rng is not None else sensor_rng
+    sensor_types = np.asarray(sensor_types)
+    values = np.full(sensor_types.shape[0], np.nan)
+
+    for sensor_type in SENSOR_TYPES:
+        mask = sensor_types == sensor_type
+        size = int(np.count_nonzero(mask))
+        if size == 0:
+            continue
+        base = generate_base_values(sensor_type, season, time_of_day, size, rng)
+        variation = VARIATION_PERCENT[sensor_type] / 100
+        values[mask] = base * (1 + rng.uniform(-variation, variation, size=size))
+
+    return np.round(values, 2)
@@ -1,25 +1,25 @@
 import pickle
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
 from fastapi import FastAPI, Depends, HTTPException, Query, BackgroundTasks, APIRouter, Body
 from sqlalchemy.orm import Session
 import models, schemas
-from crud.sensors import get_sensor_info, get_greenhouse_info
+from topology import topology_cache
+from sensor_generator import generate_sensor_values
 from database import SessionLocal, get_db
 import random
 from decimal import Decimal
 from datetime import datetime
 import threading
 import time
-from crud.reports import create_report_row
+from report_writer import report_writer
+from ml_models import model_registry
+from features import build_feature_matrix, generate_illuminance
+from inference_pool import inference_pool, predict_batch, predict_batch_sync, worker_model_stats, PoolBusyError
 import time
 import threading
 from datetime import datetime
-import tensorflow as tf
-from tensorflow import keras
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, List
 from contextlib import asynccontextmanager
 
 # Глобальные переменные для хранения показаний в памяти
@@ -65,21 +65,18 @@ season, time_of_day = get_current_season_and_time()
 current_exec_dev_readings = {}
 
 def init_exec_devices_power(db: Session):
-    """Инициализация мощностей исполнительных устройств на основе текущего состояния БД"""
-    from crud.greenhouses import get_greenhouses_db
-    from crud.execution_devices import get_executive_devices_by_greenhouse
-
+    """Инициализация мощностей исполнительных устройств на основе топологии (кэш, при пустом кэше - БД)"""
     # Объявляем глобальную переменную в начале функции
     global current_exec_dev_readings
 
-    greenhouses = get_greenhouses_db(db)
+    topology = topology_cache.get(db)
 
     # Создаем временный словарь для новых данных
     new_exec_dev_readings = {}
 
-    for greenhouse in greenhouses:
-        greenhouse_key = f"greenhouse_{greenhouse.greenhouse_id}"
-        devices = get_executive_devices_by_greenhouse(greenhouse.greenhouse_id, db)
+    for greenhouse_id in topology.greenhouse_ids():
+        greenhouse_key = f"greenhouse_{greenhouse_id}"
+        devices = topology.devices_by_greenhouse(greenhouse_id)
 
         # Получаем текущие данные для этой теплицы (если есть)
         current_devices = current_exec_dev_readings.get(greenhouse_key, {})
@@ -89,7 +86,7 @@ def init_exec_devices_power(db: Session):
 
         # Обрабатываем каждое устройство из БД
         for device in devices:
-            device_type = device.type
+            device_type = device["type"]
             if device_type == "temperature_controller":
                 device_key = "temperature_power"
             elif device_type == "humidity_controller":
@@ -124,66 +121,29 @@ def init_exec_devices_power(db: Session):
     current_exec_dev_readings = new_exec_dev_readings
 
 
-def generate_sensor_data(season, time_of_day, sensor_type=None, base_value=None):
-    """Генерация данных датчиков с уникальными вариациями для каждого датчика"""
-
-    def add_variation(value, variation_percent=10):
-        """Добавление случайной вариации к базовому значению"""
-        variation = random.uniform(-variation_percent, variation_percent) / 100
-        return value * (1 + variation)
-
-    def generate_co2():
-        base = random.randint(400, 1500)
-        if sensor_type == 'co2' and base_value is not None:
-            base = float(base_value)
-        return Decimal(str(round(add_variation(base, 15), 2)))  # ±15% вариация для CO2
-
-    def generate_temperature(season, time_of_day):
-        season_temps = {
-            0: {'day': (20, 35), 'night': (15, 25)},  # лето
-            1: {'day': (10, 20), 'night': (5, 15)},  # осень
-            2: {'day': (5, 15), 'night': (0, 10)},  # зима
-            3: {'day': (15, 25), 'night': (10, 18)}  # весна
-        }
-        time_key = 'day' if time_of_day == 0 else 'night'
-        temp_range = season_temps[season][time_key]
-
-        base = random.uniform(temp_range[0], temp_range[1])
-        if sensor_type == 'temperature' and base_value is not None:
-            base = float(base_value)
-
-        return Decimal(str(round(add_variation(base, 5), 2)))  # ±5% вариация для температуры
-
-    def generate_humidity(season, time_of_day):
-        season_humidity = {
-            0: {'day': (40, 70), 'night': (50, 80)},  # лето
-            1: {'day': (50, 80), 'night': (60, 90)},  # осень
-            2: {'day': (30, 60), 'night': (40, 70)},  # зима
-            3: {'day': (40, 75), 'night': (50, 85)}  # весна
-        }
-        time_key = 'day' if time_of_day == 0 else 'night'
-        humidity_range = season_humidity[season][time_key]
-
-        base = random.uniform(humidity_range[0], humidity_range[1])
-        if sensor_type == 'humidity' and base_value is not None:
-            base = float(base_value)
-
-        return Decimal(str(round(add_variation(base, 7), 2)))  # ±7% вариация для влажности
-
-    # Если указан конкретный тип сенсора, генерируем только его значение
-    if sensor_type == 'temperature':
-        return generate_temperature(season, time_of_day)
-    elif sensor_type == 'humidity':
-        return generate_humidity(season, time_of_day)
-    elif sensor_type == 'co2':
-        return generate_co2()
-    else:
-        # Для обратной совместимости
-        return {
-            'temperature': generate_temperature(season, time_of_day),
-            'humidity': generate_humidity(season, time_of_day),
-            'co2': generate_co2()
+def generate_readings(topology, vg: int, vs: int) -> List[dict]:
+    """
+    Показания всех датчиков топологии: значения генерируются одним векторным вызовом
+    на тип датчика и хранятся как float (в Decimal переводятся только при записи отчета)
+    """
+    sensors = topology.sensors_with_greenhouse()
+    values = generate_sensor_values(topology.sensor_types(), vg, vs)
+    reading_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    return [
+        {
+            "sensor_id": sensor["sensor_id"],
+            "value": value,
+            "type": sensor["type"],
+            "reading_time": reading_time,
+            "greenhouse_id": sensor["greenhouse_id"],
+            "greenhouse_name": sensor["greenhouse_name"],
+            "greenhouse_location": sensor["location"],
+            "greenhouse_description": sensor["description"],
         }
+        for sensor, value in zip(sensors, values.tolist())
+        if value == value  # NaN - датчик неподдерживаемого типа
+    ]
 
 
 def create_single_reading(db: Session, vg: int, vs: int):
@@ -215,35 +175,17 @@ def create_single_reading(db: Session, vg: int, vs: int):
 
     # Если в кэше нет данных, генерируем новые
     try:
-        from crud.sensors import get_sensors_db
-        sensors = get_sensors_db(db)
+        topology = topology_cache.get(db)
 
-        if not sensors:
+        if not topology.sensors:
             raise Exception("В базе нет датчиков. Сначала создайте датчики через API /sensors/")
 
-        readings_data = []
-
-        # Для каждого датчика генерируем уникальное значение
-        for sensor in sensors:
-            sensor_type = sensor.type
-
-            # Генерируем базовое значение для этого типа датчика
-            base_data = generate_sensor_data(vg, vs)
-            base_value = float(base_data.get(sensor_type))
-
-            # Генерируем уникальное значение для конкретного датчика
-            unique_value = generate_sensor_data(vg, vs, sensor_type=sensor_type, base_value=base_value)
-
-            readings_data.append({
-                "sensor_id": sensor.sensor_id,
-                "value": unique_value,
-                "type": sensor_type
-            })
+        readings_data = generate_readings(topology, vg, vs)
 
         if not readings_data:
             raise Exception("Не найдены датчики подходящих типов (temperature, humidity, co2)")
 
-        return collect_readings_data(readings_data, db)
+        return readings_data
 
     except Exception as e:
         raise Exception(f"Ошибка при создании показаний: {str(e)}")
@@ -255,57 +197,15 @@ async def update_sensor_readings(db: Session):
     global current_sensor_readings
 
     try:
-        from crud.sensors import get_sensors_db
-        sensors = get_sensors_db(db)
+        topology = topology_cache.get(db)
 
-        if not sensors:
+        if not topology.sensors:
             print("В базе нет датчиков")
             return
 
         print(f"Генерация показаний для: время года={season}, время суток={time_of_day}")
 
-        sensor_readings = []
-
-        # Для каждого датчика генерируем уникальное значение
-        for sensor in sensors:
-            sensor_type = sensor.type
-
-            # Генерируем базовое значение для этого типа датчика
-            base_data = generate_sensor_data(season, time_of_day)
-            base_value = float(base_data.get(sensor_type))
-
-            # Генерируем уникальное значение для конкретного датчика
-            unique_value = generate_sensor_data(season, time_of_day, sensor_type=sensor_type, base_value=base_value)
-
-            sensor_readings.append({
-                "sensor_id": sensor.sensor_id,
-                "value": unique_value,
-                "type": sensor_type
-            })
-
-        # Обогащаем данные дополнительной информацией
-        enriched_readings = []
-        for reading in sensor_readings:
-            reading_dict = {
-                "sensor_id": reading["sensor_id"],
-                "value": reading["value"],
-                "type": reading["type"],
-                "reading_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-
-            try:
-                additional_sensor_info_dict = get_sensor_info(db, reading["sensor_id"])
-                greenhouse_id = additional_sensor_info_dict['greenhouse_id']
-                greenhouse_info_dict = get_greenhouse_info(db, greenhouse_id)
-
-                reading_dict["greenhouse_id"] = additional_sensor_info_dict["greenhouse_id"]
-                reading_dict["greenhouse_name"] = greenhouse_info_dict["greenhouse_name"]
-                reading_dict["greenhouse_location"] = greenhouse_info_dict["location"]
-                reading_dict["greenhouse_description"] = greenhouse_info_dict["description"]
-            except Exception as e:
-                print(f"Ошибка при обогащении данных датчика {reading['sensor_id']}: {e}")
-
-            enriched_readings.append(reading_dict)
+        enriched_readings = generate_readings(topology, season, time_of_day)
 
         # Сохраняем только текущие показания
         readings = {
@@ -347,19 +247,24 @@ async def continuous_sensor_updates():
             await asyncio.sleep(1)
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Lifespan менеджер для управления событиями запуска и остановки"""
-    global background_task_running, background_task, current_exec_dev_readings
-
+def load_exec_devices_power():
+    """Загрузка мощностей исполнительных устройств из БД (вызывается из lifespan приложения)"""
+    db = SessionLocal()
     try:
-        # Создаем сессию БД для инициализации
-        db = SessionLocal()
         init_exec_devices_power(db)
+    finally:
         db.close()
-        print(f"Инициализированы мощности для {len(current_exec_dev_readings)} теплиц")
-    except Exception as e:
-        print(f"Ошибка при инициализации мощностей: {e}")
+    print(f"Инициализированы мощности для {len(current_exec_dev_readings)} теплиц")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Lifespan менеджер для управления событиями запуска и остановки
+
+    К БД не обращается: мощности устройств загружает load_exec_devices_power
+    """
+    global background_task_running, background_task
 
     print("Запуск фоновой задачи обновления показаний...")
     background_task_running = True
@@ -377,6 +282,8 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             print("Фоновая задача успешно остановлена")
 
+    inference_pool.shutdown()
+
 
 router = APIRouter(
     prefix="/simulations",
@@ -462,27 +369,6 @@ async def force_update_readings(db: Session = Depends(get_db)):
     }
 
 
-def collect_readings_data(created_readings, db: Session = Depends(get_db)):
-    readings_data = []
-    for reading in created_readings:
-        reading_dict = {
-            "sensor_id": reading["sensor_id"],
-            "value": reading["value"],
-            "reading_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        additional_sensor_info_dict = get_sensor_info(db, reading["sensor_id"])
-        greenhouse_id = additional_sensor_info_dict['greenhouse_id']
-        greenhouse_info_dict = get_greenhouse_info(db, greenhouse_id)
-
-        reading_dict["type"] = additional_sensor_info_dict["type"]
-        reading_dict["greenhouse_id"] = additional_sensor_info_dict["greenhouse_id"]
-        reading_dict["greenhouse_name"] = greenhouse_info_dict["greenhouse_name"]
-        reading_dict["greenhouse_location"] = greenhouse_info_dict["location"]
-        reading_dict["greenhouse_description"] = greenhouse_info_dict["description"]
-        readings_data.append(reading_dict)
-    return readings_data
-
-
 def group_by_greenhouse_id(readings_data):
     greenhouse_sensors = {}
 
@@ -497,192 +383,130 @@ def group_by_greenhouse_id(readings_data):
     return greenhouse_sensors
 
 
-def predict_ml(sensor_data: dict, report_time: datetime, model_path: str) -> Decimal:
+def predict_ml(sensor_data: dict, report_time: datetime, model_name: str) -> Decimal:
     """
-    ML предсказания на основе весов моделей
+    ML предсказания на основе весов моделей (модель берется из реестра)
     """
     try:
-        # Загружаем веса модели
-        with open(model_path, 'rb') as f:
-            model_weights = pickle.load(f)
-
-        # Расчет освещенности
-        hour = report_time.hour
-        if 6 <= hour < 23:
-            illuminance = np.random.uniform(800, 2000)
-        else:
-            illuminance = np.random.uniform(0, 50)
-
-        # Подготовка признаков
-        features = {
-            'greenhous_temperature_celsius': float(sensor_data['temperature']),
-            'greenhouse_humidity_percentage': float(sensor_data['humidity']),
-            'greenhouse_illuminance_lux': illuminance,
-            'online_temperature_celsius': float(sensor_data['temperature']) - 2.0,
-            'online_humidity_percentage': float(sensor_data['humidity']) - 5.0,
-            'greenhouse_total_volatile_organic_compounds_ppb': 200.0,
-            'greenhouse_equivalent_co2_ppm': float(sensor_data['co2']),
-            'hour_sin': np.sin(2 * np.pi * report_time.hour / 24),
-            'hour_cos': np.cos(2 * np.pi * report_time.hour / 24),
-            'minute_sin': np.sin(2 * np.pi * report_time.minute / 60),
-            'minute_cos': np.cos(2 * np.pi * report_time.minute / 60),
-            'day_of_week_sin': np.sin(2 * np.pi * report_time.weekday() / 7),
-            'day_of_week_cos': np.cos(2 * np.pi * report_time.weekday() / 7),
-            'day_of_month_sin': np.sin(2 * np.pi * (report_time.day - 1) / 31),
-            'day_of_month_cos': np.cos(2 * np.pi * (report_time.day - 1) / 31),
-            'month_sin': np.sin(2 * np.pi * (report_time.month - 1) / 12),
-            'month_cos': np.cos(2 * np.pi * (report_time.month - 1) / 12),
-            'day_of_year_sin': np.sin(2 * np.pi * (report_time.timetuple().tm_yday - 1) / 365),
-            'day_of_year_cos': np.cos(2 * np.pi * (report_time.timetuple().tm_yday - 1) / 365)
-        }
-
-        # Создаем входные данные
-        input_df = pd.DataFrame([features])[model_weights['feature_names']]
-
-        # Масштабируем
-        input_scaled = model_weights['scaler'].transform(input_df)
+        predictor = model_registry.get(model_name)
+
+        # Подготовка признаков в порядке признаков модели
+        input_data = build_feature_matrix(
+            report_time,
+            [float(sensor_data['temperature'])],
+            [float(sensor_data['humidity'])],
+            [float(sensor_data['co2'])],
+            predictor.feature_names,
+        )
 
-        # Прямой проход (предсказание) без использования класса LinearModel
-        # y_pred = X @ w + b
-        prediction = input_scaled @ model_weights['w'] + model_weights['b']
+        # Прямой проход (y_pred = X @ w + b) выполняет предиктор
+        prediction = predictor(input_data)
 
-        return Decimal(str(round(prediction[0], 2)))
+        return Decimal(str(round(float(prediction[0]), 2)))
 
     except Exception as e:
-        print(f"⚠️ Ошибка ML предсказания влажности: {e}")
+        print(f"⚠️ Ошибка ML предсказания ({model_name}): {e}")
         return Decimal("-1.0")
 
 
-def predict_co2_nn(sensor_data: dict, report_time: datetime,
-                           weights_path: str = 'greenhouse_co2_nn_weights.weights.h5',
-                           scalers_path: str = 'greenhouse_co2_nn_scalers.pkl') -> Decimal:
+def predict_co2_nn(sensor_data: dict, report_time: datetime) -> Decimal:
     """
-    Предсказание CO2 с использованием весов нейронной сети
+    Предсказание CO2 с использованием весов нейронной сети (модель берется из реестра)
     """
-
-    def create_co2_nn_model(input_dim=19):
-        """
-        Создание архитектуры нейронной сети (должна совпадать с обученной моделью)
-        """
-        model = keras.Sequential([
-            # Первый скрытый слой
-            keras.layers.Dense(128, activation='relu', input_shape=(input_dim,),
-                               kernel_regularizer=keras.regularizers.l2(0.001)),
-            keras.layers.BatchNormalization(),
-            keras.layers.Dropout(0.3),
-
-            # Второй скрытый слой
-            keras.layers.Dense(64, activation='relu',
-                               kernel_regularizer=keras.regularizers.l2(0.001)),
-            keras.layers.BatchNormalization(),
-            keras.layers.Dropout(0.3),
-
-            # Третий скрытый слой
-            keras.layers.Dense(32, activation='relu',
-                               kernel_regularizer=keras.regularizers.l2(0.001)),
-            keras.layers.Dropout(0.2),
-
-            # Выходной слой
-            keras.layers.Dense(1, activation='linear')
-        ])
-
-        return model
-
     try:
-        # Загружаем scalers и метаданные
-        with open(scalers_path, 'rb') as f:
-            scalers_data = pickle.load(f)
+        predictor = model_registry.get("co2")
 
-        scaler_X = scalers_data['scaler_X']
-        scaler_y = scalers_data['scaler_y']
-        feature_names = scalers_data['feature_names']
-        input_dim = scalers_data['input_dim']
+        # Подготовка признаков в ТОЧНОМ порядке как при обучении
+        input_data = build_feature_matrix(
+            report_time,
+            [float(sensor_data['temperature'])],
+            [float(sensor_data['humidity'])],
+            [float(sensor_data['co2'])],
+            predictor.feature_names,
+        )
 
-        print(f"  🔧 Загружены scalers. Размерность: {input_dim}, Признаков: {len(feature_names)}")
+        # Масштабирование, прямой проход и обратное масштабирование выполняет предиктор
+        prediction = predictor(input_data)
 
-        # Создаем модель с такой же архитектурой
-        model = create_co2_nn_model(input_dim=input_dim)
+        result = Decimal(str(round(float(prediction[0]), 2)))
+        print(f"  🔧 Предсказание CO2: {result} ppm")
 
-        # Загружаем веса
-        model.load_weights(weights_path)
-        print("  🔧 Веса модели загружены")
+        return result
 
-        # Компилируем модель
-        model.compile(
-            optimizer='adam',
-            loss='mse',
-            metrics=['mae']
-        )
+    except Exception as e:
+        print(f"⚠️ Ошибка предсказания CO2 (веса): {e}")
+        return Decimal("-1.0")
 
-        # Расчет освещенности по времени суток
-        hour = report_time.hour
-        if 6 <= hour < 23:
-            illuminance = np.random.uniform(800, 2000)
-        else:
-            illuminance = np.random.uniform(0, 50)
 
-        # Подготовка признаков в ТОЧНОМ порядке как при обучении
-        features = {
-            'greenhous_temperature_celsius': float(sensor_data['temperature']),
-            'greenhouse_humidity_percentage': float(sensor_data['humidity']),
-            'greenhouse_illuminance_lux': illuminance,
-            'online_temperature_celsius': float(sensor_data['temperature']) - 2.0,
-            'online_humidity_percentage': float(sensor_data['humidity']) - 5.0,
-            'greenhouse_total_volatile_organic_compounds_ppb': 200.0,
-            'greenhouse_equivalent_co2_ppm': float(sensor_data['co2']),
-            'hour_sin': np.sin(2 * np.pi * report_time.hour / 24),
-            'hour_cos': np.cos(2 * np.pi * report_time.hour / 24),
-            'minute_sin': np.sin(2 * np.pi * report_time.minute / 60),
-            'minute_cos': np.cos(2 * np.pi * report_time.minute / 60),
-            'day_of_week_sin': np.sin(2 * np.pi * report_time.weekday() / 7),
-            'day_of_week_cos': np.cos(2 * np.pi * report_time.weekday() / 7),
-            'day_of_month_sin': np.sin(2 * np.pi * (report_time.day - 1) / 31),
-            'day_of_month_cos': np.cos(2 * np.pi * (report_time.day - 1) / 31),
-            'month_sin': np.sin(2 * np.pi * (report_time.month - 1) / 12),
-            'month_cos': np.cos(2 * np.pi * (report_time.month - 1) / 12),
-            'day_of_year_sin': np.sin(2 * np.pi * (report_time.timetuple().tm_yday - 1) / 365),
-            'day_of_year_cos': np.cos(2 * np.pi * (report_time.timetuple().tm_yday - 1) / 365)
-        }
+# Модели, предсказания которых попадают в отчет
+PREDICTED_MODELS = ("humidity", "temperature", "co2")
 
-        # Создаем входные данные в ПРАВИЛЬНОМ порядке
-        input_data = np.array([[features[feature] for feature in feature_names]])
-        print(f"  🔧 Подготовлены данные. Форма: {input_data.shape}")
 
-        # Масштабируем входные данные
-        input_scaled = scaler_X.transform(input_data)
+def predict_greenhouses_batch(greenhouses: dict, report_time: datetime) -> dict:
+    """
+    Пакетные ML предсказания для всех теплиц тика: каждая модель вызывается
+    один раз на всю матрицу признаков, результат раздается по теплицам
 
-        # Предсказание
-        prediction_scaled = model.predict(input_scaled, verbose=0)
+    Args:
+        greenhouses: {greenhouse_id: список показаний датчиков теплицы}
+        report_time: время отчета
 
-        # Обратное масштабирование предсказания
-        prediction = scaler_y.inverse_transform(prediction_scaled)
+    Returns:
+        dict: {greenhouse_id: {"humidity": Decimal, "temperature": Decimal, "co2": Decimal}}
+    """
+    # Предсказания возможны только для теплиц со всеми тремя типами датчиков
+    greenhouse_ids = []
+    raw_rows = []
+    for greenhouse_id, sensors in greenhouses.items():
+        raw_sensor_data = {sensor["type"]: float(sensor["value"]) for sensor in sensors}
+        if all(key in raw_sensor_data for key in ['temperature', 'humidity', 'co2']):
+            greenhouse_ids.append(greenhouse_id)
+            raw_rows.append(raw_sensor_data)
 
-        result = Decimal(str(round(prediction[0][0], 2)))
-        print(f"  🔧 Предсказание CO2: {result} ppm")
+    predictions = {
+        greenhouse_id: {"humidity": Decimal("-1.0"), "temperature": Decimal("-1.0"), "co2": Decimal("-1.0")}
+        for greenhouse_id in greenhouses
+    }
+    if not raw_rows:
+        return predictions
 
-        return result
+    temperature = np.array([row['temperature'] for row in raw_rows], dtype=np.float32)
+    humidity = np.array([row['humidity'] for row in raw_rows], dtype=np.float32)
+    co2 = np.array([row['co2'] for row in raw_rows], dtype=np.float32)
+
+    # Освещенность считается один раз на тик и общая для всех моделей
+    illuminance = generate_illuminance(report_time, len(raw_rows))
 
+    # Инференс выполняется в пуле процессов, вне потока API
+    try:
+        results = predict_batch_sync(PREDICTED_MODELS, report_time, temperature, humidity, co2, illuminance)
     except Exception as e:
-        print(f"⚠️ Ошибка предсказания CO2 (веса): {e}")
-        return Decimal("-1.0")
+        print(f"⚠️ Ошибка пакетного ML предсказания: {e!r}")
+        results = {}
 
+    for model_name, values in results.items():
+        for greenhouse_id, value in zip(greenhouse_ids, values):
+            predictions[greenhouse_id][model_name] = Decimal(str(round(float(value), 2)))
 
-def create_single_report_row(db: Session, greenhouse_id: int, sensors: list):
-    """
-    Создание одной строки отчета для теплицы с ML предсказаниями
+    print(f"  🔮 Пакетные предсказания выполнены для {len(raw_rows)} теплиц")
+    return predictions
+
+
+def build_report_row(db: Session, greenhouse_id: int, sensors: list, predictions: dict | None = None,
+                     report_time: datetime | None = None) -> dict:
     """
-    from crud.execution_devices import get_executive_devices_by_greenhouse
+    Расчет строки отчета для теплицы с ML предсказаниями и командами (без записи в БД)
 
-    devices_in_greenhouse = [
-        device.type
-        for device in get_executive_devices_by_greenhouse(greenhouse_id, db)
-    ]
+    Если predictions переданы (результат predict_greenhouses_batch), модели не вызываются
 
-    try:
-        print(f"Создание отчета для теплицы {greenhouse_id} с {len(sensors)} датчиками")
+    Returns:
+        dict: поля отчета, проверенные схемой ReportCreate
+    """
+    devices_in_greenhouse = topology_cache.get(db).device_types(greenhouse_id)
 
+    try:
         # Инициализация строки отчета
-        current_time = datetime.now()
+        current_time = report_time or datetime.now()
         row = {
             "greenhouse_id": greenhouse_id,
             "report_time": current_time
@@ -698,10 +522,11 @@ def create_single_report_row(db: Session, greenhouse_id: int, sensors: list):
             raw_sensor_data[sensor_type] = float(sensor["value"])
 
         # 🔮 ML ПРЕДСКАЗАНИЯ
-        if all(key in raw_sensor_data for key in ['temperature', 'humidity', 'co2']):
+        if predictions is not None:
+            ml_prediction_humidity = predictions["humidity"]
+        elif all(key in raw_sensor_data for key in ['temperature', 'humidity', 'co2']):
             try:
-                ml_prediction_humidity = predict_ml(raw_sensor_data, current_time,
-                                                    'greenhouse_humidity_model_weights.pkl')
+                ml_prediction_humidity = predict_ml(raw_sensor_data, current_time, "humidity")
             except Exception as e:
                 print(f"  ⚠️ Ошибка ML предсказания влажности: {e}")
                 ml_prediction_humidity = Decimal("-1.0")
@@ -709,7 +534,9 @@ def create_single_report_row(db: Session, greenhouse_id: int, sensors: list):
             ml_prediction_humidity = Decimal("-1.0")
 
         # 🔮 ML ПРЕДСКАЗАНИЕ ДЛЯ CO2
-        if all(key in raw_sensor_data for key in ['temperature', 'humidity', 'co2']):
+        if predictions is not None:
+            ml_prediction_co2 = predictions["co2"]
+        elif all(key in raw_sensor_data for key in ['temperature', 'humidity', 'co2']):
             try:
                 ml_prediction_co2 = predict_co2_nn(raw_sensor_data, current_time)
                 print(f"  ✅ ML предсказание CO2: {ml_prediction_co2} ppm")
@@ -720,10 +547,11 @@ def create_single_report_row(db: Session, greenhouse_id: int, sensors: list):
             ml_prediction_co2 = Decimal("-1.0")
 
         # 🔮 ML ПРЕДСКАЗАНИЕ ДЛЯ ТЕМПЕРАТУРЫ
-        if all(key in raw_sensor_data for key in ['temperature', 'humidity', 'co2']):
+        if predictions is not None:
+            ml_prediction_temperature = predictions["temperature"]
+        elif all(key in raw_sensor_data for key in ['temperature', 'humidity', 'co2']):
             try:
-                ml_prediction_temperature = predict_ml(raw_sensor_data, current_time,
-                                                       'greenhouse_temperature_model_weights.pkl')
+                ml_prediction_temperature = predict_ml(raw_sensor_data, current_time, "temperature")
                 print(f"  ✅ ML предсказание температуры: {ml_prediction_temperature}°C")
             except Exception as e:
                 print(f"  ⚠️ Ошибка ML предсказания температуры: {e}")
@@ -843,18 +671,13 @@ def create_single_report_row(db: Session, greenhouse_id: int, sensors: list):
             row["co2_pred"] = sensor_data["co2"]["pred"]  # 🔮 ML ПРЕДСКАЗАНИЕ CO2
             row["command_co2"] = sensor_data["co2"]["command"]
 
-        # Сохранение в БД
-        from crud.reports import create_report_db
-        report_create = schemas.ReportCreate(**row)
-        result = create_report_db(db, report_create)
-
-        print(f"  ✅ Отчет создан. Предсказания - Влажность: {ml_prediction_humidity}%, CO2: {ml_prediction_co2} ppm")
-        return result
+        return schemas.ReportCreate(**row).model_dump()
 
     except Exception as e:
         print(f"  ❌ Критическая ошибка: {e}")
         raise Exception(f"Ошибка при создании отчета для теплицы {greenhouse_id}: {str(e)}")
 
+
 # Глобальная переменная для управления периодическим созданием отчетов
 reporting_active = False
 reporting_thread = None
@@ -883,26 +706,33 @@ def create_report_rows(db):
         # 2. Группировка по теплицам
         greenhouses = group_by_greenhouse_id(readings_data)
 
-        # 3. Создание отчетов для каждой теплицы
-        reports_created = 0
+        # 3. Пакетные ML предсказания сразу для всех теплиц
+        report_time = datetime.now()
+        predictions = predict_greenhouses_batch(greenhouses, report_time)
+
+        # 4. Расчет строк отчетов для каждой теплицы
+        rows = []
         for greenhouse_id, sensors in greenhouses.items():
             try:
-                # Создаем ОТДЕЛЬНУЮ сессию для каждой теплицы
-                db_per_greenhouse = SessionLocal()
-                try:
-                    create_single_report_row(db_per_greenhouse, greenhouse_id, sensors)
-                    reports_created += 1
-                finally:
-                    db_per_greenhouse.close()  # Закрываем сессию после каждой теплицы
-
+                rows.append(build_report_row(db, greenhouse_id, sensors,
+                                             predictions=predictions[greenhouse_id], report_time=report_time))
             except Exception as e:
                 print(f"Ошибка при создании отчета для теплицы {greenhouse_id}: {e}")
 
+        # 5. Запись всех отчетов тика через групповой писатель (одна транзакция на пачку)
+        known_greenhouses = topology_cache.get(db).greenhouses
+        rows = [row for row in rows if row["greenhouse_id"] in known_greenhouses]
+        report_ids = report_writer.write(db, rows)
+        reports_created = sum(report_id is not None for report_id in report_ids)
+        reports_spilled = len(report_ids) - reports_created
+        print(f"✅ Записано отчетов: {reports_created}, отложено до восстановления БД: {reports_spilled}")
+
         result = {
             "status": "success",
             "message": f"Создано отчетов: {reports_created} для {len(greenhouses)} теплиц",
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "reports_created": reports_created,
+            "reports_spilled": reports_spilled,
             "greenhouses_processed": len(greenhouses)
         }
 
@@ -914,12 +744,37 @@ def create_report_rows(db):
         return {"status": "error", "message": error_msg}
 
 @router.post("/create-reports-now/")
-def create_reports_now_endpoint(db: Session = Depends(get_db)):
-    """Немедленное создание отчетов"""
-    result = create_report_rows(db)
+async def create_reports_now_endpoint(db: Session = Depends(get_db)):
+    """Немедленное создание отчетов (инференс выполняется в пуле процессов)"""
+    result = await asyncio.to_thread(create_report_rows, db)
     return result
 
 
+@router.post("/predict", response_model=List[schemas.PredictionResult])
+async def predict_endpoint(request: schemas.PredictionRequest):
+    """Предсказания моделей по заданным показаниям (инференс выполняется в пуле процессов)"""
+    report_time = request.report_time or datetime.now()
+    temperature = np.array([reading.temperature for reading in request.readings], dtype=np.float32)
+    humidity = np.array([reading.humidity for reading in request.readings], dtype=np.float32)
+    co2 = np.array([reading.co2 for reading in request.readings], dtype=np.float32)
+    illuminance = generate_illuminance(report_time, len(request.readings))
+
+    try:
+        results = await predict_batch(PREDICTED_MODELS, report_time, temperature, humidity, co2, illuminance)
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Превышено время ожидания инференса")
+
+    return [
+        {
+            model_name: round(float(results[model_name][i]), 2) if model_name in results else None
+            for model_name in PREDICTED_MODELS
+        }
+        for i in range(len(request.readings))
+    ]
+
+
 @router.get("/power_execution_devices")
 def get_execution_devices_status(db: Session = Depends(get_db)):
     """Получение актуальных мощностей исполнительных устройств всех теплиц"""
@@ -937,37 +792,14 @@ def get_execution_devices_status(db: Session = Depends(get_db)):
     return formatted_output
 
 
-def get_current_power_example():
-    """Генерирует пример на основе текущих данных"""
-    # Создаем сессию вручную для генерации примера
-    db = SessionLocal()
-    try:
-        # Инициализируем данные
-        init_exec_devices_power(db)
-
-        # Проверяем, есть ли данные
-        if not current_exec_dev_readings:
-            return {
-                "greenhouse_1": {
-                    "temperature_power": 30.0,
-                    "humidity_power": 25.0,
-                    "co2_power": 20.0
-                }
-            }
-
-        # Преобразуем текущие данные
-        example = {}
-        for greenhouse_key, devices in list(current_exec_dev_readings.items()):
-            example[greenhouse_key] = {}
-            for device_key, value in list(devices.items()):
-                if isinstance(value, Decimal):
-                    example[greenhouse_key][device_key] = float(value)
-                else:
-                    example[greenhouse_key][device_key] = value
-
-        return example
-    finally:
-        db.close()
+# Статический пример для OpenAPI: документация не требует обращения к БД при импорте модуля
+POWER_UPDATE_EXAMPLE = {
+    "greenhouse_1": {
+        "temperature_power": 30.0,
+        "humidity_power": 25.0,
+        "co2_power": 20.0
+    }
+}
 
 
 @router.put("/update_all_power_execution_devices")
@@ -975,7 +807,7 @@ def update_all_power_execution_devices(
         updates: Dict[str, Dict[str, float]] = Body(
             ...,
             description="Обновление мощностей исполнительных устройств",
-            example=get_current_power_example()  # Используем функцию
+            example=POWER_UPDATE_EXAMPLE
         ),
         db: Session = Depends(get_db)
 ):
@@ -1080,6 +912,35 @@ def stop_periodic_reports_endpoint():
     return result
 
 
+@router.get("/models/stats")
+def get_models_stats():
+    """
+    Статистика ML моделей: время загрузки, память, количество вызовов - сводно по процессам
+    пула инференса (по последнему вызову каждого процесса) и текущему процессу
+    """
+    return worker_model_stats.stats(local=model_registry.stats())
+
+
+@router.get("/inference/stats")
+def get_inference_stats():
+    """Состояние пула инференса: процессы, очередь, отказы"""
+    return inference_pool.stats()
+
+
+@router.get("/topology/stats")
+def get_topology_stats():
+    """Состояние кэша топологии: версия, размеры, загрузки и обновления"""
+    return topology_cache.stats()
+
+
+@router.post("/topology/reload")
+def reload_topology(db: Session = Depends(get_db)):
+    """Перечитать топологию из БД (если таблицы менялись в обход API)"""
+    topology_cache.invalidate()
+    topology_cache.get(db)
+    return topology_cache.stats()
+
+
 @router.get("/reporting-status/")
 def get_reporting_status():
     """Получение статуса периодического создания отчетов"""
@@ -0,0 +1,21 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# Длительности этапов запуска приложения (импорт роутеров, прогрев моделей и т.д.), в секундах
+startup_timings: Dict[str, float] = {}
+
+
+@contextmanager
+def measure(phase: str):
+    """Замер длительности этапа запуска"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[phase] = time.perf_counter() - started
+
+
+def get_startup_timings() -> Dict[str, float]:
+    """Длительности этапов в миллисекундах"""
+    return {phase: round(seconds * 1000, 3) for phase, seconds in startup_timings.items()}
@@ -0,0 +1,255 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+import models
+
+
+def _greenhouse_dict(greenhouse) -> dict:
+    return {
+        'greenhouse_id': greenhouse.greenhouse_id,
+        'agrorule_id': greenhouse.agrorule_id,
+        'name': greenhouse.name,
+        'location': greenhouse.location,
+        'description': greenhouse.description,
+    }
+
+
+def _sensor_dict(sensor) -> dict:
+    return {'sensor_id': sensor.sensor_id, 'greenhouse_id': sensor.greenhouse_id, 'type': sensor.type}
+
+
+def _device_dict(device) -> dict:
+    return {'id': device.id, 'greenhouse_id': device.greenhouse_id, 'sensor_id': device.sensor_id, 'type': device.type}
+
+
+def _camera_dict(camera) -> dict:
+    return {'id': camera.id, 'greenhouse_id': camera.greenhouse_id, 'status': camera.status}
+
+
+class TopologySnapshot:
+    """
+    Неизменяемый снимок топологии: теплицы, датчики, исполнительные устройства и камеры.
+    Каждое изменение создает новый снимок с увеличенной версией, поэтому читатели
+    работают со своим снимком без блокировок
+    """
+
+    def __init__(self, version: int, greenhouses: Dict[int, dict], sensors: Dict[int, dict],
+                 devices: Dict[int, dict], cameras: Dict[int, dict]):
+        self.version = version
+        self.greenhouses = greenhouses
+        self.sensors = sensors
+        self.devices = devices
+        self.cameras = cameras
+        # Производные представления считаются один раз на снимок
+        self._sensors_with_greenhouse: Optional[List[dict]] = None
+        self._sensor_types: Optional[np.ndarray] = None
+        # Устройства и их типы по теплицам: запрашиваются для каждой теплицы на каждом тике
+        self._devices_by_greenhouse: Dict[int, List[dict]] = {}
+        for device in devices.values():
+            self._devices_by_greenhouse.setdefault(device['greenhouse_id'], []).append(device)
+        self._device_types = {
+            greenhouse_id: [device['type'] for device in greenhouse_devices]
+            for greenhouse_id, greenhouse_devices in self._devices_by_greenhouse.items()
+        }
+
+    def greenhouse_ids(self) -> List[int]:
+        return sorted(self.greenhouses)
+
+    def has_greenhouse(self, greenhouse_id: int) -> bool:
+        return greenhouse_id in self.greenhouses
+
+    def sensors_with_greenhouse(self) -> List[dict]:
+        """Датчики с названием, расположением и описанием их теплиц; список общий, не изменять"""
+        if self._sensors_with_greenhouse is not None:
+            return self._sensors_with_greenhouse
+        result = []
+        for sensor_id in sorted(self.sensors):
+            sensor = self.sensors[sensor_id]
+            greenhouse = self.greenhouses.get(sensor['greenhouse_id'])
+            if greenhouse is None:
+                continue
+            result.append({
+                'sensor_id': sensor_id,
+                'type': sensor['type'],
+                'greenhouse_id': sensor['greenhouse_id'],
+                'greenhouse_name': greenhouse['name'],
+                'location': greenhouse['location'],
+                'description': greenhouse['description'],
+            })
+        self._sensors_with_greenhouse = result
+        return result
+
+    def sensor_types(self) -> np.ndarray:
+        """Типы датчиков в порядке sensors_with_greenhouse()"""
+        if self._sensor_types is None:
+            self._sensor_types = np.array([sensor['type'] for sensor in self.sensors_with_greenhouse()], dtype=object)
+        return self._sensor_types
+
+    def devices_by_greenhouse(self, greenhouse_id: int) -> List[dict]:
+        """Устройства теплицы; список общий, не изменять"""
+        return self._devices_by_greenhouse.get(greenhouse_id, [])
+
+    def device_types(self, greenhouse_id: int) -> List[str]:
+        """Типы устройств теплицы; список общий, не изменять"""
+        return self._device_types.get(greenhouse_id, [])
+
+
+class TopologyCache:
+    """
+    Кэш топологии процесса: загружается из БД один раз и затем обновляется
+    CRUD-роутерами при записи (upsert/remove) без повторных запросов к БД
+    """
+
+    def __init__(self, session_factory: Optional[Callable] = None):
+        self._session_factory = session_factory
+        self._snapshot: Optional[TopologySnapshot] = None
+        self._lock = threading.Lock()
+        # Счетчик сбросов: загрузка, начатая до сброса, не устанавливает устаревший снимок
+        self._generation = 0
+        self._version = 0
+        self.loads = 0
+        self.hits = 0
+        self.invalidations = 0
+        self.patches = 0
+        self.last_load_time = None
+
+    def get(self, db=None) -> TopologySnapshot:
+        """
+        Текущий снимок топологии. При пустом кэше загружается из БД
+        (через переданную сессию или новую сессию SessionLocal)
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        return self._load(db)
+
+    def _load(self, db=None) -> TopologySnapshot:
+        generation = self._generation
+        started = time.perf_counter()
+
+        own_session = db is None
+        if own_session:
+            if self._session_factory is None:
+                from database import SessionLocal
+                self._session_factory = SessionLocal
+            db = self._session_factory()
+        try:
+            greenhouses = {row.greenhouse_id: _greenhouse_dict(row) for row in db.query(models.Greenhouse).all()}
+            sensors = {row.sensor_id: _sensor_dict(row) for row in db.query(models.Sensor).all()}
+            devices = {row.id: _device_dict(row) for row in db.query(models.ExecutionDevice).all()}
+            cameras = {row.id: _camera_dict(row) for row in db.query(models.Camera).all()}
+        finally:
+            if own_session:
+                db.close()
+
+        with self._lock:
+            self._version += 1
+            snapshot = TopologySnapshot(self._version, greenhouses, sensors, devices, cameras)
+            self.loads += 1
+            self.last_load_time = time.perf_counter() - started
+            # Пока шла загрузка, кэш могли сбросить - такой снимок отдаем вызывающему, но не сохраняем
+            if generation == self._generation:
+                self._snapshot = snapshot
+
+        print(f"🗺️ Топология загружена: {len(greenhouses)} теплиц, {len(sensors)} датчиков, "
+              f"{len(devices)} устройств, {len(cameras)} камер за {self.last_load_time * 1000:.1f} мс")
+        return snapshot
+
+    def invalidate(self):
+        """Полный сброс кэша: следующий get() загрузит топологию из БД"""
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+            self.invalidations += 1
+
+    def _patch(self, patch_fn: Callable[[Dict[str, Dict[int, dict]]], None]):
+        """Создание нового снимка с изменениями (если кэш еще не загружен - ничего не делаем)"""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                # Идущая сейчас загрузка могла прочитать данные до этой записи
+                self._generation += 1
+                return
+            tables = {
+                'greenhouses': dict(snapshot.greenhouses),
+                'sensors': dict(snapshot.sensors),
+                'devices': dict(snapshot.devices),
+                'cameras': dict(snapshot.cameras),
+            }
+            patch_fn(tables)
+            self._version += 1
+            self._snapshot = TopologySnapshot(self._version, **tables)
+            self.patches += 1
+
+    def upsert_greenhouse(self, greenhouse):
+        def patch(tables):
+            tables['greenhouses'][greenhouse.greenhouse_id] = _greenhouse_dict(greenhouse)
+        self._patch(patch)
+
+    def remove_greenhouse(self, greenhouse_id: int):
+        # Вместе с теплицей каскадно удаляются ее датчики, устройства и камеры
+        def patch(tables):
+            tables['greenhouses'].pop(greenhouse_id, None)
+            for table in ('sensors', 'devices', 'cameras'):
+                tables[table] = {
+                    key: value for key, value in tables[table].items() if value['greenhouse_id'] != greenhouse_id
+                }
+        self._patch(patch)
+
+    def upsert_sensor(self, sensor):
+        def patch(tables):
+            tables['sensors'][sensor.sensor_id] = _sensor_dict(sensor)
+        self._patch(patch)
+
+    def remove_sensor(self, sensor_id: int):
+        # Вместе с датчиком каскадно удаляются привязанные к нему устройства
+        def patch(tables):
+            tables['sensors'].pop(sensor_id, None)
+            tables['devices'] = {
+                key: value for key, value in tables['devices'].items() if value['sensor_id'] != sensor_id
+            }
+        self._patch(patch)
+
+    def upsert_device(self, device):
+        def patch(tables):
+            tables['devices'][device.id] = _device_dict(device)
+        self._patch(patch)
+
+    def remove_device(self, device_id: int):
+        def patch(tables):
+            tables['devices'].pop(device_id, None)
+        self._patch(patch)
+
+    def upsert_camera(self, camera):
+        def patch(tables):
+            tables['cameras'][camera.id] = _camera_dict(camera)
+        self._patch(patch)
+
+    def remove_camera(self, camera_id: int):
+        def patch(tables):
+            tables['cameras'].pop(camera_id, None)
+        self._patch(patch)
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot is not None else None,
+            "greenhouses": len(snapshot.greenhouses) if snapshot is not None else 0,
+            "sensors": len(snapshot.sensors) if snapshot is not None else 0,
+            "devices": len(snapshot.devices) if snapshot is not None else 0,
+            "cameras": len(snapshot.cameras) if snapshot is not None else 0,
+            "loads": self.loads,
+            "hits": self.hits,
+            "patches": self.patches,
+            "invalidations": self.invalidations,
+            "last_load_ms": round(self.last_load_time * 1000, 3) if self.last_load_time is not None else None,
+        }
+
+
+# Кэш топологии процесса
+topology_cache = TopologyCache()
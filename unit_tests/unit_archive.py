@@ -0,0 +1,88 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from database import get_db
+from crud import archive
+import models
+
+# Тестовая база данных
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+REPORT_TIMES = [datetime(2025, 1, 30, 12), datetime(2025, 1, 31, 12), datetime(2025, 2, 1, 12)]
+
+
+@pytest.fixture(scope="function")
+def test_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    models.Base.metadata.create_all(bind=engine)
+    yield
+    models.Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def greenhouse_with_reports(test_db):
+    rule = client.post("/agronomic_rules/create_agronomic_rules",
+                       json={"type_crop": "tomato", "rule_params": json.dumps({"temperature": 25})}).json()
+    greenhouse = client.post("/greenhouses/", json={"name": "Archive", "agrorule_id": rule["id"]}).json()
+    for i, report_time in enumerate(REPORT_TIMES):
+        client.post("/reports/", json={"greenhouse_id": greenhouse["greenhouse_id"],
+                                       "temperature_value": 20.5 + i, "report_time": report_time.isoformat()})
+    return greenhouse["greenhouse_id"]
+
+
+def test_archive_export_download_and_read(greenhouse_with_reports):
+    """Тест: архив разбивается по месяцам, скачивается и читается обратно"""
+    greenhouse_id = greenhouse_with_reports
+
+    response = client.post("/reports/archive/", params={"greenhouse_id": greenhouse_id, "format": "npz"})
+    assert response.status_code == 200
+    assert [(item["month"], item["rows"]) for item in response.json()] == [("2025-01", 2), ("2025-02", 1)]
+
+    listing = client.get("/reports/archive/", params={"greenhouse_id": greenhouse_id}).json()
+    assert [item["month"] for item in listing] == ["2025-01", "2025-02"]
+
+    download = client.get(f"/reports/archive/{greenhouse_id}/2025-01")
+    assert download.status_code == 200
+    assert download.content[:2] == b"PK"
+    assert client.get(f"/reports/archive/{greenhouse_id}/2024-12").status_code == 404
+
+    data = archive.read_reports_archive(greenhouse_id, start=datetime(2025, 1, 31), end=datetime(2025, 3, 1),
+                                        columns=["report_time", "temperature_value", "co2_value"])
+    assert data["temperature_value"].dtype == np.float32
+    assert data["report_time"].dtype == np.int64
+    np.testing.assert_allclose(data["temperature_value"], [21.5, 22.5])
+    assert np.isnan(data["co2_value"]).all()
+    assert data["report_time"][0] == np.datetime64(REPORT_TIMES[1], "ns").astype(np.int64)
+
+
+def test_archive_rejects_unknown_format(test_db):
+    """Тест: неизвестный формат архива"""
+    assert client.post("/reports/archive/", params={"format": "xlsx"}).status_code == 400
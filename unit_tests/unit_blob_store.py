@@ -0,0 +1,241 @@
+import json
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from database import get_db
+from blob_store import BlobStore, LocalBlobStore, blob_key
+from crud import detections
+import models
+
+# Тестовая база данных
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+def make_jpeg(width: int, height: int, color: str) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = LocalBlobStore(str(tmp_path / "blobs"))
+    monkeypatch.setattr(detections, "blob_store", store)
+    return store
+
+
+@pytest.fixture(scope="function")
+def test_db():
+    models.Base.metadata.create_all(bind=engine)
+    yield
+    models.Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def greenhouse_id(test_db):
+    rule = client.post("/agronomic_rules/create_agronomic_rules",
+                       json={"type_crop": "tomato", "rule_params": json.dumps({"temperature": 25})}).json()
+    return client.post("/greenhouses/", json={"name": "Blobs", "agrorule_id": rule["id"]}).json()["greenhouse_id"]
+
+
+def test_local_blob_store_is_content_addressed(store):
+    """Тест: ключ - SHA-256, одинаковое содержимое хранится один раз, чтение по диапазону"""
+    data = b"0123456789" * 10000
+
+    key = store.put(data)
+
+    assert key == blob_key(data)
+    assert store.put(data) == key
+    assert store.path(key).endswith(f"{key[:2]}/{key[2:4]}/{key}")
+    assert list(store.keys()) == [key]
+    assert store.read(key) == data
+    assert b"".join(store.iter_chunks(key, 5, 25, chunk_size=7)) == data[5:25]
+    with pytest.raises(ValueError):
+        store.path("../../etc/passwd")
+
+
+def test_incomplete_blob_store_cannot_be_created():
+    """Тест: хранилище без реализации всех методов интерфейса не создается"""
+    class PutOnlyStore(BlobStore):
+        def put(self, data: bytes) -> str:
+            return blob_key(data)
+
+    with pytest.raises(TypeError):
+        PutOnlyStore()
+
+def test_migrate_legacy_photos_and_stream(store, greenhouse_id):
+    """Тест: перенос фото из строк в хранилище, отдача из хранилища и удаление блобов"""
+    photo, processed = make_jpeg(32, 16, "green"), make_jpeg(32, 16, "red")
+    db = TestingSessionLocal()
+    db.add(models.Detection(greenhouse_id=greenhouse_id, confidence_level=0.5, photo=photo, detection_photo=processed))
+    db.commit()
+
+    assert detections.migrate_detection_blobs(db, batch_size=1) == 1
+
+    detection = db.query(models.Detection).one()
+    assert detection.photo is None and detection.detection_photo is None
+    assert (detection.photo_hash, detection.photo_size) == (blob_key(photo), len(photo))
+    assert (detection.photo_width, detection.photo_height) == (32, 16)
+    detection_id = detection.id
+    db.close()
+
+    response = client.get(f"/detections/{detection_id}/photo")
+    assert response.status_code == 200
+    assert response.content == photo
+    assert client.get(f"/detections/{detection_id}/detection-photo").content == processed
+
+    assert client.delete(f"/detections/{detection_id}").status_code == 200
+    # Недавние блобы не удаляются сразу: на них может сослаться параллельная загрузка
+    assert len(list(store.keys())) == 2
+    db = TestingSessionLocal()
+    try:
+        assert detections.collect_orphan_blobs(db, min_age_seconds=0) == 2
+    finally:
+        db.close()
+    assert list(store.keys()) == []
+
+
+def test_release_blobs_keeps_referenced_and_recent_blobs(store, greenhouse_id):
+    """Тест: удаляются только старые блобы без ссылок"""
+    import os
+
+    db = TestingSessionLocal()
+    try:
+        referenced = make_jpeg(8, 8, "red")
+        detection = models.Detection(greenhouse_id=greenhouse_id, confidence_level=0.1)
+        detections.store_detection_photos(detection, referenced, referenced, 8, 8)
+        db.add(detection)
+        db.commit()
+        old_orphan, recent_orphan = store.put(b"old"), store.put(b"recent")
+        os.utime(store.path(old_orphan), (0, 0))
+        os.utime(store.path(detection.photo_hash), (0, 0))
+
+        detections.release_blobs(db, [detection.photo_hash, old_orphan, recent_orphan])
+    finally:
+        db.close()
+
+    assert set(store.keys()) == {blob_key(referenced), recent_orphan}
+
+
+def test_detection_list_does_not_load_photos(store, greenhouse_id):
+    """Тест: список детекций возвращает размеры фото, не выбирая сами байты"""
+    from sqlalchemy import event
+
+    photo = make_jpeg(8, 8, "blue")
+    db = TestingSessionLocal()
+    db.add(models.Detection(greenhouse_id=greenhouse_id, confidence_level=0.7, photo=photo, detection_photo=photo))
+    db.commit()
+    db.close()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get("/detections/")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    item = response.json()[0]
+    assert item["photo_size"] == item["detection_photo_size"] == len(photo)
+    assert "photo" not in item
+    assert not any("AS detections_photo" in statement or "AS detections_detection_photo" in statement
+                   for statement in statements)
+
+
+def test_photo_etag_and_range(store, greenhouse_id):
+    """Тест: ETag по хэшу, 304 на If-None-Match, частичная отдача по Range"""
+    photo = make_jpeg(64, 64, "yellow")
+    db = TestingSessionLocal()
+    detection = models.Detection(greenhouse_id=greenhouse_id, confidence_level=0.3)
+    detections.store_detection_photos(detection, photo, photo, 64, 64)
+    db.add(detection)
+    db.commit()
+    url = f"/detections/{detection.id}/photo"
+    db.close()
+
+    full = client.get(url)
+    etag = full.headers["etag"]
+    assert etag == f'"{blob_key(photo)}"'
+    assert "max-age" in full.headers["cache-control"]
+
+    not_modified = client.get(url, headers={"If-None-Match": f"W/{etag}"})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    partial = client.get(url, headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == photo[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(photo)}"
+    assert client.get(url, headers={"Range": "bytes=-5"}).content == photo[-5:]
+    assert client.get(url, headers={"Range": "bytes=10-19", "If-Range": '"other"'}).status_code == 200
+    assert client.get(url, headers={"Range": f"bytes={len(photo)}-"}).status_code == 416
+
+
+def test_photo_renditions_are_cached(store, greenhouse_id, monkeypatch):
+    """Тест: уменьшенная копия в WebP создается при первом запросе и берется из кэша"""
+    from renditions import RenditionCache
+
+    cache = RenditionCache(max_bytes=10 * 1024 * 1024)
+    monkeypatch.setattr(detections, "rendition_cache", cache)
+    photo = make_jpeg(800, 600, "purple")
+    db = TestingSessionLocal()
+    detection = models.Detection(greenhouse_id=greenhouse_id, confidence_level=0.3)
+    detections.store_detection_photos(detection, photo, photo, 800, 600)
+    db.add(detection)
+    db.commit()
+    url = f"/detections/{detection.id}/photo"
+    db.close()
+
+    thumb = client.get(url, params={"size": "thumb"})
+    assert thumb.status_code == 200
+    assert thumb.headers["content-type"] == "image/webp"
+    assert Image.open(BytesIO(thumb.content)).size == (256, 192)
+    assert thumb.headers["etag"] != client.get(url).headers["etag"]
+
+    assert client.get(url, params={"size": "thumb"}).content == thumb.content
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert client.get(url, params={"size": "huge"}).status_code == 422
+
+
+def test_rendition_cache_evicts_least_recently_used(monkeypatch):
+    """Тест: кэш копий укладывается в бюджет байт, вытесняя давно не использованные"""
+    import renditions
+
+    monkeypatch.setattr(renditions, "render", lambda image_bytes, max_side: image_bytes)
+    cache = renditions.RenditionCache(max_bytes=25)
+    cache.get("a", "thumb", lambda: b"x" * 10)
+    cache.get("b", "thumb", lambda: b"y" * 10)
+    cache.get("a", "thumb", lambda: b"x" * 10)
+    cache.get("c", "thumb", lambda: b"z" * 10)
+
+    assert cache.stats()["bytes"] == 20
+    assert cache.evictions == 1
+    assert cache.get("a", "thumb", lambda: b"") == b"x" * 10
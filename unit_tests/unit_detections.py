@@ -0,0 +1,85 @@
+import json
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from database import get_db
+from blob_store import LocalBlobStore
+from crud import detections
+from inference_pool import WorkerPool
+import models
+
+# Тестовая база данных
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+def make_jpeg() -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (40, 30), "green").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def fake_process_image(image_bytes):
+    return {"processed_image": image_bytes[::-1], "confidence_level": 0.75, "detection_count": 1,
+            "width": 40, "height": 30}
+
+
+@pytest.fixture(scope="function")
+def greenhouse_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(detections, "blob_store", LocalBlobStore(str(tmp_path)))
+    monkeypatch.setattr(detections, "process_image_with_ml", fake_process_image)
+    models.Base.metadata.create_all(bind=engine)
+    rule = client.post("/agronomic_rules/create_agronomic_rules",
+                       json={"type_crop": "tomato", "rule_params": json.dumps({"temperature": 25})}).json()
+    yield client.post("/greenhouses/", json={"name": "Pool", "agrorule_id": rule["id"]}).json()["greenhouse_id"]
+    models.Base.metadata.drop_all(bind=engine)
+
+
+def test_create_detection_runs_in_pool(greenhouse_id, monkeypatch):
+    """Тест: обработка изображения выполняется через пул, результат сохраняется"""
+    pool = WorkerPool("test-detections", max_workers=0, max_pending=1, timeout=5)
+    monkeypatch.setattr(detections, "detection_pool", pool)
+
+    response = client.post("/detections/", data={"greenhouse_id": greenhouse_id},
+                           files={"photo": ("photo.jpg", make_jpeg(), "image/jpeg")})
+
+    assert response.status_code == 200
+    assert response.json()["confidence_level"] == 0.75
+    assert pool.stats()["completed"] == 1
+    assert client.get(f"/detections/{response.json()['id']}/detection-photo").content == make_jpeg()[::-1]
+
+
+def test_create_detection_rejected_when_pool_is_full(greenhouse_id, monkeypatch):
+    """Тест: при заполненной очереди пула запрос получает 503"""
+    monkeypatch.setattr(detections, "detection_pool", WorkerPool("full", max_workers=0, max_pending=0, timeout=1))
+
+    response = client.post("/detections/", data={"greenhouse_id": greenhouse_id},
+                           files={"photo": ("photo.jpg", make_jpeg(), "image/jpeg")})
+
+    assert response.status_code == 503
@@ -0,0 +1,36 @@
+import numpy as np
+
+from downsampling import downsample, lttb, minmax
+
+
+def test_lttb_keeps_endpoints_and_peak():
+    """Тест: LTTB сохраняет края ряда и выраженный пик"""
+    x = np.arange(1000, dtype=np.int64)
+    y = np.sin(x / 50.0)
+    y[437] = 10.0
+
+    indices = lttb(x, y, 50)
+
+    assert indices.shape[0] == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 437 in indices
+
+
+def test_minmax_keeps_extremes_per_bucket():
+    """Тест: min/max по интервалам сохраняет минимум и максимум каждого интервала"""
+    x = np.arange(100, dtype=np.int64)
+    y = np.tile([1.0, 5.0, 3.0, -2.0], 25)
+
+    indices = minmax(x, y, 10)
+
+    assert indices.shape[0] <= 10
+    assert y[indices].max() == 5.0 and y[indices].min() == -2.0
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_downsample_returns_short_series_unchanged():
+    """Тест: ряд короче порога не прореживается"""
+    x = np.arange(5)
+    np.testing.assert_array_equal(downsample(x, x * 2.0, 10, "lttb"), x)
+    np.testing.assert_array_equal(downsample(x, x * 2.0, 10, "minmax"), x)
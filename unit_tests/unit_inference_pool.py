@@ -0,0 +1,111 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from inference_pool import PoolBusyError, WorkerModelStats, WorkerPool, predict_models
+
+
+def test_inline_pool_runs_in_caller_thread():
+    """Тест: при max_workers=0 задача выполняется без процессов"""
+    pool = WorkerPool("test", max_workers=0, max_pending=1, timeout=1)
+
+    assert pool.run_sync(sum, [1, 2, 3]) == 6
+    assert pool.stats()["completed"] == 1
+    assert pool.stats()["running"] is False
+
+
+def test_pool_rejects_when_queue_is_full():
+    """Тест: backpressure - задачи сверх емкости очереди отклоняются"""
+    pool = WorkerPool("test", max_workers=0, max_pending=1, timeout=0.1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking_task():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    worker = threading.Thread(target=pool.run_sync, args=(blocking_task,))
+    worker.start()
+    started.wait(5)
+
+    with pytest.raises(PoolBusyError):
+        pool.submit(sum, [1], block=False)
+    with pytest.raises(PoolBusyError):
+        pool.run_sync(sum, [1])
+
+    release.set()
+    worker.join(5)
+    assert pool.stats()["rejected"] == 2
+    assert pool.run_sync(sum, [1]) == 1
+
+
+def test_broken_process_pool_is_recreated():
+    """Тест: после падения процесса пула следующая задача выполняется в новом пуле"""
+    pool = WorkerPool("test", max_workers=1, max_pending=1, timeout=60)
+    try:
+        broken = pool.start()
+        with pytest.raises(BrokenProcessPool):
+            pool.run_sync(os._exit, 1)
+        # Обработчик завершения задачи выполняется в служебном потоке пула - дожидаемся его
+        deadline = time.monotonic() + 10
+        while pool.stats()["failed"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert pool.run_sync(abs, -5) == 5
+        assert pool.start() is not broken
+    finally:
+        pool.shutdown()
+    assert pool.stats()["failed"] == 1
+
+
+def test_process_pool_predicts_batch():
+    """Тест: пакетные предсказания в процессе пула совпадают с предсказаниями в текущем процессе"""
+    pool = WorkerPool("test", max_workers=1, max_pending=2, timeout=60)
+    report_time = datetime(2025, 6, 1, 12, 0)
+    args = (
+        ("humidity", "temperature", "co2"),
+        report_time,
+        np.array([22.0, 25.0], dtype=np.float32),
+        np.array([60.0, 55.0], dtype=np.float32),
+        np.array([800.0, 900.0], dtype=np.float32),
+        np.array([1000.0, 1500.0]),
+    )
+
+    try:
+        result, (pid, models_stats) = asyncio.run(pool.run(predict_models, *args))
+    finally:
+        pool.shutdown()
+
+    expected, _ = predict_models(*args)
+    assert set(result) == {"humidity", "temperature", "co2"}
+    # Статистика приходит из процесса пула: модели там загружены и вызваны
+    assert pid != os.getpid()
+    assert models_stats["co2"]["loaded"] and models_stats["co2"]["calls"] == 1
+    for model_name, values in expected.items():
+        np.testing.assert_allclose(result[model_name], values, rtol=1e-6)
+
+
+def test_worker_model_stats_merge_processes():
+    """Тест: статистика моделей суммируется по процессам, повторный снимок процесса заменяет прежний"""
+    stats = WorkerModelStats()
+    snapshot = lambda calls: {"co2": {"name": "co2", "loaded": True, "features": 5, "load_time_ms": 10.0,
+                                      "memory_bytes": 100, "calls": calls, "rows": calls * 2, "avg_call_ms": 2.0},
+                              "humidity": {"name": "humidity", "loaded": False}}
+    stats.record(1, snapshot(1))
+    stats.record(1, snapshot(3))
+    stats.record(2, snapshot(1))
+
+    merged = stats.stats()
+
+    assert merged["co2"]["processes"] == 2
+    assert merged["co2"]["calls"] == 4
+    assert merged["co2"]["rows"] == 8
+    assert merged["co2"]["avg_call_ms"] == 2.0
+    assert merged["humidity"]["loaded"] is False
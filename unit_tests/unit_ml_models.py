@@ -0,0 +1,108 @@
+import pickle
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from features import FEATURE_NAMES, build_feature_matrix
+from ml_models import ModelRegistry, Predictor, load_linear_model, HUMIDITY_MODEL_PATH
+
+
+def test_registry_loads_model_once():
+    """Тест: модель загружается один раз и переиспользуется"""
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return Predictor("fake", ["a", "b"], lambda x: x.sum(axis=1))
+
+    registry = ModelRegistry()
+    registry.register("fake", loader)
+
+    first = registry.get("fake")
+    second = registry.get("fake")
+
+    assert first is second
+    assert len(loads) == 1
+    assert registry.is_loaded("fake")
+
+
+def test_registry_stats_counts_calls():
+    """Тест: статистика вызовов и размера модели"""
+    registry = ModelRegistry()
+    registry.register("fake", lambda: Predictor("fake", ["a", "b"], lambda x: x.sum(axis=1), memory_bytes=16))
+    registry.register("lazy", lambda: Predictor("lazy", ["a"], lambda x: x))
+
+    predictor = registry.get("fake")
+    result = predictor(np.array([[1.0, 2.0], [3.0, 4.0]]))
+    predictor(np.array([1.0, 1.0]))
+
+    assert result.tolist() == [3.0, 7.0]
+    stats = registry.stats()
+    assert stats["fake"]["calls"] == 2
+    assert stats["fake"]["rows"] == 3
+    assert stats["fake"]["memory_bytes"] == 16
+    assert stats["lazy"]["loaded"] is False
+
+
+def test_registry_unknown_model():
+    """Тест: обращение к незарегистрированной модели"""
+    with pytest.raises(KeyError):
+        ModelRegistry().get("missing")
+
+
+def test_linear_model_prediction_shape():
+    """Тест: линейная модель возвращает по одному предсказанию на строку"""
+    predictor = load_linear_model(HUMIDITY_MODEL_PATH)
+    features = np.zeros((5, len(predictor.feature_names)))
+
+    assert predictor(features).shape == (5,)
+
+
+def test_linear_model_folded_scaler_matches_original():
+    """Тест: свертка scaler-а в веса дает те же предсказания, что scaler.transform + X @ w + b"""
+    with open(HUMIDITY_MODEL_PATH, 'rb') as f:
+        model_weights = pickle.load(f)
+    predictor = load_linear_model(HUMIDITY_MODEL_PATH)
+
+    scaler = model_weights['scaler']
+    features = scaler.mean_ + np.random.default_rng(0).standard_normal((20, len(scaler.mean_))) * scaler.scale_
+    expected = scaler.transform(features) @ model_weights['w'] + model_weights['b']
+
+    np.testing.assert_allclose(predictor(features), expected, rtol=1e-9, atol=1e-9)
+
+
+def test_feature_matrix_matches_per_row_features():
+    """Тест: векторные признаки совпадают с признаками, собранными вручную для одной теплицы"""
+    report_time = datetime(2025, 3, 14, 15, 9)
+    temperature, humidity, co2, illuminance = 21.5, 63.0, 812.0, 1234.0
+    expected = {
+        'greenhous_temperature_celsius': temperature,
+        'greenhouse_humidity_percentage': humidity,
+        'greenhouse_illuminance_lux': illuminance,
+        'online_temperature_celsius': temperature - 2.0,
+        'online_humidity_percentage': humidity - 5.0,
+        'greenhouse_total_volatile_organic_compounds_ppb': 200.0,
+        'greenhouse_equivalent_co2_ppm': co2,
+        'hour_sin': np.sin(2 * np.pi * report_time.hour / 24),
+        'hour_cos': np.cos(2 * np.pi * report_time.hour / 24),
+        'minute_sin': np.sin(2 * np.pi * report_time.minute / 60),
+        'minute_cos': np.cos(2 * np.pi * report_time.minute / 60),
+        'day_of_week_sin': np.sin(2 * np.pi * report_time.weekday() / 7),
+        'day_of_week_cos': np.cos(2 * np.pi * report_time.weekday() / 7),
+        'day_of_month_sin': np.sin(2 * np.pi * (report_time.day - 1) / 31),
+        'day_of_month_cos': np.cos(2 * np.pi * (report_time.day - 1) / 31),
+        'month_sin': np.sin(2 * np.pi * (report_time.month - 1) / 12),
+        'month_cos': np.cos(2 * np.pi * (report_time.month - 1) / 12),
+        'day_of_year_sin': np.sin(2 * np.pi * (report_time.timetuple().tm_yday - 1) / 365),
+        'day_of_year_cos': np.cos(2 * np.pi * (report_time.timetuple().tm_yday - 1) / 365),
+    }
+    feature_names = list(reversed(FEATURE_NAMES))
+
+    matrix = build_feature_matrix(report_time, [temperature] * 3, [humidity] * 3, [co2] * 3, feature_names,
+                                  illuminance=np.full(3, illuminance))
+
+    assert matrix.shape == (3, len(feature_names))
+    assert matrix.dtype == np.float32
+    assert matrix.flags['C_CONTIGUOUS']
+    np.testing.assert_allclose(matrix[1], [expected[name] for name in feature_names], rtol=1e-6, atol=1e-6)
@@ -0,0 +1,64 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from ml_models import CO2_NN_SCALERS_PATH, CO2_NN_WEIGHTS_PATH, load_co2_nn_model
+from nn_inference import (BATCH_NORM_EPSILON, CO2_NN_LAYERS, NumpyDenseNetwork, convert_h5_to_npz,
+                          fold_network, read_weights_h5)
+
+
+def naive_forward(weights, x):
+    """Прямой проход без свертки: Dense -> BatchNorm как в Keras, Dropout пропускается"""
+    for layer_name, activation in CO2_NN_LAYERS:
+        if layer_name.startswith("dropout"):
+            continue
+        if layer_name.startswith("batch_normalization"):
+            gamma, beta, mean, var = (weights[f"{layer_name}/{i}"] for i in range(4))
+            x = (x - mean) / np.sqrt(var + BATCH_NORM_EPSILON) * gamma + beta
+            continue
+        x = x @ weights[f"{layer_name}/0"] + weights[f"{layer_name}/1"]
+        if activation == "relu":
+            x = np.maximum(x, 0)
+    return x
+
+
+@pytest.fixture(scope="module")
+def co2_inputs():
+    with open(CO2_NN_SCALERS_PATH, 'rb') as f:
+        scaler_X = pickle.load(f)['scaler_X']
+    rng = np.random.default_rng(42)
+    return scaler_X.mean_ + rng.standard_normal((512, len(scaler_X.mean_))) * scaler_X.scale_
+
+
+def test_fold_network_matches_unfolded_layers():
+    """Тест: свертка BatchNorm не меняет результат прямого прохода"""
+    weights = read_weights_h5(CO2_NN_WEIGHTS_PATH)
+    x = np.random.default_rng(0).standard_normal((64, weights["dense/0"].shape[0]))
+
+    network = NumpyDenseNetwork(fold_network(weights), dtype=np.float64)
+
+    np.testing.assert_allclose(network(x), naive_forward(weights, x), rtol=1e-6, atol=1e-6)
+
+
+def test_npz_weights_give_same_result(tmp_path, co2_inputs):
+    """Тест: веса из .npz и из .weights.h5 дают одинаковые предсказания"""
+    npz_path = str(tmp_path / "co2.npz")
+    convert_h5_to_npz(CO2_NN_WEIGHTS_PATH, npz_path)
+
+    from_h5 = NumpyDenseNetwork.from_weights(CO2_NN_WEIGHTS_PATH)
+    from_npz = NumpyDenseNetwork.from_weights(npz_path)
+
+    np.testing.assert_array_equal(from_h5(co2_inputs), from_npz(co2_inputs))
+
+
+def test_numpy_engine_matches_keras(co2_inputs):
+    """Тест: NumPy-движок совпадает с Keras моделью в пределах допуска"""
+    pytest.importorskip("tensorflow")
+    from ml_models import load_co2_nn_keras_model
+
+    numpy_predictor = load_co2_nn_model()
+    keras_predictor = load_co2_nn_keras_model()
+
+    np.testing.assert_allclose(numpy_predictor(co2_inputs), keras_predictor(co2_inputs), rtol=1e-4, atol=0.05)
+
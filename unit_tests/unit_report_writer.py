@@ -0,0 +1,135 @@
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+import schemas
+from report_writer import ReportWriter
+
+# Тестовая база данных
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# База, к которой невозможно подключиться (каталога не существует)
+unavailable_engine = create_engine("sqlite:////nonexistent-dir/reports.db")
+UnavailableSessionLocal = sessionmaker(bind=unavailable_engine)
+
+
+@pytest.fixture(scope="function")
+def greenhouse_id():
+    models.Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    rule = models.AgronomicRule(type_crop="tomato", rule_params="{}")
+    db.add(rule)
+    db.commit()
+    greenhouse = models.Greenhouse(agrorule_id=rule.id, name="Writer")
+    db.add(greenhouse)
+    db.commit()
+    yield greenhouse.greenhouse_id
+    db.close()
+    models.Base.metadata.drop_all(bind=engine)
+
+
+def make_row(greenhouse_id: int, value: float) -> dict:
+    return schemas.ReportCreate(greenhouse_id=greenhouse_id, temperature_value=value,
+                                report_time=datetime.now()).model_dump()
+
+
+def test_concurrent_writes_are_grouped(greenhouse_id, tmp_path):
+    """Тест: одновременные записи из разных потоков объединяются в общие транзакции"""
+    writer = ReportWriter(flush_size=100, flush_interval=0.2, spill_path=str(tmp_path / "spill.ndjson"))
+    results = {}
+
+    def write(i):
+        db = TestingSessionLocal()
+        try:
+            results[i] = writer.write(db, [make_row(greenhouse_id, i)])[0]
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(set(results.values())) == 10
+    assert writer.stats()["rows_written"] == 10
+    assert writer.stats()["batches"] < 10
+    assert writer.stats()["queue_depth"] == 0
+
+
+def test_bad_row_fails_only_its_writer(greenhouse_id, tmp_path):
+    """Тест: ошибка одной строки пачки (не недоступность БД) достается только ее автору"""
+    writer = ReportWriter(flush_size=10, flush_interval=0, spill_path=str(tmp_path / "spill.ndjson"))
+    bad_row = {**make_row(greenhouse_id, 2), "greenhouse_id": None}
+    batch = [(row, Future()) for row in (make_row(greenhouse_id, 1), bad_row, make_row(greenhouse_id, 3))]
+
+    db = TestingSessionLocal()
+    try:
+        writer._flush(db, batch)
+    finally:
+        db.close()
+
+    good_ids = [batch[0][1].result(0), batch[2][1].result(0)]
+    assert all(report_id is not None for report_id in good_ids)
+    assert batch[1][1].exception(0) is not None
+    assert writer.stats()["rows_written"] == 2
+    assert writer.stats()["rows_failed"] == 1
+
+def test_spill_and_replay(greenhouse_id, tmp_path):
+    """Тест: при недоступной БД отчеты пишутся в файл и переносятся после восстановления"""
+    writer = ReportWriter(flush_size=10, flush_interval=0, spill_path=str(tmp_path / "spill.ndjson"))
+
+    db = UnavailableSessionLocal()
+    try:
+        assert writer.write(db, [make_row(greenhouse_id, 1), make_row(greenhouse_id, 2)]) == [None, None]
+    finally:
+        db.close()
+    assert writer.stats()["rows_spilled"] == 2
+    assert writer.stats()["spill_bytes"] > 0
+
+    db = TestingSessionLocal()
+    try:
+        [report_id] = writer.write(db, [make_row(greenhouse_id, 3)])
+        values = sorted(float(report.temperature_value) for report in db.query(models.Report).all())
+    finally:
+        db.close()
+
+    assert report_id is not None
+    assert values == [1.0, 2.0, 3.0]
+    assert writer.stats()["rows_replayed"] == 2
+    assert writer.stats()["spill_bytes"] == 0
+
+
+def test_replay_quarantines_torn_spill_line(greenhouse_id, tmp_path):
+    """Тест: оборванная строка файла не ломает запись, а переносится в карантин"""
+    spill_path = tmp_path / "spill.ndjson"
+    writer = ReportWriter(flush_size=10, flush_interval=0, spill_path=str(spill_path))
+    writer._spill([make_row(greenhouse_id, 1)])
+    with open(spill_path, "a", encoding="utf-8") as f:
+        f.write('{"greenhouse_id": ')
+
+    db = TestingSessionLocal()
+    try:
+        ids = writer.write(db, [make_row(greenhouse_id, 2)])
+        values = sorted(float(report.temperature_value) for report in db.query(models.Report).all())
+    finally:
+        db.close()
+
+    assert ids[0] is not None
+    assert values == [1.0, 2.0]
+    assert not spill_path.exists()
+    assert (tmp_path / "spill.ndjson.corrupt").read_text(encoding="utf-8") == '{"greenhouse_id": \n'
+    assert writer.stats()["replay_failures"] == 1
@@ -4,12 +4,14 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 
 from main import app
 from database import get_db
 import models
+import schemas
+from fastapi import HTTPException
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
@@ -72,6 +74,16 @@ def test_create_report(test_db, sample_greenhouse):
     assert "id" in data
 
 
+def test_create_report_returns_stored_row(test_db, sample_greenhouse):
+    """Тест: POST возвращает отчет в том виде, в каком его сохранила БД, а не тело запроса"""
+    report_time = datetime(2025, 1, 1, 12, 0, 0, 600000, tzinfo=timezone(timedelta(hours=3)))
+    response = client.post("/reports/", json={"greenhouse_id": sample_greenhouse["greenhouse_id"],
+                                              "temperature_value": 21.5, "report_time": report_time.isoformat()})
+    assert response.status_code == 200
+
+    created = response.json()
+    assert created == client.get(f"/reports/{created['id']}").json()
+
 def test_read_report(test_db, sample_greenhouse):
     """Тест получения отчета по ID"""
     report_data = {
@@ -219,4 +231,189 @@ def test_create_report_invalid_greenhouse(test_db):
 
     response = client.post("/reports/", json=report_data)
     assert response.status_code == 400
-    assert "Greenhouse not found" in response.json()["detail"]
\ No newline at end of file
+    assert "Greenhouse not found" in response.json()["detail"]
+
+def test_create_reports_bulk(test_db, sample_greenhouse):
+    """Тест: пачка отчетов записывается одной транзакцией, id возвращаются в порядке строк"""
+    from crud.reports import BULK_INSERT_CHUNK_SIZE, create_reports_bulk_db
+
+    greenhouse_id = sample_greenhouse["greenhouse_id"]
+    rows = [
+        schemas.ReportCreate(greenhouse_id=greenhouse_id, temperature_value=i, report_time=datetime.now()).model_dump()
+        for i in range(BULK_INSERT_CHUNK_SIZE + 5)
+    ]
+
+    db = TestingSessionLocal()
+    try:
+        ids = create_reports_bulk_db(db, rows, greenhouse_ids={greenhouse_id})
+        with pytest.raises(HTTPException):
+            create_reports_bulk_db(db, rows[:1], greenhouse_ids={greenhouse_id + 1})
+    finally:
+        db.close()
+
+    assert len(ids) == len(rows)
+    assert len(set(ids)) == len(rows)
+    response = client.get(f"/reports/{ids[-1]}")
+    assert float(response.json()["temperature_value"]) == BULK_INSERT_CHUNK_SIZE + 4
+
+
+def test_read_reports_with_cursor(test_db, sample_greenhouse):
+    """Тест: курсорная пагинация проходит все отчеты без пропусков и повторов (в т.ч. с одинаковым временем)"""
+    report_time = datetime(2025, 1, 1, 12, 0).isoformat()
+    for i in range(5):
+        client.post("/reports/", json={"greenhouse_id": sample_greenhouse["greenhouse_id"],
+                                       "temperature_value": i, "report_time": report_time})
+
+    ids = []
+    params = {"limit": 2}
+    while True:
+        response = client.get(f"/reports/greenhouse/{sample_greenhouse['greenhouse_id']}", params=params)
+        assert response.status_code == 200
+        ids += [report["id"] for report in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params = {"limit": 2, "cursor": cursor}
+
+    skip_ids = [report["id"] for report in client.get("/reports/", params={"limit": 10}).json()]
+    assert ids == skip_ids
+    assert len(set(ids)) == 5
+    assert client.get("/reports/", params={"cursor": "broken"}).status_code == 400
+
+
+def test_latest_report_cache(test_db, sample_greenhouse):
+    """Тест: последний отчет берется из кэша и учитывает изменение и удаление"""
+    from report_cache import latest_report_cache
+
+    latest_report_cache.clear()
+    greenhouse_id = sample_greenhouse["greenhouse_id"]
+    older = client.post("/reports/", json={"greenhouse_id": greenhouse_id, "temperature_value": 1.0,
+                                           "report_time": datetime(2025, 1, 1, 10).isoformat()}).json()
+    newer = client.post("/reports/", json={"greenhouse_id": greenhouse_id, "temperature_value": 2.0,
+                                           "report_time": datetime(2025, 1, 1, 11).isoformat()}).json()
+    client.post("/reports/", json={"greenhouse_id": greenhouse_id, "temperature_value": 0.5,
+                                   "report_time": datetime(2025, 1, 1, 9).isoformat()})
+
+    hits = latest_report_cache.stats()["hits"]
+    assert client.get(f"/reports/greenhouse/{greenhouse_id}/latest").json()["id"] == newer["id"]
+    assert latest_report_cache.stats()["hits"] == hits + 1
+
+    client.put(f"/reports/{newer['id']}", json={"temperature_value": 3.0})
+    assert float(client.get(f"/reports/greenhouse/{greenhouse_id}/latest").json()["temperature_value"]) == 3.0
+
+    client.delete(f"/reports/{newer['id']}")
+    assert client.get(f"/reports/greenhouse/{greenhouse_id}/latest").json()["id"] == older["id"]
+
+
+def test_latest_report_cache_after_bulk_matches_db(test_db, sample_greenhouse):
+    """Тест: после пакетной записи в кэше лежит отчет в том виде, в каком его сохранила БД"""
+    from crud.reports import _report_dict, create_reports_bulk_db
+    from report_cache import latest_report_cache
+
+    latest_report_cache.clear()
+    greenhouse_id = sample_greenhouse["greenhouse_id"]
+    # Пояс и микросекунды: SQLite хранит время без пояса, MySQL еще и округляет до секунды
+    moment = datetime(2025, 1, 1, 12, 0, 0, 600000, tzinfo=timezone(timedelta(hours=3)))
+    rows = [
+        schemas.ReportCreate(greenhouse_id=greenhouse_id, temperature_value=i,
+                             report_time=moment - timedelta(minutes=i)).model_dump()
+        for i in range(3)
+    ]
+
+    db = TestingSessionLocal()
+    try:
+        ids = create_reports_bulk_db(db, rows, greenhouse_ids={greenhouse_id})
+    finally:
+        db.close()
+
+    db = TestingSessionLocal()
+    try:
+        stored = _report_dict(db.get(models.Report, ids[0]))
+    finally:
+        db.close()
+
+    assert latest_report_cache.get(greenhouse_id) == stored
+
+def test_ensure_indexes_on_existing_table():
+    """Тест: индексы добавляются в таблицу, созданную до их объявления"""
+    from sqlalchemy import inspect, text
+
+    legacy_engine = create_engine("sqlite://")
+    with legacy_engine.begin() as connection:
+        connection.execute(text("CREATE TABLE reports (id INTEGER PRIMARY KEY, greenhouse_id INTEGER, "
+                                "report_time DATETIME)"))
+
+    models.ensure_indexes(legacy_engine)
+
+    index_names = {index["name"] for index in inspect(legacy_engine).get_indexes("reports")}
+    assert {"ix_reports_greenhouse_time", "ix_reports_time"} <= index_names
+
+
+def test_export_reports_ndjson_and_csv(test_db, sample_greenhouse):
+    """Тест: выгрузка отчетов за период в NDJSON и CSV"""
+    from crud import reports
+
+    greenhouse_id = sample_greenhouse["greenhouse_id"]
+    for hour in range(5):
+        client.post("/reports/", json={"greenhouse_id": greenhouse_id, "temperature_value": hour,
+                                       "report_time": datetime(2025, 1, 1, hour).isoformat()})
+
+    params = {"greenhouse_id": greenhouse_id, "start": "2025-01-01T01:00:00", "end": "2025-01-01T04:00:00"}
+    batch_size = reports.EXPORT_BATCH_SIZE
+    reports.EXPORT_BATCH_SIZE = 2
+    try:
+        ndjson = client.get("/reports/export", params=params)
+        csv_response = client.get("/reports/export", params={**params, "format": "csv"})
+    finally:
+        reports.EXPORT_BATCH_SIZE = batch_size
+
+    assert ndjson.status_code == 200
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [row["temperature_value"] for row in rows] == [1.0, 2.0, 3.0]
+
+    lines = csv_response.text.splitlines()
+    assert lines[0].split(",")[:2] == ["id", "greenhouse_id"]
+    assert len(lines) == 4
+
+
+def test_reports_aggregate_by_bucket(test_db, sample_greenhouse):
+    """Тест: агрегация отчетов по часовым интервалам в БД"""
+    greenhouse_id = sample_greenhouse["greenhouse_id"]
+    for minute, temperature in [(0, 20), (30, 22), (59, 24), (60, 30), (200, 40)]:
+        client.post("/reports/", json={"greenhouse_id": greenhouse_id, "temperature_value": temperature,
+                                       "report_time": (datetime(2025, 3, 1, 10) + timedelta(minutes=minute)).isoformat()})
+
+    response = client.get("/reports/aggregate", params={
+        "greenhouse_id": greenhouse_id, "start": "2025-03-01T10:00:00", "end": "2025-03-01T13:00:00",
+        "width": "1h", "metrics": ["temperature_value", "co2_value"],
+    })
+
+    assert response.status_code == 200
+    buckets = response.json()
+    assert [(bucket["bucket_start"], bucket["count"]) for bucket in buckets] == [
+        ("2025-03-01T10:00:00", 3), ("2025-03-01T11:00:00", 1)]
+    assert buckets[0]["metrics"]["temperature_value"] == {"min": 20.0, "avg": 22.0, "max": 24.0}
+    assert buckets[0]["metrics"]["co2_value"] == {"min": None, "avg": None, "max": None}
+
+    too_many = client.get("/reports/aggregate", params={
+        "greenhouse_id": greenhouse_id, "start": "2020-01-01T00:00:00", "end": "2025-01-01T00:00:00", "width": "1m"})
+    assert too_many.status_code == 400
+
+
+def test_report_series_downsampled(test_db, sample_greenhouse):
+    """Тест: ряд показателя прореживается до заданного числа точек"""
+    greenhouse_id = sample_greenhouse["greenhouse_id"]
+    for minute in range(20):
+        client.post("/reports/", json={"greenhouse_id": greenhouse_id, "humidity_value": 50 + minute % 7,
+                                       "report_time": (datetime(2025, 3, 1) + timedelta(minutes=minute)).isoformat()})
+
+    response = client.get("/reports/series", params={"greenhouse_id": greenhouse_id, "metric": "humidity_value",
+                                                      "points": 5})
+
+    assert response.status_code == 200
+    series = response.json()
+    assert series["source_points"] == 20
+    assert len(series["timestamps"]) == len(series["values"]) == 5
+    assert series["timestamps"][0] == "2025-03-01T00:00:00"
+    assert series["timestamps"][-1] == "2025-03-01T00:19:00"
+    assert client.get("/reports/series", params={"greenhouse_id": greenhouse_id, "metric": "id"}).status_code == 400
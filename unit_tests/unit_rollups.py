@@ -0,0 +1,133 @@
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from database import get_db
+from crud.rollups import rebuild_rollups_db
+import models
+
+# Тестовая база данных
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+START = datetime(2025, 5, 1, 22, 0)
+TEMPERATURES = [20.0 + i for i in range(12)]
+
+
+@pytest.fixture(scope="function")
+def test_db():
+    models.Base.metadata.create_all(bind=engine)
+    yield
+    models.Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def greenhouse_with_reports(test_db):
+    """Теплица с отчетами каждые 30 минут с 22:00 1 мая до 03:30 2 мая"""
+    rule = client.post("/agronomic_rules/create_agronomic_rules",
+                       json={"type_crop": "tomato", "rule_params": json.dumps({"temperature": 25})}).json()
+    greenhouse = client.post("/greenhouses/", json={"name": "Rollups", "agrorule_id": rule["id"]}).json()
+
+    ids = []
+    for i, temperature in enumerate(TEMPERATURES):
+        response = client.post("/reports/", json={
+            "greenhouse_id": greenhouse["greenhouse_id"],
+            "temperature_value": temperature,
+            "report_time": (START + timedelta(minutes=30 * i)).isoformat(),
+        })
+        ids.append(response.json()["id"])
+    return greenhouse["greenhouse_id"], ids
+
+
+def test_hourly_and_daily_rollups(greenhouse_with_reports):
+    """Тест: агрегаты обновляются при записи отчетов"""
+    greenhouse_id, _ = greenhouse_with_reports
+
+    hourly = client.get("/reports/rollups/hourly", params={"greenhouse_id": greenhouse_id}).json()
+    daily = client.get("/reports/rollups/daily", params={"greenhouse_id": greenhouse_id,
+                                                         "metrics": ["temperature_value"]}).json()
+
+    assert len(hourly) == 6
+    first_hour = hourly[0]["metrics"]["temperature_value"]
+    assert first_hour["count"] == 2
+    assert first_hour["mean"] == pytest.approx(20.5)
+    assert list(hourly[0]["metrics"]) == ["temperature_value"]
+    assert [bucket["metrics"]["temperature_value"]["count"] for bucket in daily] == [4, 8]
+    assert daily[1]["metrics"]["temperature_value"]["max"] == 31.0
+
+
+def test_rollup_summary_matches_raw_reports(greenhouse_with_reports):
+    """Тест: сводка за период совпадает с расчетом по сырым отчетам"""
+    greenhouse_id, _ = greenhouse_with_reports
+
+    response = client.get("/reports/rollups/summary", params={
+        "greenhouse_id": greenhouse_id,
+        "start": "2025-05-01T23:00:00",
+        "end": "2025-05-02T03:00:00",
+    })
+
+    assert response.status_code == 200
+    stats = response.json()["metrics"]["temperature_value"]
+    expected = np.array(TEMPERATURES[2:10])
+    assert stats["count"] == len(expected)
+    assert stats["min"] == expected.min()
+    assert stats["mean"] == pytest.approx(expected.mean())
+    assert stats["std"] == pytest.approx(expected.std())
+
+
+def test_rollups_follow_update_delete_and_backfill(greenhouse_with_reports):
+    """Тест: изменение и удаление отчета пересчитывают агрегаты, backfill дает тот же результат"""
+    greenhouse_id, ids = greenhouse_with_reports
+    client.put(f"/reports/{ids[0]}", json={"temperature_value": 5.0})
+    client.delete(f"/reports/{ids[1]}")
+
+    def first_hour():
+        hourly = client.get("/reports/rollups/hourly", params={"greenhouse_id": greenhouse_id}).json()
+        return hourly[0]["metrics"]["temperature_value"]
+
+    assert first_hour()["count"] == 1
+    assert first_hour()["max"] == 5.0
+
+    def all_rollups():
+        return [client.get(f"/reports/rollups/{granularity}", params={"greenhouse_id": greenhouse_id}).json()
+                for granularity in ("hourly", "daily")]
+
+    incremental = all_rollups()
+
+    db = TestingSessionLocal()
+    try:
+        # Пачка меньше числа отчетов: агрегаты должны учесть все пачки
+        assert rebuild_rollups_db(db, batch_size=2) == len(TEMPERATURES) - 1
+        db.commit()
+    finally:
+        db.close()
+
+    assert first_hour()["count"] == 1
+    assert first_hour()["max"] == 5.0
+    assert all_rollups() == incremental
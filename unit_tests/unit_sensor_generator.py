@@ -0,0 +1,47 @@
+import numpy as np
+
+from sensor_generator import (CO2_RANGE, HUMIDITY_RANGES, TEMPERATURE_RANGES, VARIATION_PERCENT, make_rng,
+                              generate_sensor_values)
+
+
+def test_values_within_season_ranges():
+    """Тест: показания лежат в диапазоне времени года с учетом вариации"""
+    types = np.array(['temperature', 'humidity', 'co2'] * 1000, dtype=object)
+    values = generate_sensor_values(types, 2, 1, rng=make_rng(1))
+
+    bounds = {
+        'temperature': TEMPERATURE_RANGES[2, 1],
+        'humidity': HUMIDITY_RANGES[2, 1],
+        'co2': CO2_RANGE,
+    }
+    for sensor_type, (low, high) in bounds.items():
+        variation = VARIATION_PERCENT[sensor_type] / 100
+        selected = values[types == sensor_type]
+        assert selected.min() >= low * (1 - variation) - 0.01
+        assert selected.max() <= high * (1 + variation) + 0.01
+
+
+def test_seed_reproducible_and_unknown_types():
+    """Тест: одинаковый seed дает одинаковые показания, неизвестные типы - NaN"""
+    types = ['co2', 'light', 'temperature']
+
+    first = generate_sensor_values(types, 0, 0, rng=make_rng(42))
+    second = generate_sensor_values(types, 0, 0, rng=make_rng(42))
+
+    np.testing.assert_array_equal(first, second)
+    assert np.isnan(first[1])
+    assert np.all(np.round(first[[0, 2]], 2) == first[[0, 2]])
+
+
+def test_large_fleet_values():
+    """Тест: показания 100 000 датчиков генерируются одним вызовом, без пропусков и в пределах диапазонов"""
+    types = np.array(['temperature', 'humidity', 'co2'] * 33334, dtype=object)
+    values = generate_sensor_values(types, 0, 0, rng=make_rng(0))
+
+    assert values.shape == types.shape
+    assert not np.isnan(values).any()
+    low, high = CO2_RANGE
+    variation = VARIATION_PERCENT['co2'] / 100
+    co2 = values[types == 'co2']
+    assert co2.min() >= low * (1 - variation) - 0.01
+    assert co2.max() <= high * (1 + variation) + 0.01
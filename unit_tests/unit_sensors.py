@@ -399,4 +399,4 @@ def test_create_multiple_sensors_same_greenhouse(test_db, sample_greenhouse):
     data_2 = response_2.json()
 
     assert data_1["sensor_id"] != data_2["sensor_id"]
-    assert data_1["greenhouse_id"] == data_2["greenhouse_id"] == sample_greenhouse["greenhouse_id"]
\ No newline at end of file
+    assert data_1["greenhouse_id"] == data_2["greenhouse_id"] == sample_greenhouse["greenhouse_id"]
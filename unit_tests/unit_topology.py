@@ -0,0 +1,99 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from database import get_db
+from topology import topology_cache
+import models
+
+# Тестовая база данных
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="function")
+def test_db():
+    models.Base.metadata.create_all(bind=engine)
+    topology_cache.invalidate()
+    yield
+    topology_cache.invalidate()
+    models.Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def sample_greenhouse(test_db):
+    """Создает тестовую теплицу"""
+    rule = client.post("/agronomic_rules/create_agronomic_rules",
+                       json={"type_crop": "tomato", "rule_params": "{}"}).json()
+    greenhouse = client.post("/greenhouses/", json={"name": "Topology", "location": "Loc",
+                                                    "agrorule_id": rule["id"]})
+    return greenhouse.json()
+
+
+def get_topology():
+    db = TestingSessionLocal()
+    try:
+        return topology_cache.get(db)
+    finally:
+        db.close()
+
+
+def test_topology_loaded_once(test_db, sample_greenhouse):
+    """Тест: топология загружается из БД один раз, повторные обращения - из кэша"""
+    loads = topology_cache.stats()["loads"]
+    first = get_topology()
+    second = get_topology()
+
+    assert first is second
+    assert first.has_greenhouse(sample_greenhouse["greenhouse_id"])
+    assert topology_cache.stats()["loads"] == loads + 1
+
+
+def test_topology_patched_by_crud_writes(test_db, sample_greenhouse):
+    """Тест: создание, изменение и удаление через API обновляют кэш без перезагрузки"""
+    greenhouse_id = sample_greenhouse["greenhouse_id"]
+    version = get_topology().version
+    loads = topology_cache.stats()["loads"]
+
+    sensor = client.post("/sensors/", json={"type": "temperature", "greenhouse_id": greenhouse_id}).json()
+    client.post("/execution_devices/create", json={"greenhouse_id": greenhouse_id, "sensor_id": sensor["sensor_id"],
+                                                   "type": "temperature_controller"})
+    client.put(f"/greenhouses/{greenhouse_id}", json={"name": "Renamed", "agrorule_id": sample_greenhouse["agrorule_id"]})
+
+    topology = get_topology()
+    assert topology.version > version
+    assert topology_cache.stats()["loads"] == loads
+    assert topology.sensors_with_greenhouse()[0]["greenhouse_name"] == "Renamed"
+    assert topology.device_types(greenhouse_id) == ["temperature_controller"]
+
+    client.delete(f"/sensors/{sensor['sensor_id']}")
+
+    topology = get_topology()
+    assert topology.sensors_with_greenhouse() == []
+    assert topology.device_types(greenhouse_id) == []
+
+    client.delete(f"/greenhouses/{greenhouse_id}")
+    assert not get_topology().has_greenhouse(greenhouse_id)
+    assert topology_cache.stats()["loads"] == loads